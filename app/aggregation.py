@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import (
+    upsert_global_scores, upsert_score_shards, list_polls_with_pending_shards, rollup_score_shards,
+    add_pairwise_counts, upsert_pairwise_shards, list_polls_with_pending_pairwise_shards, rollup_pairwise_shards
+)
+from app.database import get_sessionmaker
+
+# Number of shard rows per (poll, option) and per (poll, pair). 1 disables sharding and completions
+# upsert global_scores and pairwise_counts directly.
+SCORE_SHARDS = int(os.getenv("SCORE_SHARDS", "1"))
+SCORE_ROLLUP_INTERVAL = float(os.getenv("SCORE_ROLLUP_INTERVAL", "5"))
+
+logger = logging.getLogger("elovote.aggregation")
+
+_rollup_task: Optional[asyncio.Task] = None
+
+def sharding_enabled() -> bool:
+    return SCORE_SHARDS > 1
+
+def shard_for_session(session_id) -> int:
+    """Spread sessions evenly (and deterministically) across shards."""
+    return session_id.int % SCORE_SHARDS
+
+async def add_session_scores(*, poll_id, session_id, scores, session: AsyncSession):
+    """Add one session's (option_id, score) pairs to the poll's totals, without committing."""
+    if sharding_enabled():
+        await upsert_score_shards(
+            poll_id=poll_id, shard=shard_for_session(session_id), scores=scores, session=session, commit=False
+        )
+    else:
+        await upsert_global_scores(poll_id=poll_id, scores=scores, session=session, commit=False)
+
+async def add_session_pairwise(*, poll_id, session_id, match_results, session: AsyncSession):
+    """Add one session's match outcomes to the poll's pairwise win matrix (sharded if enabled), without committing."""
+    counts = Counter((match.winner_option_id, match.loser_option_id) for match in match_results)
+    rows = [(winner_id, loser_id, wins) for (winner_id, loser_id), wins in counts.items()]
+    if sharding_enabled():
+        await upsert_pairwise_shards(
+            poll_id=poll_id, shard=shard_for_session(session_id), counts=rows, session=session, commit=False
+        )
+    else:
+        await add_pairwise_counts(poll_id=poll_id, counts=rows, session=session, commit=False)
+
+async def rollup_all_shards() -> int:
+    """Fold every poll's pending shard rows into global_scores and pairwise_counts. Returns the number of polls rolled up."""
+    sessionmaker = get_sessionmaker()
+    async with sessionmaker() as session:
+        score_polls = await list_polls_with_pending_shards(session=session)
+        for poll_id in score_polls:
+            await rollup_score_shards(poll_id=poll_id, session=session)
+        pairwise_polls = await list_polls_with_pending_pairwise_shards(session=session)
+        for poll_id in pairwise_polls:
+            await rollup_pairwise_shards(poll_id=poll_id, session=session)
+    return len(set(score_polls) | set(pairwise_polls))
+
+async def _rollup_periodically():
+    while True:
+        await asyncio.sleep(SCORE_ROLLUP_INTERVAL)
+        try:
+            await rollup_all_shards()
+        except Exception:
+            logger.exception("Score shard rollup failed")
+
+def start_rollup():
+    """Start the background shard rollup (only when sharding is enabled)."""
+    global _rollup_task
+    if sharding_enabled() and _rollup_task is None:
+        _rollup_task = asyncio.create_task(_rollup_periodically())
+
+async def stop_rollup():
+    """Stop the background rollup and fold whatever is still pending."""
+    global _rollup_task
+    if _rollup_task is None:
+        return
+    _rollup_task.cancel()
+    try:
+        await _rollup_task
+    except asyncio.CancelledError:
+        pass
+    _rollup_task = None
+    try:
+        await rollup_all_shards()
+    except Exception:
+        logger.exception("Final score shard rollup failed")
@@ -0,0 +1,71 @@
+"""
+Rebuild pairwise win matrices from existing match results.
+
+    python -m app.commands.backfill_pairwise                 # every poll
+    python -m app.commands.backfill_pairwise --poll-id <id>  # one poll
+
+Each poll is rebuilt in one REPEATABLE READ transaction: its counts are
+deleted, its completed sessions' matches are streamed through a
+server-side cursor in batches and tallied in memory (O(n^2) per poll, not
+O(matches)), and the totals are written back with a multi-row upsert.
+Sessions completing concurrently either fall inside the snapshot or add
+their own counts after it; a serialization conflict retries the poll.
+"""
+import argparse
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from sqlalchemy.exc import DBAPIError
+from app.crud import delete_pairwise_counts, stream_completed_match_pairs, add_pairwise_counts, list_poll_ids
+from app.database import get_sessionmaker, dispose_engine
+
+logger = logging.getLogger("elovote.backfill")
+
+MAX_ATTEMPTS = 3
+
+async def backfill_poll(poll_id, batch_size: int = 10000) -> int:
+    """Rebuild one poll's win matrix. Returns the number of matches counted."""
+    sessionmaker = get_sessionmaker()
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        async with sessionmaker() as session:
+            try:
+                await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+                await delete_pairwise_counts(poll_id=poll_id, session=session, commit=False)
+                counts = Counter()
+                async for pair in stream_completed_match_pairs(poll_id=poll_id, session=session, batch_size=batch_size):
+                    counts[pair] += 1
+                await add_pairwise_counts(
+                    poll_id=poll_id,
+                    counts=[(winner_id, loser_id, wins) for (winner_id, loser_id), wins in counts.items()],
+                    session=session,
+                    commit=False
+                )
+                await session.commit()
+                return sum(counts.values())
+            except DBAPIError as e:
+                await session.rollback()
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                logger.warning("Poll %s backfill conflicted (%s), retrying", poll_id, e.orig)
+    return 0
+
+async def backfill(poll_ids=None, batch_size: int = 10000):
+    if not poll_ids:
+        async with get_sessionmaker()() as session:
+            poll_ids = await list_poll_ids(session=session)
+    for i, poll_id in enumerate(poll_ids, start=1):
+        matches = await backfill_poll(poll_id, batch_size=batch_size)
+        logger.info("[%d/%d] poll %s: %d matches counted", i, len(poll_ids), poll_id, matches)
+    await dispose_engine()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--poll-id", type=uuid.UUID, action="append", help="Poll to rebuild (repeatable); default all polls")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows fetched per cursor round trip")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    asyncio.run(backfill(args.poll_id, args.batch_size))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Recompute global scores from raw match results.
+
+    python -m app.commands.recompute_scores                     # every poll
+    python -m app.commands.recompute_scores --poll-id <id> --dry-run
+    python -m app.commands.recompute_scores --checkpoint recompute.json
+
+Run this after changing the Elo parameters in `app.elo` (INITIAL_RATING,
+K_BASE). Each poll's completed sessions are streamed through a server-side
+cursor, encoded as int32 index arrays, and scored in chunks on a process
+pool with `app.elo_engine`; the summed vectors then replace the poll's
+global_scores (and pending shards) in the same REPEATABLE READ transaction
+the sessions were read in. A session completing during the run either
+falls inside the snapshot or adds its own score after the swap; if it
+touched the poll's scores before the swap, the poll is retried.
+API workers keep serving cached leaderboards, personal ones included, for up
+to LEADERBOARD_CACHE_TTL / SESSION_LEADERBOARD_CACHE_TTL after a poll is
+rewritten.
+
+`--checkpoint` records finished polls in a JSON file so an interrupted run
+resumes with the next poll. `--dry-run` prints old vs new scores and writes
+nothing.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy.exc import DBAPIError
+from app.crud import (
+    list_poll_ids, list_options_by_poll, list_global_scores_by_poll,
+    stream_completed_session_matches, replace_global_scores, delete_session_scores_by_poll
+)
+from app.database import get_sessionmaker, dispose_engine
+from app.elo_engine import OptionIndex, pack_sessions, process_sessions, mean_center_batch
+
+logger = logging.getLogger("elovote.recompute")
+
+MAX_ATTEMPTS = 3
+PROGRESS_EVERY = 10000  # sessions
+
+def score_chunk(winners: np.ndarray, losers: np.ndarray, lengths: np.ndarray, n_options: int) -> np.ndarray:
+    """Worker: summed mean-centered Elo vector of a packed chunk of sessions."""
+    ratings = process_sessions(winners, losers, lengths, n_options)
+    return mean_center_batch(ratings).sum(axis=0)
+
+class Checkpoint:
+    """Poll ids already recomputed, persisted after each poll."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.done = set(json.load(f).get("done", []))
+
+    def __contains__(self, poll_id) -> bool:
+        return str(poll_id) in self.done
+
+    def mark(self, poll_id):
+        self.done.add(str(poll_id))
+        if self.path:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"done": sorted(self.done)}, f)
+            os.replace(tmp, self.path)
+
+async def _recompute_totals(poll_id, index: OptionIndex, session, executor: Executor, workers: int, chunk_sessions: int, batch_size: int) -> np.ndarray:
+    """Stream the poll's completed sessions and sum their Elo vectors on the executor."""
+    loop = asyncio.get_running_loop()
+    positions = index.positions
+    totals = np.zeros(len(index), dtype=np.float64)
+    pending = set()
+    chunk: List = []
+    current, winners, losers = None, [], []
+    sessions_seen = 0
+    started = time.perf_counter()
+
+    async def submit():
+        nonlocal totals
+        packed = pack_sessions(chunk)
+        pending.add(loop.run_in_executor(executor, score_chunk, *packed, len(index)))
+        chunk.clear()
+        # Bound the work in flight so a huge poll does not queue all of its arrays at once
+        while len(pending) >= 2 * workers:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                totals += future.result()
+
+    def close_session():
+        nonlocal sessions_seen
+        chunk.append((np.array(winners, dtype=np.int32), np.array(losers, dtype=np.int32)))
+        sessions_seen += 1
+        if sessions_seen % PROGRESS_EVERY == 0:
+            rate = sessions_seen / (time.perf_counter() - started)
+            logger.info("poll %s: %d sessions (%.0f/s)", poll_id, sessions_seen, rate)
+
+    async for session_id, winner_id, loser_id in stream_completed_session_matches(poll_id=poll_id, session=session, batch_size=batch_size):
+        if session_id != current:
+            if current is not None:
+                close_session()
+                if len(chunk) >= chunk_sessions:
+                    await submit()
+            current, winners, losers = session_id, [], []
+        winners.append(positions[winner_id])
+        losers.append(positions[loser_id])
+    if current is not None:
+        close_session()
+    if chunk:
+        await submit()
+    for future in asyncio.as_completed(pending):
+        totals += await future
+    logger.info("poll %s: %d sessions scored in %.1fs", poll_id, sessions_seen, time.perf_counter() - started)
+    return totals
+
+def _print_diff(options, old: Dict, new: Dict):
+    print(f"{'option':<40} {'old':>12} {'new':>12} {'delta':>12}")
+    for option in options:
+        before, after = old.get(option.id, 0.0), new[option.id]
+        print(f"{option.label[:40]:<40} {before:>12.2f} {after:>12.2f} {after - before:>+12.2f}")
+
+async def recompute_poll(poll_id, *, executor: Executor, workers: int, chunk_sessions: int = 2000, batch_size: int = 10000, dry_run: bool = False) -> Dict:
+    """Recompute one poll's global scores. Returns {option_id: new total}."""
+    sessionmaker = get_sessionmaker()
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        async with sessionmaker() as session:
+            try:
+                await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+                options = await list_options_by_poll(poll_id=poll_id, session=session)
+                index = OptionIndex.from_options(options)
+                totals = await _recompute_totals(poll_id, index, session, executor, workers, chunk_sessions, batch_size)
+                new = dict(zip(index.option_ids, totals.tolist()))
+                if dry_run:
+                    old = {score.option_id: score.total_score for score in await list_global_scores_by_poll(poll_id=poll_id, session=session)}
+                    print(f"\nPoll {poll_id}")
+                    _print_diff(options, old, new)
+                    await session.rollback()
+                    return new
+                await replace_global_scores(poll_id=poll_id, scores=list(new.items()), session=session, commit=False)
+                # Stored per-session vectors used the old parameters; session leaderboards recompute them
+                await delete_session_scores_by_poll(poll_id=poll_id, session=session, commit=False)
+                await session.commit()
+                return new
+            except DBAPIError as e:
+                await session.rollback()
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                logger.warning("Poll %s recompute conflicted (%s), retrying", poll_id, e.orig)
+    return {}
+
+async def recompute(poll_ids=None, *, workers: int, chunk_sessions: int, batch_size: int, dry_run: bool, checkpoint: Checkpoint):
+    if not poll_ids:
+        async with get_sessionmaker()() as session:
+            poll_ids = await list_poll_ids(session=session)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for i, poll_id in enumerate(poll_ids, start=1):
+            if poll_id in checkpoint:
+                logger.info("[%d/%d] poll %s: already done, skipping", i, len(poll_ids), poll_id)
+                continue
+            await recompute_poll(poll_id, executor=executor, workers=workers, chunk_sessions=chunk_sessions, batch_size=batch_size, dry_run=dry_run)
+            if not dry_run:
+                checkpoint.mark(poll_id)
+            logger.info("[%d/%d] poll %s: done", i, len(poll_ids), poll_id)
+    await dispose_engine()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--poll-id", type=uuid.UUID, action="append", help="Poll to recompute (repeatable); default all polls")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-sessions", type=int, default=2000, help="Sessions per worker task")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows fetched per cursor round trip")
+    parser.add_argument("--checkpoint", help="JSON file recording finished polls, for resuming")
+    parser.add_argument("--dry-run", action="store_true", help="Print old vs new scores without writing")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    asyncio.run(recompute(
+        args.poll_id,
+        workers=args.workers,
+        chunk_sessions=args.chunk_sessions,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+        checkpoint=Checkpoint(args.checkpoint),
+    ))
+
+if __name__ == "__main__":
+    main()
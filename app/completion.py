@@ -0,0 +1,220 @@
+"""
+Write-behind session completion (COMPLETION_MODE=async).
+
+Completing a session then only marks it complete and inserts it into
+`completion_queue`, in the request's transaction; the voter gets a status
+URL back at once. Background workers claim queued sessions with
+`FOR UPDATE SKIP LOCKED` (so several workers, in one process or many,
+never take the same row), score each poll's sessions together with
+`app.elo_engine`, and fold them into global scores and the pairwise
+matrix with one upsert per poll, deleting the queue rows in the same
+transaction. A session that fails to aggregate keeps its row with an
+attempt count and is given up on after COMPLETION_MAX_ATTEMPTS.
+
+The table is the durable queue; the in-process `asyncio.Queue` only
+wakes a worker as soon as a session is queued instead of at the next
+poll interval.
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional
+from app.crud import (
+    claim_completions, delete_completions, record_completion_failures, list_match_results_by_sessions, create_session_scores
+)
+from app.database import get_sessionmaker
+from app.aggregation import add_session_scores, add_session_pairwise
+from app.elo_engine import process_sessions_elo, mean_center_batch, pack_scores
+from app.events import notify_leaderboard_change, push_leaderboard_change
+from app.leaderboard import invalidate_poll_leaderboard
+from app.poll_cache import get_poll_snapshot
+
+COMPLETION_MODE = os.getenv("COMPLETION_MODE", "sync").lower()
+COMPLETION_WORKERS = int(os.getenv("COMPLETION_WORKERS", "1"))
+COMPLETION_BATCH_SIZE = int(os.getenv("COMPLETION_BATCH_SIZE", "500"))
+COMPLETION_POLL_INTERVAL = float(os.getenv("COMPLETION_POLL_INTERVAL", "1.0"))
+# After a wake-up, wait this long so sessions completing together land in one batch
+COMPLETION_BATCH_DELAY = float(os.getenv("COMPLETION_BATCH_DELAY", "0.05"))
+# A session that failed to aggregate this many times stays queued but is no longer claimed
+COMPLETION_MAX_ATTEMPTS = int(os.getenv("COMPLETION_MAX_ATTEMPTS", "5"))
+
+logger = logging.getLogger("elovote.completion")
+
+def async_completion_enabled() -> bool:
+    return COMPLETION_MODE == "async"
+
+class CompletionStats:
+    def __init__(self):
+        self.batches = 0
+        self.sessions = 0
+        self.polls = 0
+        self.failures = 0
+        self.session_failures = 0
+
+    def reset(self):
+        self.__init__()
+
+completion_stats = CompletionStats()
+
+_wakeup: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+
+def wake():
+    """Tell a worker that a session was just queued (call after the enqueue committed)."""
+    if _wakeup is not None:
+        _wakeup.put_nowait(None)
+
+async def _aggregate_poll(session, poll_id, poll_session_ids, matches_by_session):
+    """Score one poll's sessions together and fold them into its global scores and pairwise matrix."""
+    snapshot = await get_poll_snapshot(poll_id=poll_id, session=session)
+    options = snapshot.options
+    sessions_matches = [matches_by_session[session_id] for session_id in poll_session_ids]
+    ratings = process_sessions_elo(sessions_matches, snapshot.index)
+    totals = mean_center_batch(ratings).sum(axis=0).tolist()
+    await create_session_scores(
+        rows=[
+            (session_id, poll_id, pack_scores(vector))
+            for session_id, vector in zip(poll_session_ids, ratings)
+        ],
+        session=session,
+        commit=False
+    )
+    # The shard (when sharding is on) is picked by the batch's first session
+    await add_session_scores(
+        poll_id=poll_id,
+        session_id=poll_session_ids[0],
+        scores=[(option.id, score) for option, score in zip(options, totals)],
+        session=session
+    )
+    await add_session_pairwise(
+        poll_id=poll_id,
+        session_id=poll_session_ids[0],
+        match_results=[match for matches in sessions_matches for match in matches],
+        session=session
+    )
+    await notify_leaderboard_change(poll_id, session)
+
+async def _aggregate_in_savepoint(session, poll_id, poll_session_ids, matches_by_session) -> Optional[Exception]:
+    """Aggregate under a savepoint, so a failure rolls back only this work; returns the error, if any."""
+    try:
+        async with session.begin_nested():
+            await _aggregate_poll(session, poll_id, poll_session_ids, matches_by_session)
+    except Exception as error:
+        return error
+    return None
+
+async def process_batch(limit: int = COMPLETION_BATCH_SIZE) -> int:
+    """
+    Claim up to `limit` queued sessions and aggregate them, one update per poll. Returns sessions processed.
+
+    Each poll is aggregated under its own savepoint. If a poll fails, its
+    sessions are retried one at a time; the ones that still fail keep their
+    queue row with one more attempt, and are not claimed again after
+    COMPLETION_MAX_ATTEMPTS, so one bad session cannot stall the queue.
+    """
+    async with get_sessionmaker()() as session:
+        claimed = await claim_completions(limit=limit, max_attempts=COMPLETION_MAX_ATTEMPTS, session=session)
+        if not claimed:
+            await session.rollback()
+            return 0
+        by_poll: Dict = defaultdict(list)
+        for session_id, poll_id in claimed:
+            by_poll[poll_id].append(session_id)
+
+        session_ids = [session_id for session_id, _ in claimed]
+        matches_by_session: Dict = defaultdict(list)
+        for match in await list_match_results_by_sessions(session_ids=session_ids, session=session):
+            matches_by_session[match.session_id].append(match)
+
+        failures: Dict = {}
+        aggregated_polls = []
+        # Polls in a fixed order, so workers with overlapping batches lock score rows in the same order
+        for poll_id, poll_session_ids in sorted(by_poll.items()):
+            error = await _aggregate_in_savepoint(session, poll_id, poll_session_ids, matches_by_session)
+            if error is None:
+                aggregated_polls.append(poll_id)
+                continue
+            if len(poll_session_ids) == 1:
+                errors = {poll_session_ids[0]: error}
+            else:
+                logger.warning("Aggregating %d sessions of poll %s failed (%r); retrying one at a time", len(poll_session_ids), poll_id, error)
+                errors = {}
+                for session_id in poll_session_ids:
+                    error = await _aggregate_in_savepoint(session, poll_id, [session_id], matches_by_session)
+                    if error is not None:
+                        errors[session_id] = error
+                if len(errors) < len(poll_session_ids):
+                    aggregated_polls.append(poll_id)
+            for session_id, error in errors.items():
+                logger.error("Could not aggregate session %s of poll %s", session_id, poll_id, exc_info=error)
+                failures[session_id] = repr(error)
+
+        done = [session_id for session_id in session_ids if session_id not in failures]
+        if done:
+            await delete_completions(session_ids=done, session=session, commit=False)
+        if failures:
+            await record_completion_failures(failures=failures, session=session, commit=False)
+        await session.commit()
+
+    for poll_id in aggregated_polls:
+        await invalidate_poll_leaderboard(poll_id)
+        push_leaderboard_change(poll_id)
+    completion_stats.batches += 1
+    completion_stats.sessions += len(done)
+    completion_stats.polls += len(aggregated_polls)
+    completion_stats.session_failures += len(failures)
+    return len(claimed)
+
+def _drain_wakeups():
+    while not _wakeup.empty():
+        _wakeup.get_nowait()
+
+async def _work():
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.get(), timeout=COMPLETION_POLL_INTERVAL)
+            await asyncio.sleep(COMPLETION_BATCH_DELAY)
+            _drain_wakeups()
+        except asyncio.TimeoutError:
+            pass
+        try:
+            # Keep going while full batches come back: there is a backlog
+            while await process_batch() >= COMPLETION_BATCH_SIZE:
+                pass
+        except Exception:
+            completion_stats.failures += 1
+            logger.exception("Completion batch failed")
+
+def start_completion_workers():
+    """Start the aggregation workers (only when COMPLETION_MODE=async)."""
+    global _wakeup
+    if not async_completion_enabled() or _workers:
+        return
+    _wakeup = asyncio.Queue()
+    for _ in range(COMPLETION_WORKERS):
+        _workers.append(asyncio.create_task(_work()))
+
+async def stop_completion_workers():
+    """Stop the workers; anything still queued stays in completion_queue for the next start."""
+    global _wakeup
+    for task in _workers:
+        task.cancel()
+    for task in _workers:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _workers.clear()
+    _wakeup = None
+
+def get_completion_stats() -> Dict[str, int]:
+    return {
+        "mode": COMPLETION_MODE,
+        "workers": len(_workers),
+        "batches": completion_stats.batches,
+        "sessions": completion_stats.sessions,
+        "polls": completion_stats.polls,
+        "failures": completion_stats.failures,
+        "session_failures": completion_stats.session_failures,
+    }
@@ -1,9 +1,43 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Optional, List
-from app.models import Poll, Option, VoterSession, MatchResult, GlobalScore
+from sqlalchemy import select, delete, update, func, union_all, tuple_, text
+from typing import Optional, List, Dict
+import datetime
+import json
+from app.models import Poll, Option, VoterSession, MatchResult, GlobalScore, GlobalScoreShard, PairwiseCount, PairwiseCountShard, IdempotencyKey, CompletionQueue, SessionScore
 from app.schemas import PollCreate, OptionCreate, VoterSessionCreate, MatchResultCreate
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import inspect
+from app.singleflight import SingleFlight
+from app.database import COALESCE_READS
+import uuid
+
+# asyncpg caps a statement at 32767 bind parameters; keep multi-row inserts well below that
+BULK_INSERT_CHUNK = 5000
+
+# Hot reads below are coalesced for sessions that opt in (read-only request sessions,
+# see get_async_read_session): identical concurrent queries (same statement and
+# engine) run once and every caller gets the result. Other sessions always query
+# themselves, since a shared result comes from another transaction.
+read_coalescer = SingleFlight()
+
+async def _adopt(obj, session: AsyncSession):
+    """Attach an ORM object loaded by another caller's session to this one, without a query."""
+    state = inspect(obj, raiseerr=False)
+    if state is None or state.session is None or state.session is session.sync_session:
+        return obj
+    return await session.merge(obj, load=False)
+
+async def _coalesced(kind: str, key, session: AsyncSession, fetch):
+    info = getattr(session, "info", None)
+    if not isinstance(info, dict) or info.get(COALESCE_READS) is not True or session.new or session.dirty or session.deleted:
+        return await fetch()
+    # Per engine: a replica read must not answer a primary read (see get_async_read_session)
+    result, shared = await read_coalescer.do((kind, key, id(session.bind)), fetch)
+    if not shared:
+        return result
+    if isinstance(result, list):
+        return [await _adopt(obj, session) for obj in result]
+    return await _adopt(result, session) if result is not None else None
 
 # Poll CRUDso 
 async def create_poll(*, poll: PollCreate, session: AsyncSession) -> Poll:
@@ -14,13 +48,66 @@ async def create_poll(*, poll: PollCreate, session: AsyncSession) -> Poll:
     return db_poll
 
 async def get_poll_by_id(*, poll_id, session: AsyncSession) -> Optional[Poll]:
-    result = await session.execute(select(Poll).where(Poll.id == poll_id))
-    return result.scalar_one_or_none()
+    async def fetch():
+        result = await session.execute(select(Poll).where(Poll.id == poll_id))
+        return result.scalar_one_or_none()
+    return await _coalesced("poll", str(poll_id), session, fetch)
+
+def _filtered_polls(
+    *,
+    creator_email: Optional[str] = None,
+    is_verified: Optional[bool] = None,
+    created_after: Optional[datetime.datetime] = None,
+    created_before: Optional[datetime.datetime] = None,
+):
+    stmt = select(Poll)
+    if creator_email is not None:
+        stmt = stmt.where(Poll.creator_email == creator_email)
+    if is_verified is not None:
+        stmt = stmt.where(Poll.is_verified == is_verified)
+    if created_after is not None:
+        stmt = stmt.where(Poll.created_at >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(Poll.created_at < created_before)
+    return stmt
 
-async def list_polls(session: AsyncSession) -> List[Poll]:
-    result = await session.execute(select(Poll))
+async def list_polls(
+    session: AsyncSession,
+    *,
+    limit: Optional[int] = None,
+    after: Optional[tuple] = None,
+    **filters,
+) -> List[Poll]:
+    """
+    Polls, newest first, ordered by (created_at, id).
+
+    `after` is the (created_at, id) keyset position of the last row of the
+    previous page; filters are those of _filtered_polls.
+    """
+    stmt = _filtered_polls(**filters)
+    if after is not None:
+        stmt = stmt.where(tuple_(Poll.created_at, Poll.id) < tuple_(*after))
+    stmt = stmt.order_by(Poll.created_at.desc(), Poll.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    result = await session.execute(stmt)
     return list(result.scalars().all())
 
+async def estimate_poll_count(session: AsyncSession, **filters) -> int:
+    """Planner estimate of the number of matching polls, avoiding a COUNT(*) scan."""
+    if not any(value is not None for value in filters.values()):
+        result = await session.execute(text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'polls'"))
+        return max(int(result.scalar() or 0), 0)
+    # Filter values are typed (email, bool, datetime) by the caller, so inlining them is safe
+    compiled = _filtered_polls(**filters).compile(
+        dialect=session.bind.dialect, compile_kwargs={"literal_binds": True}
+    )
+    result = await session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
 # Option CRUD
 async def create_option(*, option: OptionCreate, session: AsyncSession) -> Option:
     db_option = Option(**option.model_dump())
@@ -34,10 +121,17 @@ async def get_option_by_id(*, option_id, session: AsyncSession) -> Optional[Opti
     return result.scalar_one_or_none()
 
 async def list_options_by_poll(*, poll_id, session: AsyncSession) -> List[Option]:
-    result = await session.execute(select(Option).where(Option.poll_id == poll_id))
-    return list(result.scalars().all())
+    async def fetch():
+        # Stable order, so dense option indices (see app.elo_engine.OptionIndex) are reproducible
+        result = await session.execute(select(Option).where(Option.poll_id == poll_id).order_by(Option.id))
+        return list(result.scalars().all())
+    return await _coalesced("options", str(poll_id), session, fetch)
 
 # VoterSession CRUD
+async def poll_has_voter_sessions(*, poll_id, session: AsyncSession) -> bool:
+    result = await session.execute(select(VoterSession.id).where(VoterSession.poll_id == poll_id).limit(1))
+    return result.scalar_one_or_none() is not None
+
 async def create_voter_session(*, session_data: VoterSessionCreate, session: AsyncSession) -> VoterSession:
     db_session = VoterSession(**session_data.model_dump())
     session.add(db_session)
@@ -45,24 +139,84 @@ async def create_voter_session(*, session_data: VoterSessionCreate, session: Asy
     await session.refresh(db_session)
     return db_session
 
-async def get_voter_session_by_id(*, session_id, session: AsyncSession) -> Optional[VoterSession]:
-    result = await session.execute(select(VoterSession).where(VoterSession.id == session_id))
+async def get_voter_session_by_id(*, session_id, session: AsyncSession, for_update: bool = False) -> Optional[VoterSession]:
+    stmt = select(VoterSession).where(VoterSession.id == session_id)
+    if for_update:
+        # Row lock held until the caller's transaction ends; serializes concurrent completions
+        stmt = stmt.with_for_update()
+    result = await session.execute(stmt)
     return result.scalar_one_or_none()
 
+async def get_voter_session_with_scores(*, session_id, session: AsyncSession):
+    """A voter session and its stored Elo vector (None if not stored), in one query; (None, None) if no such session."""
+    result = await session.execute(
+        select(VoterSession, SessionScore.scores)
+        .outerjoin(SessionScore, SessionScore.session_id == VoterSession.id)
+        .where(VoterSession.id == session_id)
+    )
+    row = result.one_or_none()
+    return (row[0], row[1]) if row else (None, None)
+
+# SessionScore CRUD
+async def create_session_scores(*, rows, session: AsyncSession, commit: bool = True):
+    """Store (session_id, poll_id, packed scores) rows; a session already stored keeps its row."""
+    values = [{"session_id": session_id, "poll_id": poll_id, "scores": scores} for session_id, poll_id, scores in rows]
+    if not values:
+        return
+    for start in range(0, len(values), BULK_INSERT_CHUNK):
+        stmt = insert(SessionScore).values(values[start:start + BULK_INSERT_CHUNK])
+        await session.execute(stmt.on_conflict_do_nothing(index_elements=[SessionScore.session_id]))
+    if commit:
+        await session.commit()
+
+async def delete_session_scores_by_poll(*, poll_id, session: AsyncSession, commit: bool = True):
+    await session.execute(delete(SessionScore).where(SessionScore.poll_id == poll_id))
+    if commit:
+        await session.commit()
+
 # MatchResult CRUD
-async def create_match_result(*, match: MatchResultCreate, session: AsyncSession) -> MatchResult:
+async def create_match_result(*, match: MatchResultCreate, session: AsyncSession, commit: bool = True) -> MatchResult:
     db_match = MatchResult(**match.model_dump())
     session.add(db_match)
+    if not commit:
+        await session.flush()
+        return db_match
     await session.commit()
     await session.refresh(db_match)
     return db_match
 
+async def get_match_result_by_index(*, session_id, match_index: int, session: AsyncSession) -> Optional[MatchResult]:
+    result = await session.execute(
+        select(MatchResult).where(MatchResult.session_id == session_id, MatchResult.match_index == match_index)
+    )
+    return result.scalar_one_or_none()
+
+async def create_match_results_bulk(*, session_id, matches, session: AsyncSession, commit: bool = True) -> int:
+    """Insert many match results with multi-row INSERT statements. Returns the number of rows written."""
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "session_id": session_id,
+            "winner_option_id": match.winner_option_id,
+            "loser_option_id": match.loser_option_id,
+            "match_index": match.match_index,
+        }
+        for match in matches
+    ]
+    for start in range(0, len(rows), BULK_INSERT_CHUNK):
+        await session.execute(insert(MatchResult).values(rows[start:start + BULK_INSERT_CHUNK]))
+    if commit:
+        await session.commit()
+    return len(rows)
+
 async def list_match_results_by_session(*, session_id, session: AsyncSession) -> List[MatchResult]:
-    result = await session.execute(select(MatchResult).where(MatchResult.session_id == session_id))
+    result = await session.execute(
+        select(MatchResult).where(MatchResult.session_id == session_id).order_by(MatchResult.match_index)
+    )
     return list(result.scalars().all())
 
 # GlobalScore CRUD
-async def upsert_global_score(*, poll_id, option_id, total_score, session: AsyncSession):
+async def upsert_global_score(*, poll_id, option_id, total_score, session: AsyncSession, commit: bool = True):
     stmt = insert(GlobalScore).values(
         poll_id=poll_id,
         option_id=option_id,
@@ -74,8 +228,402 @@ async def upsert_global_score(*, poll_id, option_id, total_score, session: Async
         }
     )
     await session.execute(stmt)
-    await session.commit()
+    if commit:
+        await session.commit()
+
+async def upsert_global_scores(*, poll_id, scores, session: AsyncSession, commit: bool = True):
+    """Add (option_id, score) pairs to a poll's global scores with one multi-row upsert."""
+    rows = [
+        {"poll_id": poll_id, "option_id": option_id, "total_score": total_score}
+        for option_id, total_score in scores
+    ]
+    if not rows:
+        return
+    stmt = insert(GlobalScore).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GlobalScore.poll_id, GlobalScore.option_id],
+        set_={
+            'total_score': GlobalScore.total_score + stmt.excluded.total_score
+        }
+    )
+    await session.execute(stmt)
+    if commit:
+        await session.commit()
 
 async def list_global_scores_by_poll(*, poll_id, session: AsyncSession) -> List[GlobalScore]:
-    result = await session.execute(select(GlobalScore).where(GlobalScore.poll_id == poll_id))
-    return list(result.scalars().all()) 
\ No newline at end of file
+    """Global scores of a poll, including score shards that have not been rolled up yet."""
+    async def fetch():
+        rolled_up = select(GlobalScore.option_id, GlobalScore.total_score).where(GlobalScore.poll_id == poll_id)
+        pending = select(GlobalScoreShard.option_id, GlobalScoreShard.total_score).where(GlobalScoreShard.poll_id == poll_id)
+        combined = union_all(rolled_up, pending).subquery()
+        result = await session.execute(
+            select(combined.c.option_id, func.sum(combined.c.total_score)).group_by(combined.c.option_id)
+        )
+        return [
+            GlobalScore(poll_id=poll_id, option_id=option_id, total_score=total_score)
+            for option_id, total_score in result.all()
+        ]
+    # Transient objects (never added to a session), so coalesced callers share them as-is
+    return await _coalesced("global_scores", str(poll_id), session, fetch)
+
+async def list_ranked_scores(*, poll_id, session: AsyncSession, limit: Optional[int] = None, offset: int = 0, include_shards: bool = False) -> Optional[List[dict]]:
+    """
+    A page of the poll's Elo leaderboard, ranked in SQL: [{"label", "score", "rank"}], best first.
+
+    Every option is listed (LEFT JOIN to the scores, 0.0 where an option has
+    no score row yet), matching `build_poll_leaderboard`. Ties share a RANK()
+    and are ordered by option id; with shards, pending deltas are summed in
+    first. Returns None when the poll has no scores yet and [] when `offset`
+    is past the last option.
+    """
+    if include_shards:
+        rolled_up = select(GlobalScore.option_id, GlobalScore.total_score).where(GlobalScore.poll_id == poll_id)
+        pending = select(GlobalScoreShard.option_id, GlobalScoreShard.total_score).where(GlobalScoreShard.poll_id == poll_id)
+        combined = union_all(rolled_up, pending).subquery()
+        scores = (
+            select(combined.c.option_id, func.sum(combined.c.total_score).label("total_score"))
+            .group_by(combined.c.option_id)
+            .subquery()
+        )
+    else:
+        scores = select(GlobalScore.option_id, GlobalScore.total_score).where(GlobalScore.poll_id == poll_id).subquery()
+    score = func.coalesce(scores.c.total_score, 0.0)
+    stmt = (
+        select(
+            Option.label,
+            score.label("score"),
+            func.rank().over(order_by=score.desc()).label("rank"),
+            # Options with a score row, counted before the page is cut
+            func.count(scores.c.option_id).over().label("scored")
+        )
+        .select_from(Option)
+        .outerjoin(scores, scores.c.option_id == Option.id)
+        .where(Option.poll_id == poll_id)
+        .order_by(score.desc(), Option.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    rows = (await session.execute(stmt)).all()
+    if rows and not rows[0].scored:
+        return None
+    return [{"label": row.label, "score": row.score, "rank": row.rank} for row in rows]
+
+# GlobalScoreShard CRUD
+async def upsert_score_shards(*, poll_id, shard: int, scores, session: AsyncSession, commit: bool = True):
+    """Add (option_id, score) pairs to one shard of a poll's scores with one multi-row upsert."""
+    rows = [
+        {"poll_id": poll_id, "option_id": option_id, "shard": shard, "total_score": total_score}
+        for option_id, total_score in scores
+    ]
+    if not rows:
+        return
+    stmt = insert(GlobalScoreShard).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GlobalScoreShard.poll_id, GlobalScoreShard.option_id, GlobalScoreShard.shard],
+        set_={
+            'total_score': GlobalScoreShard.total_score + stmt.excluded.total_score
+        }
+    )
+    await session.execute(stmt)
+    if commit:
+        await session.commit()
+
+async def list_polls_with_pending_shards(*, session: AsyncSession) -> List:
+    result = await session.execute(select(GlobalScoreShard.poll_id).distinct())
+    return list(result.scalars().all())
+
+async def rollup_score_shards(*, poll_id, session: AsyncSession, commit: bool = True):
+    """Move a poll's shard rows into global_scores atomically (one DELETE ... RETURNING feeding one upsert)."""
+    moved = (
+        delete(GlobalScoreShard)
+        .where(GlobalScoreShard.poll_id == poll_id)
+        .returning(GlobalScoreShard.poll_id, GlobalScoreShard.option_id, GlobalScoreShard.total_score)
+        .cte("moved")
+    )
+    sums = (
+        select(moved.c.poll_id, moved.c.option_id, func.sum(moved.c.total_score))
+        .group_by(moved.c.poll_id, moved.c.option_id)
+    )
+    stmt = insert(GlobalScore).from_select(["poll_id", "option_id", "total_score"], sums)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GlobalScore.poll_id, GlobalScore.option_id],
+        set_={
+            'total_score': GlobalScore.total_score + stmt.excluded.total_score
+        }
+    )
+    await session.execute(stmt)
+    if commit:
+        await session.commit()
+
+async def replace_global_scores(*, poll_id, scores, session: AsyncSession, commit: bool = True):
+    """Replace a poll's global scores (and drop its pending shards) with the given (option_id, score) pairs."""
+    await session.execute(delete(GlobalScoreShard).where(GlobalScoreShard.poll_id == poll_id))
+    await session.execute(delete(GlobalScore).where(GlobalScore.poll_id == poll_id))
+    # Upsert rather than insert: a session completing mid-swap may recreate a row first
+    await upsert_global_scores(poll_id=poll_id, scores=scores, session=session, commit=False)
+    if commit:
+        await session.commit()
+
+# PairwiseCount CRUD
+async def add_pairwise_counts(*, poll_id, counts, session: AsyncSession, commit: bool = True):
+    """Add (winner_option_id, loser_option_id, wins) rows to a poll's win matrix with one multi-row upsert."""
+    # Sorted, so concurrent upserts into the same matrix lock rows in the same order
+    rows = [
+        {"poll_id": poll_id, "winner_option_id": winner_id, "loser_option_id": loser_id, "wins": wins}
+        for winner_id, loser_id, wins in sorted(counts)
+    ]
+    if not rows:
+        return
+    for start in range(0, len(rows), BULK_INSERT_CHUNK):
+        stmt = insert(PairwiseCount).values(rows[start:start + BULK_INSERT_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PairwiseCount.poll_id, PairwiseCount.winner_option_id, PairwiseCount.loser_option_id],
+            set_={
+                'wins': PairwiseCount.wins + stmt.excluded.wins
+            }
+        )
+        await session.execute(stmt)
+    if commit:
+        await session.commit()
+
+async def list_pairwise_counts(*, poll_id, session: AsyncSession) -> List[tuple]:
+    """
+    A poll's whole win matrix as (winner_option_id, loser_option_id, wins) rows, in one query,
+    including pairwise shards that have not been rolled up yet.
+    """
+    rolled_up = select(
+        PairwiseCount.winner_option_id, PairwiseCount.loser_option_id, PairwiseCount.wins
+    ).where(PairwiseCount.poll_id == poll_id)
+    pending = select(
+        PairwiseCountShard.winner_option_id, PairwiseCountShard.loser_option_id, PairwiseCountShard.wins
+    ).where(PairwiseCountShard.poll_id == poll_id)
+    combined = union_all(rolled_up, pending).subquery()
+    result = await session.execute(
+        select(combined.c.winner_option_id, combined.c.loser_option_id, func.sum(combined.c.wins))
+        .group_by(combined.c.winner_option_id, combined.c.loser_option_id)
+    )
+    return [(winner_id, loser_id, int(wins)) for winner_id, loser_id, wins in result.all()]
+
+async def delete_pairwise_counts(*, poll_id, session: AsyncSession, commit: bool = True):
+    """Drop a poll's win matrix, pending pairwise shards included."""
+    await session.execute(delete(PairwiseCountShard).where(PairwiseCountShard.poll_id == poll_id))
+    await session.execute(delete(PairwiseCount).where(PairwiseCount.poll_id == poll_id))
+    if commit:
+        await session.commit()
+
+async def upsert_pairwise_shards(*, poll_id, shard: int, counts, session: AsyncSession, commit: bool = True):
+    """Add (winner_option_id, loser_option_id, wins) rows to one shard of a poll's win matrix."""
+    # Sorted, so concurrent upserts into the same shard lock rows in the same order
+    rows = [
+        {"poll_id": poll_id, "winner_option_id": winner_id, "loser_option_id": loser_id, "shard": shard, "wins": wins}
+        for winner_id, loser_id, wins in sorted(counts)
+    ]
+    if not rows:
+        return
+    for start in range(0, len(rows), BULK_INSERT_CHUNK):
+        stmt = insert(PairwiseCountShard).values(rows[start:start + BULK_INSERT_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                PairwiseCountShard.poll_id, PairwiseCountShard.winner_option_id,
+                PairwiseCountShard.loser_option_id, PairwiseCountShard.shard
+            ],
+            set_={
+                'wins': PairwiseCountShard.wins + stmt.excluded.wins
+            }
+        )
+        await session.execute(stmt)
+    if commit:
+        await session.commit()
+
+async def list_polls_with_pending_pairwise_shards(*, session: AsyncSession) -> List:
+    result = await session.execute(select(PairwiseCountShard.poll_id).distinct())
+    return list(result.scalars().all())
+
+async def rollup_pairwise_shards(*, poll_id, session: AsyncSession, commit: bool = True):
+    """Move a poll's pairwise shard rows into pairwise_counts atomically (one DELETE ... RETURNING feeding one upsert)."""
+    moved = (
+        delete(PairwiseCountShard)
+        .where(PairwiseCountShard.poll_id == poll_id)
+        .returning(
+            PairwiseCountShard.poll_id, PairwiseCountShard.winner_option_id,
+            PairwiseCountShard.loser_option_id, PairwiseCountShard.wins
+        )
+        .cte("moved")
+    )
+    sums = (
+        select(moved.c.poll_id, moved.c.winner_option_id, moved.c.loser_option_id, func.sum(moved.c.wins))
+        .group_by(moved.c.poll_id, moved.c.winner_option_id, moved.c.loser_option_id)
+    )
+    stmt = insert(PairwiseCount).from_select(["poll_id", "winner_option_id", "loser_option_id", "wins"], sums)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PairwiseCount.poll_id, PairwiseCount.winner_option_id, PairwiseCount.loser_option_id],
+        set_={
+            'wins': PairwiseCount.wins + stmt.excluded.wins
+        }
+    )
+    await session.execute(stmt)
+    if commit:
+        await session.commit()
+
+def _aggregated(session_id_column):
+    """Completed sessions whose scores are already in global_scores (not waiting in completion_queue)."""
+    return ~select(CompletionQueue.session_id).where(CompletionQueue.session_id == session_id_column).exists()
+
+async def stream_completed_match_pairs(*, poll_id, session: AsyncSession, batch_size: int = 10000):
+    """Yield (winner_option_id, loser_option_id) of every match in the poll's completed sessions, via a server-side cursor."""
+    stmt = (
+        select(MatchResult.winner_option_id, MatchResult.loser_option_id)
+        .join(VoterSession, VoterSession.id == MatchResult.session_id)
+        .where(VoterSession.poll_id == poll_id, VoterSession.is_complete == True, _aggregated(VoterSession.id))
+        .execution_options(yield_per=batch_size)
+    )
+    result = await session.stream(stmt)
+    async for partition in result.partitions():
+        for row in partition:
+            yield tuple(row)
+
+async def stream_completed_session_matches(*, poll_id, session: AsyncSession, batch_size: int = 10000):
+    """Yield (session_id, winner_option_id, loser_option_id) for the poll's completed sessions, grouped by session in play order."""
+    stmt = (
+        select(MatchResult.session_id, MatchResult.winner_option_id, MatchResult.loser_option_id)
+        .join(VoterSession, VoterSession.id == MatchResult.session_id)
+        .where(VoterSession.poll_id == poll_id, VoterSession.is_complete == True, _aggregated(VoterSession.id))
+        .order_by(MatchResult.session_id, MatchResult.match_index)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await session.stream(stmt)
+    async for partition in result.partitions():
+        for row in partition:
+            yield tuple(row)
+
+async def list_poll_ids(*, session: AsyncSession) -> List:
+    result = await session.execute(select(Poll.id).order_by(Poll.created_at, Poll.id))
+    return list(result.scalars().all())
+
+# Export streams (server-side cursors; rows are plain tuples, not ORM objects)
+async def _stream_rows(stmt, session: AsyncSession, batch_size: int):
+    result = await session.stream(stmt.execution_options(yield_per=batch_size))
+    async for partition in result.partitions():
+        for row in partition:
+            yield tuple(row)
+
+EXPORT_MATCH_COLUMNS = ("session_id", "match_index", "winner_option_id", "loser_option_id")
+EXPORT_SESSION_COLUMNS = ("session_id", "voter_email", "is_complete", "started_at", "completed_at")
+
+def stream_poll_matches(*, poll_id, session: AsyncSession, batch_size: int = 10000):
+    """Yield every match of the poll as a tuple of EXPORT_MATCH_COLUMNS."""
+    stmt = (
+        select(MatchResult.session_id, MatchResult.match_index, MatchResult.winner_option_id, MatchResult.loser_option_id)
+        .join(VoterSession, VoterSession.id == MatchResult.session_id)
+        .where(VoterSession.poll_id == poll_id)
+        .order_by(MatchResult.session_id, MatchResult.match_index)
+    )
+    return _stream_rows(stmt, session, batch_size)
+
+def stream_poll_sessions(*, poll_id, session: AsyncSession, batch_size: int = 10000):
+    """Yield every voter session of the poll as a tuple of EXPORT_SESSION_COLUMNS."""
+    stmt = (
+        select(VoterSession.id, VoterSession.voter_email, VoterSession.is_complete, VoterSession.started_at, VoterSession.completed_at)
+        .where(VoterSession.poll_id == poll_id)
+        .order_by(VoterSession.id)
+    )
+    return _stream_rows(stmt, session, batch_size)
+
+# IdempotencyKey CRUD
+async def get_idempotency_key(*, key: str, session: AsyncSession, created_after: Optional[datetime.datetime] = None) -> Optional[IdempotencyKey]:
+    stmt = select(IdempotencyKey).where(IdempotencyKey.key == key)
+    if created_after is not None:
+        stmt = stmt.where(IdempotencyKey.created_at > created_after)
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+async def create_idempotency_key(
+    *, key: str, fingerprint: str, status_code: int, response_body, stale_before: datetime.datetime,
+    session: AsyncSession, commit: bool = True
+) -> bool:
+    """
+    Record a response under an idempotency key. A row already under the key is
+    overwritten only if it is stale (created before `stale_before`); returns
+    False, writing nothing, if a live row holds the key.
+    """
+    now = datetime.datetime.utcnow()
+    stmt = insert(IdempotencyKey).values(
+        key=key, fingerprint=fingerprint, status_code=status_code, response_body=response_body, created_at=now
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.key],
+        set_={
+            'fingerprint': stmt.excluded.fingerprint,
+            'status_code': stmt.excluded.status_code,
+            'response_body': stmt.excluded.response_body,
+            'created_at': stmt.excluded.created_at
+        },
+        where=IdempotencyKey.created_at < stale_before
+    ).returning(IdempotencyKey.key)
+    result = await session.execute(stmt)
+    stored = result.scalar_one_or_none() is not None
+    if commit:
+        await session.commit()
+    return stored
+
+async def purge_idempotency_keys(*, before: datetime.datetime, session: AsyncSession) -> int:
+    result = await session.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < before))
+    await session.commit()
+    return result.rowcount
+
+# CompletionQueue CRUD
+async def enqueue_completion(*, session_id, poll_id, session: AsyncSession, commit: bool = True):
+    session.add(CompletionQueue(session_id=session_id, poll_id=poll_id))
+    if commit:
+        await session.commit()
+
+async def claim_completions(*, limit: int, session: AsyncSession, max_attempts: Optional[int] = None) -> List[tuple]:
+    """
+    Lock up to `limit` queued (session_id, poll_id) rows, oldest first, skipping rows other workers hold.
+
+    With `max_attempts`, rows that already failed that many times are left alone (dead letters).
+    """
+    stmt = select(CompletionQueue.session_id, CompletionQueue.poll_id)
+    if max_attempts is not None:
+        stmt = stmt.where(CompletionQueue.attempts < max_attempts)
+    result = await session.execute(
+        stmt
+        .order_by(CompletionQueue.enqueued_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return [tuple(row) for row in result.all()]
+
+async def delete_completions(*, session_ids, session: AsyncSession, commit: bool = True):
+    await session.execute(delete(CompletionQueue).where(CompletionQueue.session_id.in_(session_ids)))
+    if commit:
+        await session.commit()
+
+async def record_completion_failures(*, failures: Dict, session: AsyncSession, commit: bool = True):
+    """Count one more failed attempt for each queued session in `failures` (session_id -> error message)."""
+    for session_id, error in sorted(failures.items()):
+        await session.execute(
+            update(CompletionQueue)
+            .where(CompletionQueue.session_id == session_id)
+            .values(attempts=CompletionQueue.attempts + 1, last_error=error)
+        )
+    if commit:
+        await session.commit()
+
+async def get_completion_attempts(*, session_id, session: AsyncSession) -> Optional[int]:
+    """Failed attempts of a queued session, or None if it is not queued (aggregated, or never queued)."""
+    result = await session.execute(select(CompletionQueue.attempts).where(CompletionQueue.session_id == session_id))
+    return result.scalar_one_or_none()
+
+async def count_pending_completions(*, session: AsyncSession) -> int:
+    result = await session.execute(select(func.count()).select_from(CompletionQueue))
+    return result.scalar_one()
+
+async def list_match_results_by_sessions(*, session_ids, session: AsyncSession) -> List[MatchResult]:
+    """Match results of several sessions, grouped by session and in play order."""
+    result = await session.execute(
+        select(MatchResult)
+        .where(MatchResult.session_id.in_(session_ids))
+        .order_by(MatchResult.session_id, MatchResult.match_index)
+    )
+    return list(result.scalars().all())
@@ -1,33 +1,366 @@
 import os
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import time
+import asyncio
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.engine.url import URL
 from dotenv import load_dotenv
+from typing import Optional, Dict, Any
+from app.instrumentation import install_query_hooks, record_pool_wait
+from app.cache import TTLCache
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional streaming replica for read-only endpoints (same pool settings, its own pool)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
 
-def get_engine():
-    print("[DEBUG] get_engine called. connect_args=", {"statement_cache_size": 0}, "DATABASE_URL=", DATABASE_URL)
-    return create_async_engine(
-        DATABASE_URL.replace('postgresql://', 'postgresql+asyncpg://'),
+# Pool configuration (all overridable from the environment)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", str(DB_POOL_SIZE)))
+
+# Replica routing: never read from a replica further behind than this (seconds),
+# and re-measure its lag at most this often
+DB_READ_MAX_LAG = float(os.getenv("DB_READ_MAX_LAG", "5"))
+DB_READ_LAG_CHECK_INTERVAL = float(os.getenv("DB_READ_LAG_CHECK_INTERVAL", "1"))
+
+logger = logging.getLogger("elovote.database")
+
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+_read_engine: Optional[AsyncEngine] = None
+_read_sessionmaker: Optional[async_sessionmaker] = None
+
+
+class PoolStats:
+    """Counters for connection acquisition, updated by pool events and the session dependency."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.connects = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.wait_count += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def reset(self):
+        self.__init__()
+
+
+pool_stats = PoolStats()
+read_pool_stats = PoolStats()
+
+
+class ReadRoutingStats:
+    """Where read-only sessions went, and why they fell back to the primary."""
+
+    def __init__(self):
+        self.replica = 0
+        self.primary_no_replica = 0
+        self.primary_lag = 0
+        self.primary_recent_write = 0
+
+    def reset(self):
+        self.__init__()
+
+
+read_routing_stats = ReadRoutingStats()
+
+
+def _async_url(url: str) -> str:
+    return url.replace('postgresql://', 'postgresql+asyncpg://')
+
+
+def create_engine_from_env(url: Optional[str] = None, stats: Optional[PoolStats] = None) -> AsyncEngine:
+    """Build an async engine with the configured pool settings."""
+    url = url or DATABASE_URL
+    if not url:
+        raise RuntimeError("DATABASE_URL not configured")
+    stats = stats or pool_stats
+    engine = create_async_engine(
+        _async_url(url),
         echo=False,
         future=True,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
         connect_args={"statement_cache_size": 0}  # Prevent asyncpg prepared statement errors with PgBouncer
     )
 
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checkouts += 1
+
+    install_query_hooks(engine)
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    """Return the process-wide engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine_from_env()
+    return _engine
+
+
 def get_sessionmaker(engine=None):
-    if engine is None:
-        engine = get_engine()
-    return async_sessionmaker(
-        engine, expire_on_commit=False, class_=AsyncSession
-    )
+    global _sessionmaker
+    if engine is not None:
+        return async_sessionmaker(
+            engine, expire_on_commit=False, class_=AsyncSession
+        )
+    if _sessionmaker is None:
+        _sessionmaker = async_sessionmaker(
+            get_engine(), expire_on_commit=False, class_=AsyncSession
+        )
+    return _sessionmaker
 
-# Dependency for FastAPI
-async def get_async_session():
-    sessionmaker = get_sessionmaker()
+
+def get_read_engine() -> Optional[AsyncEngine]:
+    """Return the replica engine, creating it on first use; None without DATABASE_READ_URL."""
+    global _read_engine
+    if _read_engine is None and DATABASE_READ_URL:
+        _read_engine = create_engine_from_env(DATABASE_READ_URL, stats=read_pool_stats)
+    return _read_engine
+
+
+def get_read_sessionmaker() -> Optional[async_sessionmaker]:
+    global _read_sessionmaker
+    if _read_sessionmaker is None and get_read_engine() is not None:
+        _read_sessionmaker = async_sessionmaker(
+            get_read_engine(), expire_on_commit=False, class_=AsyncSession
+        )
+    return _read_sessionmaker
+
+
+async def _warm(engine: AsyncEngine, warmup: int) -> int:
+    connections = []
+    try:
+        for _ in range(min(warmup, DB_POOL_SIZE)):
+            conn = await engine.connect()
+            connections.append(conn)
+            await conn.execute(text("SELECT 1"))
+    finally:
+        for conn in connections:
+            await conn.close()
+    return len(connections)
+
+
+async def init_engine(warmup: int = DB_POOL_WARMUP) -> AsyncEngine:
+    """Create the shared engine (and replica engine, if configured) and open `warmup` pooled connections up front."""
+    engine = get_engine()
+    warmed = await _warm(engine, warmup)
+    logger.info("Database pool ready (size=%s, overflow=%s, warmed=%s)", DB_POOL_SIZE, DB_MAX_OVERFLOW, warmed)
+    read_engine = get_read_engine()
+    if read_engine is not None:
+        warmed = await _warm(read_engine, warmup)
+        logger.info("Replica pool ready (size=%s, overflow=%s, warmed=%s)", DB_POOL_SIZE, DB_MAX_OVERFLOW, warmed)
+    return engine
+
+
+async def dispose_engine():
+    """Close every pooled connection and forget the shared engines."""
+    global _engine, _sessionmaker, _read_engine, _read_sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+    if _read_engine is not None:
+        await _read_engine.dispose()
+    _engine = None
+    _sessionmaker = None
+    _read_engine = None
+    _read_sessionmaker = None
+
+
+def get_pool_stats(engine: Optional[AsyncEngine] = None, stats: Optional[PoolStats] = None) -> Dict[str, Any]:
+    """Snapshot of pool occupancy plus acquisition wait times."""
+    engine = engine or _engine
+    stats = stats or pool_stats
+    data: Dict[str, Any] = {
+        "initialized": engine is not None,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "connects": stats.connects,
+        "checkouts": stats.checkouts,
+        "wait_count": stats.wait_count,
+        "wait_avg_ms": (stats.wait_total / stats.wait_count * 1000) if stats.wait_count else 0.0,
+        "wait_max_ms": stats.wait_max * 1000,
+    }
+    if engine is not None:
+        pool = engine.sync_engine.pool
+        for name in ("checkedout", "checkedin", "overflow", "size"):
+            if hasattr(pool, name):
+                data[name] = getattr(pool, name)()
+    return data
+
+
+def get_all_pool_stats() -> Dict[str, Any]:
+    """Primary pool stats, plus the replica pool and read routing counters when a replica is configured."""
+    data = get_pool_stats()
+    if DATABASE_READ_URL:
+        data["replica"] = get_pool_stats(_read_engine, read_pool_stats)
+        data["replica"]["lag_seconds"] = _replica_lag[0]
+    data["read_routing"] = dict(vars(read_routing_stats))
+    return data
+
+
+# Read-your-writes: when a client (by Authorization header) or a poll last saw a
+# committed write. Entries only matter while they are younger than the worst lag
+# we tolerate; process-local, so another worker relies on the lag bound alone.
+_recent_writes = TTLCache(maxsize=100_000, ttl=DB_READ_MAX_LAG + DB_READ_LAG_CHECK_INTERVAL)
+_replica_lag = [None, 0.0]  # [lag seconds or None if unknown, monotonic time measured]
+_lag_lock = asyncio.Lock()
+
+
+def _client_key(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    return "client:" + hashlib.sha256(authorization.encode()).hexdigest()
+
+
+# Set in session.info on read sessions whose hot reads may join an identical
+# concurrent query from another request (see app.crud._coalesced)
+COALESCE_READS = "coalesce_reads"
+
+
+def mark_recent_write(key: str):
+    _recent_writes.set(key, time.time())
+
+
+def mark_poll_write(poll_id):
+    """Record that a poll's data just changed, so its reads stay on the primary until the replica catches up."""
+    mark_recent_write(f"poll:{poll_id}")
+
+
+async def replica_lag() -> Optional[float]:
+    """Replica replay lag in seconds (0 when fully caught up), re-measured at most every DB_READ_LAG_CHECK_INTERVAL; None if unknown."""
+    if time.monotonic() - _replica_lag[1] < DB_READ_LAG_CHECK_INTERVAL:
+        return _replica_lag[0]
+    async with _lag_lock:
+        if time.monotonic() - _replica_lag[1] >= DB_READ_LAG_CHECK_INTERVAL:
+            lag = None
+            try:
+                async with get_read_engine().connect() as conn:
+                    result = await conn.execute(text(
+                        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                    ))
+                    lag = float(result.scalar_one())
+            except Exception:
+                logger.warning("Could not measure replica lag; reading from the primary", exc_info=True)
+            _replica_lag[0], _replica_lag[1] = lag, time.monotonic()
+    return _replica_lag[0]
+
+
+def _write_keys(request: Request) -> list:
+    keys = [key for key in [_client_key(request)] if key]
+    if "poll_id" in request.path_params:
+        keys.append(f"poll:{request.path_params['poll_id']}")
+    return keys
+
+
+def _recently_wrote(request: Request) -> bool:
+    """Whether this client (or the poll in the path) committed a write within the read-your-writes window."""
+    return any(_recent_writes.get(key) is not None for key in _write_keys(request))
+
+
+async def _choose_read_target(request: Request) -> bool:
+    """True to read from the replica, False to use the primary."""
+    if get_read_sessionmaker() is None:
+        read_routing_stats.primary_no_replica += 1
+        return False
+    lag = await replica_lag()
+    if lag is None or lag > DB_READ_MAX_LAG:
+        read_routing_stats.primary_lag += 1
+        return False
+    now = time.time()
+    for key in _write_keys(request):
+        written_at = _recent_writes.get(key)
+        # The replica may not have replayed a write younger than its lag (plus how stale that measurement is)
+        if written_at is not None and now - written_at <= lag + DB_READ_LAG_CHECK_INTERVAL:
+            read_routing_stats.primary_recent_write += 1
+            return False
+    read_routing_stats.replica += 1
+    return True
+
+
+def time_connection_waits(sync_session, stats: PoolStats):
+    """
+    Record how long each transaction of `sync_session` waited for its connection.
+
+    Connections are still acquired lazily, on the first statement: the wait is
+    the time between the session beginning a transaction and the pool handing
+    it a connection, so requests answered from cache never touch the pool.
+    """
+    @event.listens_for(sync_session, "after_transaction_create")
+    def _transaction_created(session, transaction):
+        if transaction.parent is None:
+            session.info["elovote_checkout_start"] = time.perf_counter()
+
+    @event.listens_for(sync_session, "after_begin")
+    def _connection_acquired(session, transaction, connection):
+        started = session.info.pop("elovote_checkout_start", None)
+        if started is not None:
+            waited = time.perf_counter() - started
+            stats.record_wait(waited)
+            record_pool_wait(waited)
+
+
+@asynccontextmanager
+async def _open_session(sessionmaker, stats: PoolStats):
     async with sessionmaker() as session:
+        time_connection_waits(session.sync_session, stats)
+        yield session
+
+
+# Dependency for FastAPI
+async def get_async_session(request: Request):
+    async with _open_session(get_sessionmaker(), pool_stats) as session:
+        client_key = _client_key(request)
+        if client_key:
+            # This client's next reads must see what it just committed
+            event.listen(session.sync_session, "after_commit", lambda _: mark_recent_write(client_key))
+        yield session
+
+
+async def get_async_read_session(request: Request):
+    """
+    Session for read-only endpoints: the replica when one is configured and
+    fresh enough, else the primary.
+
+    Falls back to the primary when the replica's lag is unknown or above
+    DB_READ_MAX_LAG, or when this client (or the poll in the path) committed
+    a write more recently than the replica's lag.
+
+    Its hot reads are coalesced with identical concurrent ones, unless the
+    client or poll wrote recently: a shared query may have started before
+    that write committed.
+    """
+    if await _choose_read_target(request):
+        sessionmaker, stats = get_read_sessionmaker(), read_pool_stats
+    else:
+        sessionmaker, stats = get_sessionmaker(), pool_stats
+    async with _open_session(sessionmaker, stats) as session:
+        session.info[COALESCE_READS] = not _recently_wrote(request)
         yield session
 
-Base = declarative_base() 
\ No newline at end of file
+Base = declarative_base()
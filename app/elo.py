@@ -2,6 +2,9 @@ from typing import List, Tuple
 import math
 from app.models import MatchResult, Option
 
+INITIAL_RATING = 500.0
+K_BASE = 32.0
+
 def elo_probability(rating_a: float, rating_b: float) -> float:
     """Calculate the expected probability of A beating B."""
     return 1.0 / (1.0 + 10 ** ((rating_b - rating_a) / 400))
@@ -40,8 +43,7 @@ def process_session_elo(match_results: List[MatchResult], options: List[Option])
         List of final Elo scores for all options (in same order as options)
     """
     # Initialize all options with same starting Elo rating
-    initial_rating = 500.0
-    option_ratings = {option.id: initial_rating for option in options}
+    option_ratings = {option.id: INITIAL_RATING for option in options}
     
     # Process each match result in order
     for i, match in enumerate(match_results):
@@ -50,7 +52,7 @@ def process_session_elo(match_results: List[MatchResult], options: List[Option])
         loser_rating = option_ratings[match.loser_option_id]
         
         # Calculate K with decay
-        k = k_decay(32.0, i + 1)
+        k = k_decay(K_BASE, i + 1)
         
         # Update Elo ratings (winner is option A, loser is option B)
         new_winner_rating, new_loser_rating = elo_update(
@@ -0,0 +1,130 @@
+"""
+Array-backed Elo engine.
+
+Mirrors `app.elo.process_session_elo` (same starting rating and K decay) but
+works on dense option indices and int32 match arrays, and processes a whole
+batch of sessions at once: matches are applied step by step, while every
+session in the batch is updated in the same vectorized operation.
+"""
+from typing import Dict, Iterable, List, Sequence, Tuple
+import numpy as np
+from app.elo import INITIAL_RATING, K_BASE
+
+class OptionIndex:
+    """Maps a poll's option UUIDs to dense indices 0..n-1 (in the given option order)."""
+
+    def __init__(self, option_ids: Sequence):
+        self.option_ids = list(option_ids)
+        self.positions: Dict = {option_id: i for i, option_id in enumerate(self.option_ids)}
+
+    @classmethod
+    def from_options(cls, options) -> "OptionIndex":
+        return cls([option.id for option in options])
+
+    def __len__(self) -> int:
+        return len(self.option_ids)
+
+    def encode(self, match_results) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode match results (in play order) as winner and loser index arrays."""
+        positions = self.positions
+        winners = np.fromiter((positions[m.winner_option_id] for m in match_results), dtype=np.int32)
+        losers = np.fromiter((positions[m.loser_option_id] for m in match_results), dtype=np.int32)
+        return winners, losers
+
+def pack_sessions(encoded: Iterable[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Stack per-session (winners, losers) arrays into padded (B, M) matrices.
+
+    Returns winners, losers and the int32 length of each session; padding
+    entries are ignored by `process_sessions`.
+    """
+    encoded = list(encoded)
+    lengths = np.array([len(w) for w, _ in encoded], dtype=np.int32)
+    max_len = int(lengths.max()) if len(encoded) else 0
+    winners = np.zeros((len(encoded), max_len), dtype=np.int32)
+    losers = np.zeros((len(encoded), max_len), dtype=np.int32)
+    for row, (w, l) in enumerate(encoded):
+        winners[row, :len(w)] = w
+        losers[row, :len(l)] = l
+    return winners, losers, lengths
+
+def process_sessions(
+    winners: np.ndarray,
+    losers: np.ndarray,
+    lengths: np.ndarray,
+    n_options: int,
+    initial_rating: float = INITIAL_RATING,
+    k_base: float = K_BASE,
+) -> np.ndarray:
+    """
+    Run the session Elo process for a batch of sessions.
+
+    Args:
+        winners, losers: (B, M) int32 option indices, one row per session
+        lengths: (B,) number of real matches in each row
+        n_options: number of options in the poll
+
+    Returns:
+        (B, n_options) float64 final ratings
+    """
+    n_sessions = winners.shape[0]
+    ratings = np.full((n_sessions, n_options), initial_rating, dtype=np.float64)
+    if n_sessions == 0 or winners.shape[1] == 0:
+        return ratings
+
+    # Longest sessions first, so the sessions still active at step t are a prefix of the batch
+    order = np.argsort(-lengths, kind="stable")
+    sorted_lengths = lengths[order]
+    w_sorted = winners[order]
+    l_sorted = losers[order]
+    max_len = int(sorted_lengths[0])
+    k = k_base / np.sqrt(np.arange(1, max_len + 1, dtype=np.float64))
+    # active[t] = number of sessions with more than t matches
+    active = n_sessions - np.searchsorted(sorted_lengths[::-1], np.arange(max_len), side="right")
+
+    rows_all = np.arange(n_sessions)
+    for t in range(max_len):
+        rows = rows_all[:active[t]]
+        w = w_sorted[rows, t]
+        l = l_sorted[rows, t]
+        rating_w = ratings[rows, w]
+        rating_l = ratings[rows, l]
+        expected_w = 1.0 / (1.0 + 10 ** ((rating_l - rating_w) / 400))
+        delta = k[t] * (1.0 - expected_w)
+        ratings[rows, w] = rating_w + delta
+        ratings[rows, l] = rating_l - delta
+
+    # All rows started identical, so only the final ratings need un-sorting
+    result = np.empty_like(ratings)
+    result[order] = ratings
+    return result
+
+def pack_scores(scores) -> bytes:
+    """Pack a score vector as little-endian float64 bytes (8 bytes per option)."""
+    return np.asarray(scores, dtype="<f8").tobytes()
+
+def unpack_scores(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<f8")
+
+def mean_center_batch(ratings: np.ndarray) -> np.ndarray:
+    """Mean-center each row of a (B, n) rating matrix."""
+    if ratings.shape[-1] == 0:
+        return ratings.copy()
+    return ratings - ratings.mean(axis=-1, keepdims=True)
+
+def process_sessions_elo(sessions_match_results: Sequence[Sequence], options) -> np.ndarray:
+    """
+    Final Elo ratings for several sessions of one poll, as a (B, n) array in option order.
+
+    `options` may be the option rows or an already built OptionIndex (e.g. a poll snapshot's).
+    """
+    index = options if isinstance(options, OptionIndex) else OptionIndex.from_options(options)
+    winners, losers, lengths = pack_sessions(index.encode(matches) for matches in sessions_match_results)
+    return process_sessions(winners, losers, lengths, len(index))
+
+def summed_session_scores(sessions_match_results: Sequence[Sequence], options) -> List[float]:
+    """Sum of the mean-centered Elo vectors of many sessions (what global scores accumulate)."""
+    ratings = process_sessions_elo(sessions_match_results, options)
+    if ratings.shape[0] == 0:
+        return [0.0] * len(options)
+    return mean_center_batch(ratings).sum(axis=0).tolist()
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import DATABASE_URL, get_sessionmaker
+from app.poll_cache import get_poll_snapshot
+from app.leaderboard import get_poll_leaderboard, invalidate_poll_leaderboard
+
+# Minimum seconds between two pushes for the same poll; bursts of completions are coalesced
+LEADERBOARD_PUSH_INTERVAL = float(os.getenv("LEADERBOARD_PUSH_INTERVAL", "1.0"))
+# Use Postgres LISTEN/NOTIFY so completions on any worker reach watchers on every worker
+LEADERBOARD_NOTIFY = os.getenv("LEADERBOARD_NOTIFY", "false").lower() in ("1", "true", "yes")
+NOTIFY_CHANNEL = "leaderboard_changed"
+SUBSCRIBER_QUEUE_SIZE = 32
+
+logger = logging.getLogger("elovote.events")
+
+def diff_leaderboards(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Entries (keyed by label, unique per poll) whose score or rank changed, plus removed labels."""
+    old_by_label = {entry["label"]: entry for entry in old}
+    new_labels = {entry["label"] for entry in new}
+    changed = [entry for entry in new if old_by_label.get(entry["label"]) != entry]
+    removed = [label for label in old_by_label if label not in new_labels]
+    return {"changed": changed, "removed": removed}
+
+class LeaderboardBroker:
+    """
+    In-process fan-out of leaderboard changes.
+
+    Each watcher gets a queue of events. A change for a poll schedules at most
+    one reload per push interval; the reloaded leaderboard is diffed against
+    the last pushed one and the same diff goes to every watcher of the poll.
+    """
+
+    def __init__(self, loader: Callable[[str], Awaitable[List[Dict[str, Any]]]], interval: float = LEADERBOARD_PUSH_INTERVAL):
+        self.loader = loader
+        self.interval = interval
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._snapshots: Dict[str, List[Dict[str, Any]]] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._last_push: Dict[str, float] = {}
+
+    def subscribe(self, poll_id) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(str(poll_id), set()).add(queue)
+        return queue
+
+    def unsubscribe(self, poll_id, queue: asyncio.Queue):
+        key = str(poll_id)
+        subscribers = self._subscribers.get(key)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[key]
+            self._snapshots.pop(key, None)
+
+    def watcher_count(self, poll_id) -> int:
+        return len(self._subscribers.get(str(poll_id), ()))
+
+    def snapshot(self, poll_id) -> Optional[List[Dict[str, Any]]]:
+        return self._snapshots.get(str(poll_id))
+
+    def set_snapshot(self, poll_id, entries: List[Dict[str, Any]]):
+        self._snapshots.setdefault(str(poll_id), entries)
+
+    def mark_changed(self, poll_id):
+        """Schedule a push for the poll unless one is already pending (or nobody is watching)."""
+        key = str(poll_id)
+        if key not in self._subscribers or key in self._pending:
+            return
+        self._pending[key] = asyncio.create_task(self._flush(key))
+
+    async def _flush(self, key: str):
+        try:
+            wait = self._last_push.get(key, 0.0) + self.interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            # Changes arriving from here on schedule a new push
+            self._pending.pop(key, None)
+            entries = await self.loader(key)
+            self._last_push[key] = time.monotonic()
+            previous = self._snapshots.get(key)
+            if key not in self._subscribers:
+                return
+            self._snapshots[key] = entries
+            if previous is None:
+                self._broadcast(key, {"event": "snapshot", "data": {"leaderboard": entries}})
+                return
+            diff = diff_leaderboards(previous, entries)
+            if diff["changed"] or diff["removed"]:
+                self._broadcast(key, {"event": "diff", "data": diff})
+        except Exception:
+            logger.exception("Leaderboard push failed for poll %s", key)
+        finally:
+            if self._pending.get(key) is asyncio.current_task():
+                self._pending.pop(key, None)
+
+    def _broadcast(self, key: str, event: Dict[str, Any]):
+        for queue in list(self._subscribers.get(key, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow watcher: drop its backlog and resync it with the full leaderboard
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"event": "snapshot", "data": {"leaderboard": self._snapshots[key]}})
+
+async def _load_leaderboard(poll_id: str) -> List[Dict[str, Any]]:
+    await invalidate_poll_leaderboard(poll_id)
+    sessionmaker = get_sessionmaker()
+    async with sessionmaker() as session:
+        snapshot = await get_poll_snapshot(poll_id=poll_id, session=session)
+        ranking_method = snapshot.poll.ranking_method if snapshot else "elo"
+        leaderboard = await get_poll_leaderboard(poll_id=poll_id, session=session, ranking_method=ranking_method)
+    return leaderboard["entries"]
+
+broker = LeaderboardBroker(_load_leaderboard)
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+async def notify_leaderboard_change(poll_id, session: AsyncSession):
+    """
+    Queue a cross-worker change notification in the caller's transaction.
+
+    Call before committing: Postgres delivers the NOTIFY to every worker
+    (including this one) only if the transaction commits. No-op unless
+    LEADERBOARD_NOTIFY is enabled.
+    """
+    if LEADERBOARD_NOTIFY:
+        await session.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": str(poll_id)})
+
+def push_leaderboard_change(poll_id):
+    """Call after committing: push the change to this worker's watchers (the listener does it under LEADERBOARD_NOTIFY)."""
+    if not LEADERBOARD_NOTIFY:
+        broker.mark_changed(poll_id)
+
+_listener_connection = None
+
+def _on_notify(connection, pid, channel, payload):
+    # Another worker may have completed a session: drop our cached copy, then push to our watchers
+    asyncio.ensure_future(invalidate_poll_leaderboard(payload))
+    broker.mark_changed(payload)
+
+async def start_listener():
+    """Listen for leaderboard notifications from all workers (when LEADERBOARD_NOTIFY is enabled)."""
+    global _listener_connection
+    if not LEADERBOARD_NOTIFY or not DATABASE_URL or _listener_connection is not None:
+        return
+    import asyncpg
+    _listener_connection = await asyncpg.connect(DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://"))
+    await _listener_connection.add_listener(NOTIFY_CHANNEL, _on_notify)
+
+async def stop_listener():
+    global _listener_connection
+    if _listener_connection is not None:
+        await _listener_connection.close()
+        _listener_connection = None
@@ -0,0 +1,86 @@
+"""
+Streaming export of a poll's matches, sessions and scores.
+
+Rows come from server-side cursors and are encoded into chunks of at most
+EXPORT_CHUNK_ROWS rows, so memory stays flat no matter how many matches a
+poll has. Output is NDJSON (one object per line, tagged with its `type`)
+or CSV (one kind per file), optionally gzip-compressed on the fly.
+"""
+import csv
+import datetime
+import io
+import json
+import os
+import uuid
+import zlib
+from typing import AsyncIterator, Iterable, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import (
+    stream_poll_matches, stream_poll_sessions, list_options_by_poll, list_global_scores_by_poll,
+    EXPORT_MATCH_COLUMNS, EXPORT_SESSION_COLUMNS
+)
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "2000"))
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_KINDS = ("matches", "sessions", "scores", "all")
+SCORE_COLUMNS = ("option_id", "label", "total_score")
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+async def _score_rows(poll_id, session: AsyncSession):
+    options = await list_options_by_poll(poll_id=poll_id, session=session)
+    scores = {score.option_id: score.total_score for score in await list_global_scores_by_poll(poll_id=poll_id, session=session)}
+    for option in options:
+        yield (option.id, option.label, scores.get(option.id, 0.0))
+
+def _sources(kind: str, poll_id, session: AsyncSession):
+    """(kind, columns, row iterator) for each section of the export, in output order."""
+    sections = {
+        "sessions": lambda: ("sessions", EXPORT_SESSION_COLUMNS, stream_poll_sessions(poll_id=poll_id, session=session)),
+        "matches": lambda: ("matches", EXPORT_MATCH_COLUMNS, stream_poll_matches(poll_id=poll_id, session=session)),
+        "scores": lambda: ("scores", SCORE_COLUMNS, _score_rows(poll_id, session)),
+    }
+    names = ("sessions", "matches", "scores") if kind == "all" else (kind,)
+    return [sections[name]() for name in names]
+
+def _text(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+def encode_ndjson(kind: str, columns: Sequence[str], rows: Iterable[tuple]) -> str:
+    return "".join(
+        json.dumps({"type": kind, **{column: _text(value) for column, value in zip(columns, row)}}) + "\n"
+        for row in rows
+    )
+
+def encode_csv(rows: Iterable[tuple]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_text(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+async def export_chunks(*, poll_id, session: AsyncSession, kind: str = "matches", fmt: str = "ndjson") -> AsyncIterator[str]:
+    """Yield the encoded export in chunks of EXPORT_CHUNK_ROWS rows."""
+    for section, columns, rows in _sources(kind, poll_id, session):
+        if fmt == "csv":
+            yield encode_csv([columns])
+        batch = []
+        async for row in rows:
+            batch.append(row)
+            if len(batch) >= EXPORT_CHUNK_ROWS:
+                yield encode_ndjson(section, columns, batch) if fmt == "ndjson" else encode_csv(batch)
+                batch = []
+        if batch:
+            yield encode_ndjson(section, columns, batch) if fmt == "ndjson" else encode_csv(batch)
+
+async def gzip_chunks(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """Compress a text stream into a single gzip member, chunk by chunk."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip header and trailer
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,100 @@
+"""
+Idempotency-Key support for write endpoints.
+
+A client that retries a request with the same `Idempotency-Key` header gets
+the original response back instead of a second write. Responses are stored
+in `idempotency_keys` in the same transaction as the write they describe,
+and kept in a process-local cache in front of the table. Keys are scoped to
+the calling user and expire after IDEMPOTENCY_TTL seconds.
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import TTLCache
+from app.crud import get_idempotency_key, create_idempotency_key, purge_idempotency_keys
+from app.database import get_sessionmaker
+
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600"))
+REPLAY_HEADER = "Idempotent-Replayed"
+
+logger = logging.getLogger("elovote.idempotency")
+
+# scoped key -> {"fingerprint", "status_code", "body"}
+_cache = TTLCache(maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL)
+_purge_task: Optional[asyncio.Task] = None
+
+def scoped_key(user, key: str) -> str:
+    return f"{user.get('email') or user.get('sub')}:{key}"
+
+def fingerprint(payload: Dict[str, Any]) -> str:
+    """Stable hash of a request body, to detect a key reused for a different request."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def _stale_before() -> datetime.datetime:
+    return datetime.datetime.utcnow() - datetime.timedelta(seconds=IDEMPOTENCY_TTL)
+
+async def lookup(*, key: str, session: AsyncSession) -> Optional[Dict[str, Any]]:
+    """The stored response for a key, from the local cache or the database."""
+    record = _cache.get(key)
+    if record is None:
+        row = await get_idempotency_key(key=key, session=session, created_after=_stale_before())
+        if row is not None:
+            record = {"fingerprint": row.fingerprint, "status_code": row.status_code, "body": row.response_body}
+            _cache.set(key, record)
+    return record
+
+async def save(*, key: str, request_fingerprint: str, status_code: int, body, session: AsyncSession) -> bool:
+    """Stage a response in the caller's transaction. False if a live record already holds the key."""
+    return await create_idempotency_key(
+        key=key, fingerprint=request_fingerprint, status_code=status_code, response_body=body,
+        stale_before=_stale_before(), session=session, commit=False
+    )
+
+def remember(*, key: str, request_fingerprint: str, status_code: int, body):
+    """Cache a response once its transaction has committed."""
+    _cache.set(key, {"fingerprint": request_fingerprint, "status_code": status_code, "body": body})
+
+def replay(record: Dict[str, Any], request_fingerprint: str) -> JSONResponse:
+    """The original response, or 422 if the key was first used for a different request."""
+    if record["fingerprint"] != request_fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    return JSONResponse(status_code=record["status_code"], content=record["body"], headers={REPLAY_HEADER: "true"})
+
+async def purge_expired() -> int:
+    async with get_sessionmaker()() as session:
+        return await purge_idempotency_keys(before=_stale_before(), session=session)
+
+async def _purge_periodically():
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_PURGE_INTERVAL)
+        try:
+            purged = await purge_expired()
+            if purged:
+                logger.info("Purged %d expired idempotency keys", purged)
+        except Exception:
+            logger.exception("Idempotency key purge failed")
+
+def start_purge():
+    global _purge_task
+    if _purge_task is None:
+        _purge_task = asyncio.create_task(_purge_periodically())
+
+async def stop_purge():
+    global _purge_task
+    if _purge_task is None:
+        return
+    _purge_task.cancel()
+    try:
+        await _purge_task
+    except asyncio.CancelledError:
+        pass
+    _purge_task = None
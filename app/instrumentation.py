@@ -0,0 +1,143 @@
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from sqlalchemy import event
+
+# Requests slower than this (in ms) are logged together with their SQL statements
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+MAX_RECORDED_STATEMENTS = 50
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+logger = logging.getLogger("elovote.instrumentation")
+
+class RequestStats:
+    """Database activity of a single request."""
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.statements: List[str] = []
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("elovote_request_stats", default=None)
+
+def current_stats() -> Optional[RequestStats]:
+    return _current_stats.get()
+
+def record_pool_wait(seconds: float):
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.pool_wait += seconds
+
+def install_query_hooks(engine):
+    """Count and time every statement executed on `engine` against the current request."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("elovote_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["elovote_query_start"].pop()
+        stats = _current_stats.get()
+        if stats is None:
+            return
+        stats.query_count += 1
+        stats.db_time += time.perf_counter() - started
+        if len(stats.statements) < MAX_RECORDED_STATEMENTS:
+            stats.statements.append(statement)
+
+class RouteHistogram:
+    """Latency histogram plus DB totals for one route."""
+
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.db_ms = 0.0
+        self.pool_wait_ms = 0.0
+        self.queries = 0
+        self.max_queries = 0
+
+    def observe(self, duration_ms: float, stats: RequestStats):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.db_ms += stats.db_time * 1000
+        self.pool_wait_ms += stats.pool_wait * 1000
+        self.queries += stats.query_count
+        self.max_queries = max(self.max_queries, stats.query_count)
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def as_dict(self) -> Dict:
+        bounds = [str(b) for b in HISTOGRAM_BUCKETS_MS] + ["+Inf"]
+        return {
+            "count": self.count,
+            "avg_ms": self.total_ms / self.count if self.count else 0.0,
+            "avg_db_ms": self.db_ms / self.count if self.count else 0.0,
+            "avg_pool_wait_ms": self.pool_wait_ms / self.count if self.count else 0.0,
+            "avg_queries": self.queries / self.count if self.count else 0.0,
+            "max_queries": self.max_queries,
+            "buckets_ms": dict(zip(bounds, self.buckets)),
+        }
+
+route_histograms: Dict[str, RouteHistogram] = {}
+
+def get_route_metrics() -> Dict[str, Dict]:
+    return {route: histogram.as_dict() for route, histogram in sorted(route_histograms.items())}
+
+def _route_name(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{scope.get('method', '')} {path}"
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware that records per-request query count, DB time, pool wait
+    and handler time, reports them in a Server-Timing header, logs slow
+    requests with their statements and aggregates histograms per route.
+    """
+
+    def __init__(self, app, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                handler_ms = (time.perf_counter() - start) * 1000
+                timing = (
+                    f'db;dur={stats.db_time * 1000:.2f};desc="{stats.query_count} queries", '
+                    f'pool;dur={stats.pool_wait * 1000:.2f}, '
+                    f'app;dur={handler_ms:.2f}'
+                )
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            duration_ms = (time.perf_counter() - start) * 1000
+            route = _route_name(scope)
+            route_histograms.setdefault(route, RouteHistogram()).observe(duration_ms, stats)
+            if duration_ms >= self.slow_request_ms:
+                logger.warning(
+                    "Slow request %s took %.1fms (%d queries, db %.1fms, pool wait %.1fms): %s",
+                    route, duration_ms, stats.query_count, stats.db_time * 1000, stats.pool_wait * 1000,
+                    stats.statements
+                )
@@ -0,0 +1,171 @@
+import os
+import random
+from typing import Any, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import TTLCache, CacheBackend
+from app.crud import list_options_by_poll, list_global_scores_by_poll, list_pairwise_counts, list_ranked_scores
+from app.aggregation import sharding_enabled
+from app.database import mark_poll_write
+from app.elo_engine import OptionIndex
+from app.ranking import bradley_terry_scores, win_matrix
+from app.serialization import dumps
+
+LEADERBOARD_CACHE_TTL = float(os.getenv("LEADERBOARD_CACHE_TTL", "30"))
+LEADERBOARD_CACHE_SIZE = int(os.getenv("LEADERBOARD_CACHE_SIZE", "1024"))
+SESSION_LEADERBOARD_CACHE_SIZE = int(os.getenv("SESSION_LEADERBOARD_CACHE_SIZE", "10000"))
+# A completed session's ranking only changes when `recompute_scores` rewrites session_scores. That runs
+# in another process and cannot clear this cache, so the TTL (like the poll caches') bounds how long a
+# worker keeps serving a ranking from before the recompute
+SESSION_LEADERBOARD_CACHE_TTL = float(os.getenv("SESSION_LEADERBOARD_CACHE_TTL", str(LEADERBOARD_CACHE_TTL)))
+
+# Process-local cache of ranked leaderboards, keyed by poll id
+_local_cache = TTLCache(maxsize=LEADERBOARD_CACHE_SIZE, ttl=LEADERBOARD_CACHE_TTL)
+# Pages of Elo leaderboards ranked in SQL, for polls whose full leaderboard is not cached:
+# poll id -> {(limit, offset): leaderboard}
+_page_cache = TTLCache(maxsize=LEADERBOARD_CACHE_SIZE, ttl=LEADERBOARD_CACHE_TTL)
+# Serialized `{"leaderboard": [...]}` bodies of ranked leaderboards, keyed by (poll id, top)
+_body_cache = TTLCache(maxsize=LEADERBOARD_CACHE_SIZE, ttl=LEADERBOARD_CACHE_TTL)
+LEADERBOARD_BODY_TOPS = (10, None)
+# Ranked personal leaderboards of completed sessions: session id -> {"voter_email", "entries"}
+session_leaderboard_cache = TTLCache(maxsize=SESSION_LEADERBOARD_CACHE_SIZE, ttl=SESSION_LEADERBOARD_CACHE_TTL)
+# Optional cache shared between workers
+_shared_backend: Optional[CacheBackend] = None
+
+def set_leaderboard_backend(backend: Optional[CacheBackend]):
+    """Plug in (or remove, with None) a cache backend shared between workers."""
+    global _shared_backend
+    _shared_backend = backend
+
+def rank_entries(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Sort entries by score descending and assign ranks (ties share rank, stable order)."""
+    entries = sorted(entries, key=lambda x: (-x["score"]))
+    ranked = []
+    prev_score = None
+    prev_rank = 0
+    for idx, entry in enumerate(entries):
+        if prev_score is not None and entry["score"] == prev_score:
+            rank = prev_rank
+        else:
+            rank = idx + 1
+        ranked.append({"label": entry["label"], "score": entry["score"], "rank": rank})
+        prev_score = entry["score"]
+        prev_rank = rank
+    return ranked
+
+def _unranked(options) -> Dict[str, Any]:
+    # No votes yet: every option scores 0 with rank 'NA' (order is shuffled per read)
+    entries = [{"label": option.label, "score": 0.0, "rank": "NA"} for option in options]
+    return {"has_votes": False, "entries": entries}
+
+async def load_win_matrix(*, poll_id, options, session: AsyncSession):
+    """The poll's pairwise win matrix as a dense (n, n) array in option order (one query), or None if empty."""
+    counts = await list_pairwise_counts(poll_id=poll_id, session=session)
+    if not counts:
+        return None
+    index = OptionIndex.from_options(options)
+    return win_matrix(counts, index.positions, len(index))
+
+async def _build_bradley_terry_leaderboard(*, poll_id, options, session: AsyncSession) -> Dict[str, Any]:
+    wins = await load_win_matrix(poll_id=poll_id, options=options, session=session)
+    if wins is None:
+        return _unranked(options)
+    scores = bradley_terry_scores(wins, warm_start_key=str(poll_id))
+    entries = [{"label": option.label, "score": float(score)} for option, score in zip(options, scores)]
+    return {"has_votes": True, "entries": rank_entries(entries)}
+
+async def build_poll_leaderboard(*, poll_id, session: AsyncSession, ranking_method: str = "elo") -> Dict[str, Any]:
+    """Read options and scores and build the fully ranked leaderboard of a poll."""
+    options = await list_options_by_poll(poll_id=poll_id, session=session)
+    if ranking_method == "bradley_terry":
+        return await _build_bradley_terry_leaderboard(poll_id=poll_id, options=options, session=session)
+    global_scores = await list_global_scores_by_poll(poll_id=poll_id, session=session)
+    if not global_scores:
+        return _unranked(options)
+    option_id_to_score = {str(score.option_id): score.total_score for score in global_scores}
+    entries = [
+        {"label": option.label, "score": option_id_to_score.get(str(option.id), 0.0)}
+        for option in options
+    ]
+    return {"has_votes": True, "entries": rank_entries(entries)}
+
+async def _get_leaderboard_page(*, poll_id, session: AsyncSession, limit: Optional[int], offset: int) -> Optional[Dict[str, Any]]:
+    """
+    A ranked page straight from SQL (top-k, not the whole poll), or None if the poll has no scores.
+
+    An offset past the last option is an empty page, cached like any other.
+    """
+    key = str(poll_id)
+    pages = _page_cache.get(key) or {}
+    page = pages.get((limit, offset))
+    if page is None:
+        entries = await list_ranked_scores(
+            poll_id=poll_id, session=session, limit=limit, offset=offset, include_shards=sharding_enabled()
+        )
+        if entries is None:
+            return None
+        page = {"has_votes": True, "entries": entries}
+        _page_cache.set(key, {**pages, (limit, offset): page})
+    return page
+
+async def get_poll_leaderboard(*, poll_id, session: AsyncSession, ranking_method: str = "elo", limit: Optional[int] = None, offset: int = 0) -> Dict[str, Any]:
+    """
+    Ranked leaderboard of a poll (by its ranking method), served from cache when possible.
+
+    `limit`/`offset` select a page of the ranked entries. A page of an Elo
+    poll whose full leaderboard is not cached is ranked and cut in SQL;
+    everything else is sliced from the cached full leaderboard.
+    """
+    key = str(poll_id)
+    leaderboard = _local_cache.get(key)
+    if leaderboard is None and _shared_backend is not None:
+        leaderboard = await _shared_backend.get(f"leaderboard:{key}")
+        if leaderboard is not None:
+            _local_cache.set(key, leaderboard)
+    if leaderboard is None and ranking_method == "elo" and (limit is not None or offset):
+        page = await _get_leaderboard_page(poll_id=poll_id, session=session, limit=limit, offset=offset)
+        if page is not None:
+            return page
+    if leaderboard is None:
+        leaderboard = await build_poll_leaderboard(poll_id=poll_id, session=session, ranking_method=ranking_method)
+        _local_cache.set(key, leaderboard)
+        if _shared_backend is not None:
+            await _shared_backend.set(f"leaderboard:{key}", leaderboard, LEADERBOARD_CACHE_TTL)
+    end = None if limit is None else offset + limit
+    if not leaderboard["has_votes"]:
+        entries = list(leaderboard["entries"])
+        random.shuffle(entries)
+        return {"has_votes": False, "entries": entries[offset:end]}
+    if limit is None and not offset:
+        return leaderboard
+    return {"has_votes": True, "entries": leaderboard["entries"][offset:end]}
+
+async def get_poll_leaderboard_body(*, poll_id, session: AsyncSession, ranking_method: str = "elo", top: Optional[int] = None) -> bytes:
+    """
+    The leaderboard response body (`{"leaderboard": [...]}`, first `top` entries) as JSON bytes.
+
+    Ranked leaderboards are serialized once and reused until invalidated;
+    unranked ones are reshuffled, so serialized on every read.
+    """
+    if top not in LEADERBOARD_BODY_TOPS:
+        raise ValueError(f"top must be one of {LEADERBOARD_BODY_TOPS}")
+    key = (str(poll_id), top)
+    body = _body_cache.get(key)
+    if body is not None:
+        return body
+    leaderboard = await get_poll_leaderboard(poll_id=poll_id, session=session, ranking_method=ranking_method, limit=top)
+    body = dumps({"leaderboard": leaderboard["entries"]})
+    if leaderboard["has_votes"]:
+        _body_cache.set(key, body)
+    return body
+
+async def invalidate_poll_leaderboard(poll_id):
+    """Drop a poll's cached leaderboard after its scores or options change."""
+    key = str(poll_id)
+    # Until the replica has replayed this change, the poll's reads go to the primary
+    mark_poll_write(key)
+    _local_cache.delete(key)
+    _page_cache.delete(key)
+    for top in LEADERBOARD_BODY_TOPS:
+        _body_cache.delete((key, top))
+    if _shared_backend is not None:
+        await _shared_backend.delete(f"leaderboard:{key}")
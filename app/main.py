@@ -4,13 +4,22 @@ from contextlib import asynccontextmanager
 import logging
 from app.routes.poll import router as poll_router
 from app.routes.vote import router as vote_router
-from app.routes.auth import router as auth_router
+from app.routes.auth import router as auth_router, start_auth_background, stop_auth_background
+from app.routes.metrics import router as metrics_router
+from app.database import init_engine, dispose_engine
+from app.aggregation import start_rollup, stop_rollup
+from app.instrumentation import RequestMetricsMiddleware
+from app.events import start_listener, stop_listener
+from app.serialization import default_response_class
+from app.idempotency import start_purge, stop_purge
+from app.completion import start_completion_workers, stop_completion_workers
 
 # App metadata
 app = FastAPI(
     title="EloVote API",
     description="API for Elo-based fair voting system.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=default_response_class()
 )
 
 # CORS setup (restrict to specific domains, but leave empty for now)
@@ -23,6 +32,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request query counting and timing (Server-Timing header, slow request log, /metrics/requests)
+app.add_middleware(RequestMetricsMiddleware)
+
 # Logging setup
 logger = logging.getLogger("elovote")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
@@ -30,12 +42,25 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("EloVote API is starting up...")
+    await init_engine()
+    await start_auth_background()
+    start_rollup()
+    await start_listener()
+    start_purge()
+    start_completion_workers()
     yield
     logger.info("EloVote API is shutting down...")
+    await stop_completion_workers()
+    await stop_purge()
+    await stop_listener()
+    await stop_rollup()
+    await stop_auth_background()
+    await dispose_engine()
 
 app.router.lifespan_context = lifespan
 
 # Include routers
 app.include_router(poll_router)
 app.include_router(vote_router)
-app.include_router(auth_router) 
\ No newline at end of file
+app.include_router(auth_router)
+app.include_router(metrics_router) 
\ No newline at end of file
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, Boolean, DateTime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, Boolean, DateTime, Index, UniqueConstraint, LargeBinary, func
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import declarative_base
 import uuid
 import datetime
@@ -13,6 +13,12 @@ class Poll(Base):
     creator_email = Column(String, nullable=True)
     is_verified = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    match_budget = Column(Integer, nullable=True)  # None: every voter plays the full round robin
+    ranking_method = Column(String, nullable=False, default="elo", server_default="elo")  # "elo" or "bradley_terry"
+
+# Keyset pagination of the poll listing, unfiltered and by creator
+Index("ix_polls_created_at_id", Poll.created_at, Poll.id)
+Index("ix_polls_creator_created_at_id", Poll.creator_email, Poll.created_at, Poll.id)
 
 class Option(Base):
     __tablename__ = "options"
@@ -20,6 +26,14 @@ class Option(Base):
     poll_id = Column(UUID(as_uuid=True), ForeignKey("polls.id"))
     label = Column(String)
 
+Index("ix_options_poll_id", Option.poll_id)
+# Labels are unique per poll, ignoring case and whitespace
+Index(
+    "uq_options_poll_label_norm",
+    Option.poll_id, func.regexp_replace(func.lower(Option.label), "[[:space:]]+", "", "g"),
+    unique=True
+)
+
 class VoterSession(Base):
     __tablename__ = "sessions"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -29,16 +43,90 @@ class VoterSession(Base):
     started_at = Column(DateTime, default=datetime.datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
 
+Index("ix_sessions_poll_voter_complete", VoterSession.poll_id, VoterSession.voter_email, VoterSession.is_complete)
+
+class SessionScore(Base):
+    """A completed session's final Elo vector: little-endian float64s, one per option in Option.id order."""
+    __tablename__ = "session_scores"
+    session_id = Column(UUID(as_uuid=True), ForeignKey("sessions.id"), primary_key=True)
+    poll_id = Column(UUID(as_uuid=True), ForeignKey("polls.id"), nullable=False)
+    scores = Column(LargeBinary, nullable=False)
+
+Index("ix_session_scores_poll_id", SessionScore.poll_id)
+
+class CompletionQueue(Base):
+    """Completed sessions whose scores are not aggregated yet (COMPLETION_MODE=async); claimed by workers with SKIP LOCKED."""
+    __tablename__ = "completion_queue"
+    session_id = Column(UUID(as_uuid=True), ForeignKey("sessions.id"), primary_key=True)
+    poll_id = Column(UUID(as_uuid=True), ForeignKey("polls.id"), nullable=False)
+    enqueued_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    # Failed aggregation attempts; rows at COMPLETION_MAX_ATTEMPTS are no longer claimed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(String, nullable=True)
+
+Index("ix_completion_queue_enqueued_at", CompletionQueue.enqueued_at)
+
 class MatchResult(Base):
     __tablename__ = "match_results"
+    __table_args__ = (
+        UniqueConstraint("session_id", "match_index", name="uq_match_results_session_match_index"),
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     session_id = Column(UUID(as_uuid=True), ForeignKey("sessions.id"))
     winner_option_id = Column(UUID(as_uuid=True), ForeignKey("options.id"))
     loser_option_id = Column(UUID(as_uuid=True), ForeignKey("options.id"))
     match_index = Column(Integer)
 
+# Each pair is played at most once per session, whichever option won
+Index(
+    "uq_match_results_session_pair",
+    MatchResult.session_id,
+    func.least(MatchResult.winner_option_id, MatchResult.loser_option_id),
+    func.greatest(MatchResult.winner_option_id, MatchResult.loser_option_id),
+    unique=True
+)
+
 class GlobalScore(Base):
     __tablename__ = "global_scores"
     poll_id = Column(UUID(as_uuid=True), ForeignKey("polls.id"), primary_key=True)
     option_id = Column(UUID(as_uuid=True), ForeignKey("options.id"), primary_key=True)
-    total_score = Column(Float, default=0.0) 
\ No newline at end of file
+    total_score = Column(Float, default=0.0)
+
+# Top-k leaderboard reads walk this index in rank order (ties by option id)
+Index("ix_global_scores_poll_score", GlobalScore.poll_id, GlobalScore.total_score.desc(), GlobalScore.option_id)
+
+class GlobalScoreShard(Base):
+    """Pending score deltas spread over N rows per option, so concurrent completions don't contend; rolled up into global_scores."""
+    __tablename__ = "global_score_shards"
+    poll_id = Column(UUID(as_uuid=True), ForeignKey("polls.id"), primary_key=True)
+    option_id = Column(UUID(as_uuid=True), ForeignKey("options.id"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    total_score = Column(Float, default=0.0)
+
+class PairwiseCount(Base):
+    """How often one option beat another across all completed sessions of a poll."""
+    __tablename__ = "pairwise_counts"
+    poll_id = Column(UUID(as_uuid=True), ForeignKey("polls.id"), primary_key=True)
+    winner_option_id = Column(UUID(as_uuid=True), ForeignKey("options.id"), primary_key=True)
+    loser_option_id = Column(UUID(as_uuid=True), ForeignKey("options.id"), primary_key=True)
+    wins = Column(Integer, nullable=False, default=0)
+
+class PairwiseCountShard(Base):
+    """Pending win-count deltas spread over N rows per pair (like GlobalScoreShard); rolled up into pairwise_counts."""
+    __tablename__ = "pairwise_count_shards"
+    poll_id = Column(UUID(as_uuid=True), ForeignKey("polls.id"), primary_key=True)
+    winner_option_id = Column(UUID(as_uuid=True), ForeignKey("options.id"), primary_key=True)
+    loser_option_id = Column(UUID(as_uuid=True), ForeignKey("options.id"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    wins = Column(Integer, nullable=False, default=0)
+
+class IdempotencyKey(Base):
+    """Response of a request made with an Idempotency-Key header, replayed when the client retries it."""
+    __tablename__ = "idempotency_keys"
+    key = Column(String, primary_key=True)  # "<user email>:<header value>"
+    fingerprint = Column(String, nullable=False)  # sha256 of the request body
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(JSONB, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+Index("ix_idempotency_keys_created_at", IdempotencyKey.created_at)
@@ -0,0 +1,24 @@
+import base64
+import datetime
+import uuid
+from typing import Tuple
+
+def naive_utc(value: datetime.datetime) -> datetime.datetime:
+    """Convert an offset-aware datetime to naive UTC, as `created_at` columns store it (naive values pass through)."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+def encode_cursor(created_at: datetime.datetime, row_id: uuid.UUID) -> str:
+    """Opaque keyset cursor for a (created_at, id) position."""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, uuid.UUID]:
+    """Inverse of encode_cursor. Raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return naive_utc(datetime.datetime.fromisoformat(created_at)), uuid.UUID(row_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,108 @@
+from typing import List, Optional, Tuple, Sequence
+from app.elo import process_session_elo
+
+def full_round_robin(n_options: int) -> int:
+    """Number of matches needed to compare every pair once."""
+    return n_options * (n_options - 1) // 2
+
+def required_matches(n_options: int, match_budget: Optional[int] = None) -> int:
+    """
+    Matches a session needs before it can be completed.
+
+    Without a budget every pair must be played. A budget is clamped between
+    n-1 (the fewest matches that can connect every option) and the full
+    round robin.
+    """
+    full = full_round_robin(n_options)
+    if match_budget is None:
+        return full
+    return max(min(match_budget, full), n_options - 1)
+
+class _Components:
+    """Union-find over option indices, used to keep the comparison graph connected."""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int):
+        self.parent[self.find(a)] = self.find(b)
+
+    def count(self) -> int:
+        return len({self.find(i) for i in range(len(self.parent))})
+
+def _index_matches(options, match_results):
+    index = {option.id: i for i, option in enumerate(options)}
+    pairs = []
+    for match in match_results:
+        pairs.append((index[match.winner_option_id], index[match.loser_option_id]))
+    return pairs
+
+def check_sufficient(options, match_results, match_budget: Optional[int] = None) -> Optional[str]:
+    """
+    Return None if the matches are enough to complete the session, else the reason they are not.
+
+    With no budget the session must hold exactly a full round robin. With a
+    budget it must hold at least the required number of matches and every
+    option must be connected to every other through the played pairs.
+    """
+    n_options = len(options)
+    played = len(match_results)
+    if match_budget is None:
+        expected = full_round_robin(n_options)
+        if played != expected:
+            return f"Session incomplete. Expected {expected} matches, got {played}"
+        return None
+    required = required_matches(n_options, match_budget)
+    if played < required:
+        return f"Session incomplete. Expected at least {required} matches, got {played}"
+    if played > full_round_robin(n_options):
+        return f"Session has {played} matches, more than the {full_round_robin(n_options)} possible pairs"
+    components = _Components(n_options)
+    for a, b in _index_matches(options, match_results):
+        components.union(a, b)
+    if n_options > 1 and components.count() > 1:
+        return "Session incomplete. Some options were never compared with the rest"
+    return None
+
+def next_pair(options: Sequence, match_results: List, match_budget: Optional[int] = None) -> Optional[Tuple[object, object]]:
+    """
+    Pick the next pair to show a voter, or None when the session has enough matches.
+
+    Swiss-style: among unplayed pairs, prefer ones that join still-disconnected
+    groups of options, then the least-played options (the most uncertain
+    ratings), then the closest current Elo ratings.
+    """
+    n_options = len(options)
+    if n_options < 2 or check_sufficient(options, match_results, match_budget) is None:
+        return None
+
+    played_pairs = set()
+    plays = [0] * n_options
+    components = _Components(n_options)
+    for a, b in _index_matches(options, match_results):
+        played_pairs.add((min(a, b), max(a, b)))
+        plays[a] += 1
+        plays[b] += 1
+        components.union(a, b)
+    ratings = process_session_elo(match_results=match_results, options=list(options))
+    roots = [components.find(i) for i in range(n_options)]
+
+    best = None
+    best_key = None
+    for a in range(n_options):
+        for b in range(a + 1, n_options):
+            if (a, b) in played_pairs:
+                continue
+            key = (roots[a] == roots[b], plays[a] + plays[b], abs(ratings[a] - ratings[b]))
+            if best_key is None or key < best_key:
+                best_key = key
+                best = (a, b)
+    if best is None:
+        return None
+    return options[best[0]], options[best[1]]
@@ -0,0 +1,92 @@
+"""
+In-process cache of a poll's metadata, its ordered options and their dense
+option index.
+
+Nearly every voting request needs the poll (match budget, ranking method)
+and its options; both are served from here instead of two queries. Entries
+are plain copies of the rows, detached from any database session, so one
+snapshot can be shared by concurrent requests.
+
+A snapshot is only kept once voting has started: from then on options can
+no longer be added (see `add_option_to_poll`), so a cached option list stays
+valid on every worker. Voting is checked before the options are read, so a
+list read after voting started is final. Before that, each call reads through.
+Every poll also has a version, bumped by `invalidate_poll_snapshot` when an
+option is inserted; a fill that raced an insert is returned but not stored.
+"""
+import itertools
+import os
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import TTLCache
+from app.crud import get_poll_by_id, list_options_by_poll, poll_has_voter_sessions
+from app.elo_engine import OptionIndex
+
+POLL_CACHE_SIZE = int(os.getenv("POLL_CACHE_SIZE", "4096"))
+# Cached snapshots are immutable in practice; the TTL only bounds memory held by idle polls
+POLL_CACHE_TTL = float(os.getenv("POLL_CACHE_TTL", "3600"))
+
+class PollSnapshot:
+    """A poll, its options (in `list_options_by_poll` order) and their OptionIndex, stamped with the poll's version."""
+
+    __slots__ = ("poll", "options", "index", "version")
+
+    def __init__(self, poll, options: List, version: int):
+        self.poll = poll
+        self.options = options
+        self.index = OptionIndex.from_options(options)
+        self.version = version
+
+def _copy_row(obj) -> SimpleNamespace:
+    # Column values only: no lazy loads, and a rollback in the loading session cannot expire it
+    return SimpleNamespace(**{attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs})
+
+_snapshots = TTLCache(maxsize=POLL_CACHE_SIZE, ttl=POLL_CACHE_TTL)
+# Versions come from one process-wide counter; only the POLL_CACHE_SIZE most recently
+# bumped polls are remembered, and a forgotten poll reads as the highest version forgotten
+_versions: "OrderedDict[str, int]" = OrderedDict()
+_version_clock = itertools.count(1)
+_version_floor = 0
+
+def poll_version(poll_id) -> int:
+    return _versions.get(str(poll_id), _version_floor)
+
+def invalidate_poll_snapshot(poll_id):
+    """Bump the poll's version and drop its snapshot; call after inserting an option."""
+    global _version_floor
+    key = str(poll_id)
+    _versions[key] = next(_version_clock)
+    _versions.move_to_end(key)
+    while len(_versions) > POLL_CACHE_SIZE:
+        _, forgotten = _versions.popitem(last=False)
+        _version_floor = max(_version_floor, forgotten)
+    _snapshots.delete(key)
+
+def cached_poll_snapshot(poll_id) -> Optional[PollSnapshot]:
+    """The poll's snapshot if it is cached, without touching the database."""
+    return _snapshots.get(str(poll_id))
+
+async def get_poll_snapshot(*, poll_id, session: AsyncSession) -> Optional[PollSnapshot]:
+    """The poll's snapshot, from cache when possible (None if the poll does not exist)."""
+    key = str(poll_id)
+    snapshot = _snapshots.get(key)
+    if snapshot is not None:
+        return snapshot
+    version = poll_version(key)
+    poll = await get_poll_by_id(poll_id=poll_id, session=session)
+    if poll is None:
+        return None
+    # Before the options: once a session exists no option can be added (another
+    # worker may insert one between a read of the options and this check)
+    voting_started = await poll_has_voter_sessions(poll_id=poll.id, session=session)
+    options = await list_options_by_poll(poll_id=poll.id, session=session)
+    snapshot = PollSnapshot(_copy_row(poll), [_copy_row(option) for option in options], version)
+    if voting_started and poll_version(key) == version:
+        _snapshots.set(key, snapshot)
+    return snapshot
+
+def get_poll_cache_stats() -> Dict[str, int]:
+    return {"size": len(_snapshots), "hits": _snapshots.hits, "misses": _snapshots.misses}
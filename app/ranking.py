@@ -0,0 +1,70 @@
+"""
+Bradley–Terry ranking over a poll's aggregated pairwise win matrix.
+
+Unlike the summed per-session Elo vectors, the fit depends only on how
+often each option beat each other option, so it is independent of match
+order and its cost depends on the number of options, not sessions.
+"""
+from typing import Dict, Optional, Tuple
+import math
+import numpy as np
+from app.cache import TTLCache
+
+BT_PRIOR = 0.1  # Pseudo-wins added to every pair, keeps strengths finite for unbeaten / winless options
+BT_MAX_ITER = 500
+BT_TOL = 1e-9
+ELO_SCALE = 400.0 / math.log(10.0)  # Report log-strengths on the Elo point scale
+
+# Last fitted strengths per poll, used to warm-start the next fit
+_warm_starts = TTLCache(maxsize=1024, ttl=3600)
+
+def fit_bradley_terry(
+    wins: np.ndarray,
+    init: Optional[np.ndarray] = None,
+    prior: float = BT_PRIOR,
+    max_iter: int = BT_MAX_ITER,
+    tol: float = BT_TOL,
+) -> Tuple[np.ndarray, int]:
+    """
+    Maximum-likelihood Bradley–Terry strengths via the MM algorithm (Hunter, 2004).
+
+    Args:
+        wins: (n, n) matrix, wins[i, j] = number of times option i beat option j
+        init: optional strengths to start from (e.g. the previous fit)
+
+    Returns:
+        (strengths normalized to geometric mean 1, iterations used)
+    """
+    n = wins.shape[0]
+    if n == 0:
+        return np.zeros(0), 0
+    wins = wins.astype(np.float64) + prior * (1.0 - np.eye(n))
+    games = wins + wins.T
+    total_wins = wins.sum(axis=1)
+    p = np.ones(n) if init is None or len(init) != n else np.clip(init.astype(np.float64), 1e-12, None)
+    for iteration in range(1, max_iter + 1):
+        denom = (games / (p[:, None] + p[None, :])).sum(axis=1)
+        new_p = total_wins / denom
+        new_p /= np.exp(np.log(new_p).mean())
+        if np.max(np.abs(new_p - p) / p) < tol:
+            return new_p, iteration
+        p = new_p
+    return p, max_iter
+
+def bradley_terry_scores(wins: np.ndarray, warm_start_key=None) -> np.ndarray:
+    """Mean-centered Bradley–Terry scores on the Elo scale, warm-started from the previous fit for the key."""
+    init = _warm_starts.get(warm_start_key) if warm_start_key is not None else None
+    strengths, _ = fit_bradley_terry(wins, init=init)
+    if warm_start_key is not None:
+        _warm_starts.set(warm_start_key, strengths)
+    return ELO_SCALE * np.log(strengths) if len(strengths) else strengths
+
+def win_matrix(counts, positions: Dict, n_options: int) -> np.ndarray:
+    """Dense (n, n) win matrix from (winner_option_id, loser_option_id, wins) rows."""
+    matrix = np.zeros((n_options, n_options), dtype=np.int64)
+    for winner_id, loser_id, wins in counts:
+        i = positions.get(winner_id)
+        j = positions.get(loser_id)
+        if i is not None and j is not None:
+            matrix[i, j] += wins
+    return matrix
@@ -2,9 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from datetime import datetime
+import asyncio
+import hashlib
+import logging
 import os
+import time
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from app.cache import TTLCache
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -13,29 +18,144 @@ SUPABASE_PROJECT_URL = os.getenv("SUPABASE_PROJECT_URL")
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
 SUPABASE_JWKS_URL = f"{SUPABASE_PROJECT_URL}/auth/v1/keys" if SUPABASE_PROJECT_URL else None
 
+# Verified-token cache and JWKS refresh settings
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+JWKS_REFRESH_INTERVAL = float(os.getenv("JWKS_REFRESH_INTERVAL", "600"))
+JWKS_MIN_REFETCH_INTERVAL = float(os.getenv("JWKS_MIN_REFETCH_INTERVAL", "30"))  # Rate limit for kid-miss refetches
+
+logger = logging.getLogger("elovote.auth")
+
 bearer_scheme = HTTPBearer()
 jwks_cache = {}
+_jwks_fetched_at = 0.0
+_jwks_inflight: Optional[asyncio.Task] = None
+_jwks_refresh_task: Optional[asyncio.Task] = None
+_http_client: Optional[httpx.AsyncClient] = None
+
+# sha256(token) -> verified claims; entries never outlive the token's exp
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
 
-async def get_jwks() -> Dict[str, Any]:
-    """Fetch Supabase's public JWKS for JWT verification."""
+def get_http_client() -> httpx.AsyncClient:
+    """Shared HTTP client, so JWKS fetches reuse pooled connections."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=10.0)
+    return _http_client
+
+async def _fetch_jwks() -> Dict[str, Any]:
+    global _jwks_fetched_at
+    try:
+        resp = await get_http_client().get(SUPABASE_JWKS_URL)
+        resp.raise_for_status()
+        keys = resp.json()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch JWKS: {str(e)}"
+        )
+    jwks_cache.clear()
+    jwks_cache.update(keys)
+    _jwks_fetched_at = time.monotonic()
+    return jwks_cache
+
+async def get_jwks(force: bool = False) -> Dict[str, Any]:
+    """
+    Fetch Supabase's public JWKS for JWT verification.
+
+    The keys are cached; concurrent callers that need a fetch share a single
+    in-flight request instead of stampeding the JWKS URL.
+    """
+    global _jwks_inflight
     if not SUPABASE_JWKS_URL:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="SUPABASE_PROJECT_URL not configured"
         )
-    
-    if not jwks_cache:
+
+    if jwks_cache and not force:
+        return jwks_cache
+    if _jwks_inflight is None or _jwks_inflight.done():
+        _jwks_inflight = asyncio.ensure_future(_fetch_jwks())
+    return await asyncio.shield(_jwks_inflight)
+
+def _has_kid(jwks: Dict[str, Any], kid: Optional[str]) -> bool:
+    return kid is None or any(key.get("kid") == kid for key in jwks.get("keys", []))
+
+async def _get_jwks_for_token(token: str) -> Dict[str, Any]:
+    """JWKS that can verify `token`, refetching (rate-limited) when its kid is unknown, e.g. after key rotation."""
+    jwks = await get_jwks()
+    kid = jwt.get_unverified_header(token).get("kid")
+    if not _has_kid(jwks, kid) and time.monotonic() - _jwks_fetched_at >= JWKS_MIN_REFETCH_INTERVAL:
+        jwks = await get_jwks(force=True)
+    return jwks
+
+async def _refresh_jwks_periodically():
+    while True:
+        await asyncio.sleep(JWKS_REFRESH_INTERVAL)
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(SUPABASE_JWKS_URL)
-                resp.raise_for_status()
-                jwks_cache.update(resp.json())
+            await get_jwks(force=True)
         except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to fetch JWKS: {str(e)}"
-            )
-    return jwks_cache
+            logger.warning("JWKS refresh failed: %s", getattr(e, "detail", e))
+
+async def start_auth_background():
+    """Warm the JWKS cache and start refreshing it in the background (no-op without JWKS)."""
+    global _jwks_refresh_task
+    if not SUPABASE_JWKS_URL:
+        return
+    try:
+        await get_jwks(force=True)
+    except HTTPException as e:
+        logger.warning("Initial JWKS fetch failed: %s", e.detail)
+    _jwks_refresh_task = asyncio.create_task(_refresh_jwks_periodically())
+
+async def stop_auth_background():
+    """Stop the JWKS refresh task and close the shared HTTP client."""
+    global _jwks_refresh_task, _http_client
+    if _jwks_refresh_task is not None:
+        _jwks_refresh_task.cancel()
+        try:
+            await _jwks_refresh_task
+        except asyncio.CancelledError:
+            pass
+        _jwks_refresh_task = None
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+async def _verify_token(token: str) -> Dict[str, Any]:
+    """Verify the token signature and return its claims."""
+    # Try JWKS verification first (more secure)
+    if SUPABASE_JWKS_URL:
+        jwks = await _get_jwks_for_token(token)
+        return jwt.decode(
+            token,
+            jwks,
+            algorithms=["RS256"],
+            options={"verify_aud": False}
+        )
+    # Fallback to JWT_SECRET
+    if SUPABASE_JWT_SECRET:
+        return jwt.decode(
+            token,
+            SUPABASE_JWT_SECRET,
+            algorithms=["HS256"],
+            options={"verify_aud": False}
+        )
+    raise HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail="No JWT verification method configured"
+    )
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _cache_verified(token_key: str, payload: Dict[str, Any]):
+    ttl = TOKEN_CACHE_TTL
+    if payload.get("exp"):
+        ttl = min(ttl, payload["exp"] - datetime.utcnow().timestamp())
+    if ttl > 0:
+        token_cache.set(token_key, payload, ttl=ttl)
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
@@ -49,32 +169,18 @@ async def get_current_user(
     3. Fallback to JWT_SECRET if JWKS fails
     4. Check token expiration
     5. Return user payload
+
+    Verified claims are cached by token hash until the token expires, so
+    repeat requests skip signature verification.
     """
     token = credentials.credentials
+    token_key = _token_key(token)
     
     try:
-        # Try JWKS verification first (more secure)
-        if SUPABASE_JWKS_URL:
-            jwks = await get_jwks()
-            payload = jwt.decode(
-                token,
-                jwks,
-                algorithms=["RS256"],
-                options={"verify_aud": False}
-            )
-        # Fallback to JWT_SECRET
-        elif SUPABASE_JWT_SECRET:
-            payload = jwt.decode(
-                token,
-                SUPABASE_JWT_SECRET,
-                algorithms=["HS256"],
-                options={"verify_aud": False}
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="No JWT verification method configured"
-            )
+        payload = token_cache.get(token_key)
+        if payload is None:
+            payload = await _verify_token(token)
+            _cache_verified(token_key, payload)
         
         # Check token expiration
         if payload.get("exp"):
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, Dict
+from app.database import get_all_pool_stats
+from app.instrumentation import get_route_metrics
+from app.completion import get_completion_stats
+from app.crud import read_coalescer
+from app.poll_cache import get_poll_cache_stats
+from app.routes.auth import get_current_user
+
+async def require_superadmin(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+    """Metrics expose per-route internals and poll ids, so only superadmins may read them."""
+    user_role = user.get("role") or user.get("is_superadmin")
+    is_superadmin = (user_role == "superadmin" or user_role is True)
+    if not is_superadmin:
+        raise HTTPException(status_code=403, detail="Not authorized to read metrics")
+    return user
+
+router = APIRouter(prefix="/metrics", tags=["metrics"], dependencies=[Depends(require_superadmin)])
+
+@router.get("/pool")
+async def pool_metrics():
+    """Connection pool occupancy and acquisition wait times (per engine), and read routing counters."""
+    return get_all_pool_stats()
+
+@router.get("/requests")
+async def request_metrics():
+    """Per-route latency histograms with average query count, DB time and pool wait."""
+    return get_route_metrics()
+
+@router.get("/completions")
+async def completion_metrics():
+    """Write-behind completion workers: batches, sessions and polls aggregated."""
+    return get_completion_stats()
+
+@router.get("/coalescing")
+async def coalescing_metrics():
+    """Single-flight read coalescing: calls, queries actually run and callers coalesced, in total and per key."""
+    return read_coalescer.stats()
+
+@router.get("/poll-cache")
+async def poll_cache_metrics():
+    """Cached poll snapshots (poll, options and option index): entries, hits and misses."""
+    return get_poll_cache_stats()
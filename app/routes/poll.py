@@ -1,16 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from app.schemas import PollCreate, PollOut, LeaderboardEntry, LeaderboardResponse, OptionCreate, OptionOut, OptionBase
-from app.crud import create_poll, list_polls, get_poll_by_id, list_options_by_poll, list_global_scores_by_poll, get_voter_session_by_id, create_option
-from app.database import get_async_session
+from app.schemas import PollCreate, PollOut, LeaderboardEntry, LeaderboardResponse, PairwiseMatrixOut, OptionCreate, OptionOut, OptionBase
+from app.crud import create_poll, list_polls, estimate_poll_count, get_poll_by_id, get_voter_session_by_id, create_option
+from app.database import get_async_session, get_async_read_session, get_sessionmaker
 from app.routes.auth import get_current_user
+from app.leaderboard import get_poll_leaderboard, get_poll_leaderboard_body, invalidate_poll_leaderboard, load_win_matrix
+from app.serialization import FAST_JSON, raw_json_response, trusted_json_response
+from app.events import broker, format_sse
+from app.poll_cache import get_poll_snapshot, cached_poll_snapshot, invalidate_poll_snapshot
+from app.models import VoterSession
+from app.pagination import encode_cursor, decode_cursor, naive_utc
+from app.export import export_chunks, gzip_chunks, EXPORT_FORMATS, EXPORT_KINDS, MEDIA_TYPES
+from pydantic import EmailStr
+from datetime import datetime
 from uuid import UUID
-import random
+import asyncio
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 
 router = APIRouter(prefix="/polls", tags=["polls"])
 
+SSE_KEEPALIVE_SECONDS = 15.0
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
 @router.post("/", response_model=PollOut)
 async def create_poll_endpoint(
     poll: PollCreate,
@@ -21,103 +36,240 @@ async def create_poll_endpoint(
 
 @router.get("/", response_model=List[PollOut])
 async def list_polls_endpoint(
-    session: AsyncSession = Depends(get_async_session),
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    creator_email: Optional[EmailStr] = Query(None),
+    is_verified: Optional[bool] = Query(None),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+    include_total: bool = Query(False, description="Add an X-Total-Estimate header (planner estimate, not COUNT(*))"),
+    session: AsyncSession = Depends(get_async_read_session),
     user=Depends(get_current_user)  # Add auth requirement
 ):
-    """List all polls. Requires authentication to prevent unauthorized access."""
-    return await list_polls(session=session)
+    """
+    List polls, newest first, one keyset page at a time. Requires authentication to prevent unauthorized access.
+
+    The next page's cursor is returned in the X-Next-Cursor header (and a
+    Link rel="next" header); it is absent on the last page.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    filters = dict(
+        creator_email=creator_email,
+        is_verified=is_verified,
+        # Timestamps are stored as naive UTC; asyncpg rejects comparing them with aware values
+        created_after=naive_utc(created_after) if created_after else None,
+        created_before=naive_utc(created_before) if created_before else None,
+    )
+    polls = await list_polls(session, limit=limit + 1, after=after, **filters)
+    if len(polls) > limit:
+        polls = polls[:limit]
+        next_cursor = encode_cursor(polls[-1].created_at, polls[-1].id)
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    if include_total:
+        response.headers["X-Total-Estimate"] = str(await estimate_poll_count(session, **filters))
+    return polls
 
 @router.get("/{poll_id}", response_model=PollOut)
 async def get_poll_by_id_endpoint(
     poll_id: str,
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_async_read_session)
 ) -> PollOut:
-    poll = await get_poll_by_id(poll_id=poll_id, session=session)
+    # A cached snapshot, else just the poll row (a snapshot fill would cost three queries)
+    snapshot = cached_poll_snapshot(poll_id)
+    poll = snapshot.poll if snapshot else await get_poll_by_id(poll_id=poll_id, session=session)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     return poll
 
+async def _authorize_leaderboard_view(poll, user, session: AsyncSession):
+    """Raise 403 unless the user created the poll, is a superadmin, or has completed a session in it."""
+    # Get user info
+    user_email = user.get("email")
+    user_role = user.get("role") or user.get("is_superadmin")
+
+    # Check if user is poll creator, superadmin, or has completed session
+    is_creator = (poll.creator_email == user_email)
+    is_superadmin = (user_role == "superadmin" or user_role is True)
+    if is_creator or is_superadmin:
+        return
+    # Check for completed session for this poll and user
+    result = await session.execute(
+        select(VoterSession.id).where(
+            (VoterSession.poll_id == poll.id) &
+            (VoterSession.voter_email == user_email) &
+            (VoterSession.is_complete == True)
+        ).limit(1)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=403, detail="Not authorized to view leaderboard for this poll")
+
 @router.get("/{poll_id}/leaderboard", response_model=LeaderboardResponse)
 async def get_leaderboard(
     poll_id: str,
+    response: Response,
     view_all: bool = Query(False, description="Return all options if true, else top 10"),
-    session: AsyncSession = Depends(get_async_session),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="With view_all: page size (default: every option)"),
+    offset: int = Query(0, ge=0, description="With view_all: entries to skip"),
+    session: AsyncSession = Depends(get_async_read_session),
     user=Depends(get_current_user)
 ):
     # 1. Check poll exists
-    poll = await get_poll_by_id(poll_id=poll_id, session=session)
-    if not poll:
+    snapshot = await get_poll_snapshot(poll_id=poll_id, session=session)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Poll not found or no longer exists")
+    poll = snapshot.poll
+
+    # 2. Check the user may see the leaderboard
+    await _authorize_leaderboard_view(poll, user, session)
+
+    # 3. Pagination: top 10, everything, or a page of everything
+    if not view_all:
+        limit, offset = 10, 0
+    paged = view_all and (limit is not None or offset > 0)
+
+    # 4. Ranked leaderboard (cached; invalidated when sessions complete or options change)
+    if FAST_JSON and not paged:
+        body = await get_poll_leaderboard_body(
+            poll_id=poll.id, session=session, ranking_method=poll.ranking_method, top=limit
+        )
+        return raw_json_response(body)
+    leaderboard = await get_poll_leaderboard(
+        poll_id=poll.id, session=session, ranking_method=poll.ranking_method, limit=limit, offset=offset
+    )
+    headers = {}
+    if paged and len(leaderboard["entries"]) == limit:
+        headers["X-Next-Offset"] = str(offset + limit)
+    if FAST_JSON:
+        return trusted_json_response({"leaderboard": leaderboard["entries"]}, headers=headers)
+    response.headers.update(headers)
+    entries = [LeaderboardEntry(**entry) for entry in leaderboard["entries"]]
+    return LeaderboardResponse(leaderboard=entries)
+
+@router.get("/{poll_id}/pairwise", response_model=PairwiseMatrixOut)
+async def get_pairwise_matrix(
+    poll_id: str,
+    session: AsyncSession = Depends(get_async_read_session),
+    user=Depends(get_current_user)
+):
+    snapshot = await get_poll_snapshot(poll_id=poll_id, session=session)
+    if not snapshot:
         raise HTTPException(status_code=404, detail="Poll not found or no longer exists")
+    poll, options = snapshot.poll, snapshot.options
+    await _authorize_leaderboard_view(poll, user, session)
 
-    # 2. Get user info
-    user_id = user.get("sub")
+    wins = await load_win_matrix(poll_id=poll.id, options=options, session=session)
+    n = len(options)
+    return PairwiseMatrixOut(
+        option_ids=[option.id for option in options],
+        wins=wins.astype(int).tolist() if wins is not None else [[0] * n for _ in range(n)]
+    )
+
+@router.get("/{poll_id}/export")
+async def export_poll(
+    poll_id: str,
+    format: str = Query("ndjson", description="ndjson or csv"),
+    kind: str = Query("matches", description="matches, sessions, scores, or all (ndjson only)"),
+    gzip: bool = Query(False, description="Gzip-compress the stream"),
+    session: AsyncSession = Depends(get_async_session),
+    user=Depends(get_current_user)
+):
+    """
+    Stream a poll's raw data for offline analysis.
+
+    Rows are read through server-side cursors and written in small chunks,
+    so memory use does not depend on the size of the poll. Only the poll
+    creator or a superadmin may export (sessions include voter emails).
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if kind not in EXPORT_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(EXPORT_KINDS)}")
+    if kind == "all" and format == "csv":
+        raise HTTPException(status_code=400, detail="kind=all is only available as ndjson")
+
+    snapshot = await get_poll_snapshot(poll_id=poll_id, session=session)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Poll not found or no longer exists")
+    poll = snapshot.poll
     user_email = user.get("email")
     user_role = user.get("role") or user.get("is_superadmin")
-
-    # 3. Check if user is poll creator, superadmin, or has completed session
     is_creator = (poll.creator_email == user_email)
     is_superadmin = (user_role == "superadmin" or user_role is True)
-    has_voted = False
-    # Check for completed session for this poll and user
-    from app.models import VoterSession
-    result = await session.execute(
-        select(VoterSession).where(
-            (VoterSession.poll_id == poll_id) &
-            (VoterSession.voter_email == user_email) &
-            (VoterSession.is_complete == True)
-        )
-    )
-    if result.scalar_one_or_none():
-        has_voted = True
-    if not (is_creator or is_superadmin or has_voted):
-        raise HTTPException(status_code=403, detail="Not authorized to view leaderboard for this poll")
+    if not (is_creator or is_superadmin):
+        raise HTTPException(status_code=403, detail="Not authorized to export this poll")
 
-    # 4. Get all options for the poll
-    options = await list_options_by_poll(poll_id=poll_id, session=session)
-    option_id_to_label = {str(option.id): option.label for option in options}
-
-    # 5. Get global scores for the poll
-    global_scores = await list_global_scores_by_poll(poll_id=poll_id, session=session)
-    option_id_to_score = {str(score.option_id): score.total_score for score in global_scores}
-
-    # 6. Build leaderboard entries
-    entries = []
-    if global_scores:
-        # There are votes, so build leaderboard with scores
-        for option in options:
-            score = option_id_to_score.get(str(option.id), 0.0)
-            entries.append({
-                "label": option.label,
-                "score": score,
-                "option_id": str(option.id)
-            })
-        # Sort by score descending, stable by previous order
-        entries.sort(key=lambda x: (-x["score"]))
-        # Assign ranks (ties share rank, stable order)
-        leaderboard = []
-        prev_score = None
-        prev_rank = 0
-        for idx, entry in enumerate(entries):
-            if prev_score is not None and entry["score"] == prev_score:
-                rank = prev_rank
+    # The request's session is closed before the body streams, so the export opens its own.
+    # REPEATABLE READ keeps sessions, matches and scores consistent with each other.
+    async def body():
+        async with get_sessionmaker()() as export_session:
+            await export_session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            chunks = export_chunks(poll_id=poll.id, session=export_session, kind=kind, fmt=format)
+            if gzip:
+                async for chunk in gzip_chunks(chunks):
+                    yield chunk
             else:
-                rank = idx + 1
-            leaderboard.append(LeaderboardEntry(label=entry["label"], score=entry["score"], rank=rank))
-            prev_score = entry["score"]
-            prev_rank = rank
-    else:
-        # No votes yet: show all options, random order, score 0, rank 'NA'
-        random.shuffle(options)
-        leaderboard = [LeaderboardEntry(label=option.label, score=0.0, rank="NA") for option in options]
-        if not view_all:
-            leaderboard = leaderboard[:10]
-        return LeaderboardResponse(leaderboard=leaderboard)
-
-    # 7. Pagination: top 10 or all
-    if not view_all:
-        leaderboard = leaderboard[:10]
+                async for chunk in chunks:
+                    yield chunk
+
+    filename = f"poll-{poll.id}-{kind}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        body(),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
-    return LeaderboardResponse(leaderboard=leaderboard)
+@router.get("/{poll_id}/leaderboard/stream")
+async def stream_leaderboard(
+    poll_id: str,
+    session: AsyncSession = Depends(get_async_read_session),
+    user=Depends(get_current_user)
+):
+    """
+    Server-Sent Events stream of a poll's leaderboard.
+
+    Sends a `snapshot` event with the full ranked list, then `diff` events
+    with only the entries whose score or rank changed. Completions are
+    coalesced to at most one push per interval, and one reload serves every
+    watcher of the poll on this worker.
+    """
+    snapshot = await get_poll_snapshot(poll_id=poll_id, session=session)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Poll not found or no longer exists")
+    poll = snapshot.poll
+    await _authorize_leaderboard_view(poll, user, session)
+
+    snapshot = broker.snapshot(poll.id)
+    if snapshot is None:
+        snapshot = (await get_poll_leaderboard(poll_id=poll.id, session=session, ranking_method=poll.ranking_method))["entries"]
+        broker.set_snapshot(poll.id, snapshot)
+    queue = broker.subscribe(poll.id)
+
+    async def events():
+        try:
+            yield format_sse({"event": "snapshot", "data": {"leaderboard": snapshot}})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            broker.unsubscribe(poll.id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.post("/{poll_id}/options/", response_model=OptionOut)
 async def add_option_to_poll(
@@ -126,7 +278,7 @@ async def add_option_to_poll(
     session: AsyncSession = Depends(get_async_session),
     user=Depends(get_current_user)
 ):
-    # 1. Check poll exists
+    # 1. Check poll exists (options are still changing here, so not from the poll cache)
     poll = await get_poll_by_id(poll_id=poll_id, session=session)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
@@ -148,15 +300,14 @@ async def add_option_to_poll(
     if match_result.scalars().first():
         raise HTTPException(status_code=403, detail="Cannot add options after voting has started")
 
-    # 4. Enforce unique label (case- and whitespace-insensitive)
-    options = await list_options_by_poll(poll_id=poll_id, session=session)
-    new_label_norm = ''.join(option.label.lower().split())
-    for existing in options:
-        existing_label_norm = ''.join(existing.label.lower().split())
-        if new_label_norm == existing_label_norm:
-            raise HTTPException(status_code=409, detail="Option label must be unique (case- and whitespace-insensitive)")
-
-    # 5. Create option
+    # 4. Create option; the uq_options_poll_label_norm index enforces unique labels
+    #    (case- and whitespace-insensitive)
     option_create = OptionCreate(label=option.label, poll_id=poll.id)
-    db_option = await create_option(option=option_create, session=session)
+    try:
+        db_option = await create_option(option=option_create, session=session)
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=409, detail="Option label must be unique (case- and whitespace-insensitive)")
+    invalidate_poll_snapshot(poll.id)
+    await invalidate_poll_leaderboard(poll.id)
     return db_option 
\ No newline at end of file
@@ -1,15 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from uuid import UUID
-from app.schemas import VoterSessionCreate, VoterSessionOut, MatchResultCreate, MatchResultOut, LeaderboardEntry, LeaderboardResponse
-from app.crud import create_voter_session, get_voter_session_by_id, create_match_result, list_match_results_by_session, list_options_by_poll, upsert_global_score
-from app.database import get_async_session
+from app.schemas import VoterSessionCreate, VoterSessionOut, MatchResultCreate, MatchResultOut, MatchResultBulkCreate, MatchResultBulkOut, NextPairOut, SessionStatusOut, LeaderboardEntry, LeaderboardResponse
+from app.crud import create_voter_session, get_voter_session_by_id, create_match_result, create_match_results_bulk, get_match_result_by_index, get_option_by_id, list_match_results_by_session, enqueue_completion, get_completion_attempts, get_voter_session_with_scores, create_session_scores
+from app.database import get_async_session, get_async_read_session
 from app.routes.auth import get_current_user
 from app.elo import process_session_elo, mean_center
-from typing import Dict, Any
+from app.elo_engine import pack_scores, unpack_scores
+from app.pairing import check_sufficient, next_pair, required_matches
+from app.leaderboard import rank_entries, invalidate_poll_leaderboard, session_leaderboard_cache
+from app.aggregation import add_session_scores, add_session_pairwise
+from app.events import notify_leaderboard_change, push_leaderboard_change
+from app.poll_cache import get_poll_snapshot
+from app.serialization import FAST_JSON, trusted_json_response
+from app import idempotency
+from app.completion import async_completion_enabled, wake as wake_completion_worker, COMPLETION_MAX_ATTEMPTS
+from typing import Optional
+import datetime
 
 router = APIRouter(prefix="/votes", tags=["votes"])
 
+# Unique keys of match_results: a violation means the match (or its pair) is already recorded
+MATCH_UNIQUE_CONSTRAINTS = ("uq_match_results_session_match_index", "uq_match_results_session_pair")
+
+def _violated_constraint(error: IntegrityError) -> Optional[str]:
+    # The driver's exception (asyncpg's carries constraint_name) is the cause of the DBAPI error
+    return getattr(getattr(error.orig, "__cause__", None), "constraint_name", None)
+
+async def _get_poll_snapshot(poll_id, session: AsyncSession):
+    """The session's poll with its options (cached), or 404."""
+    snapshot = await get_poll_snapshot(poll_id=poll_id, session=session)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Poll not found")
+    return snapshot
+
+def _validate_session_matches(options, match_results, match_budget):
+    """Raise 400 unless the matches are enough to complete the session under the poll's budget."""
+    reason = check_sufficient(options, match_results, match_budget)
+    if reason:
+        raise HTTPException(status_code=400, detail=reason)
+
+def _status_url(session_id) -> str:
+    return router.url_path_for("get_session_status", session_id=str(session_id))
+
+async def _finalize_session(voter_session, options, match_results, session: AsyncSession) -> bool:
+    """
+    Fold a session's Elo vector into the global scores and mark it complete, in one commit.
+
+    Callers must hold the session row lock (get_voter_session_by_id(for_update=True))
+    so a retried or concurrent completion cannot add the same session twice.
+    With COMPLETION_MODE=async the session is marked complete and queued for the
+    aggregation workers instead; returns True when that happened.
+    """
+    if async_completion_enabled():
+        voter_session.is_complete = True
+        voter_session.completed_at = datetime.datetime.utcnow()
+        await enqueue_completion(session_id=voter_session.id, poll_id=voter_session.poll_id, session=session, commit=False)
+        await session.commit()
+        wake_completion_worker()
+        return True
+
+    # Calculate Elo scores for the session
+    elo_scores = process_session_elo(match_results=match_results, options=options)
+
+    # Normalize the scores (mean-center)
+    normalized_scores = mean_center(elo_scores)
+
+    # Keep the raw vector: the session's own leaderboard is served from it
+    await create_session_scores(
+        rows=[(voter_session.id, voter_session.poll_id, pack_scores(elo_scores))], session=session, commit=False
+    )
+
+    # Aggregate normalized scores into global scores (one multi-row upsert, sharded if enabled)
+    await add_session_scores(
+        poll_id=voter_session.poll_id,
+        session_id=voter_session.id,
+        scores=[(option.id, score) for option, score in zip(options, normalized_scores)],
+        session=session
+    )
+    # Keep the poll's pairwise win matrix (used by Bradley–Terry ranking) in step
+    await add_session_pairwise(
+        poll_id=voter_session.poll_id, session_id=voter_session.id, match_results=match_results, session=session
+    )
+
+    # Mark session as complete
+    voter_session.is_complete = True
+    voter_session.completed_at = datetime.datetime.utcnow()
+    await notify_leaderboard_change(voter_session.poll_id, session)
+    await session.commit()
+    await session.refresh(voter_session)
+    await invalidate_poll_leaderboard(voter_session.poll_id)
+    push_leaderboard_change(voter_session.poll_id)
+    return False
+
 @router.post("/session/", response_model=VoterSessionOut)
 async def start_voter_session(
     session_data: VoterSessionCreate,
@@ -21,17 +106,179 @@ async def start_voter_session(
 @router.post("/match/", response_model=MatchResultOut)
 async def submit_match_result(
     match: MatchResultCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    session: AsyncSession = Depends(get_async_session),
+    user=Depends(get_current_user)
+):
+    """
+    Record one match result. Safe to retry.
+
+    With an Idempotency-Key header, a retry returns the stored original
+    response. Without one, resubmitting the same match for the same
+    (session_id, match_index) returns the row already recorded; a different
+    match under that index or an already played pair is a 409.
+    """
+    key = idempotency.scoped_key(user, idempotency_key) if idempotency_key else None
+    request_fingerprint = idempotency.fingerprint(match.model_dump(mode="json"))
+    if key:
+        record = await idempotency.lookup(key=key, session=session)
+        if record is not None:
+            return idempotency.replay(record, request_fingerprint)
+
+    try:
+        db_match = await create_match_result(match=match, session=session, commit=False)
+        body = MatchResultOut.model_validate(db_match).model_dump(mode="json")
+        if key and not await idempotency.save(key=key, request_fingerprint=request_fingerprint, status_code=200, body=body, session=session):
+            # Another request holding the same key committed first; answer as it did
+            await session.rollback()
+            record = await idempotency.lookup(key=key, session=session)
+            if record is None:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is already in progress")
+            return idempotency.replay(record, request_fingerprint)
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        # Natural key: the same match under the same index is a retry of a write that already landed
+        existing = await get_match_result_by_index(session_id=match.session_id, match_index=match.match_index, session=session)
+        if existing is not None:
+            if existing.winner_option_id == match.winner_option_id and existing.loser_option_id == match.loser_option_id:
+                body = MatchResultOut.model_validate(existing).model_dump(mode="json")
+                return JSONResponse(content=body, headers={idempotency.REPLAY_HEADER: "true"})
+            raise HTTPException(status_code=409, detail="Match index already submitted for this session")
+        if _violated_constraint(e) in MATCH_UNIQUE_CONSTRAINTS:
+            raise HTTPException(status_code=409, detail="Match index or pair already submitted for this session")
+        # Otherwise a foreign key: the session or an option does not exist
+        if await get_voter_session_by_id(session_id=match.session_id, session=session) is None:
+            raise HTTPException(status_code=404, detail="Voter session not found")
+        for option_id in (match.winner_option_id, match.loser_option_id):
+            if await get_option_by_id(option_id=option_id, session=session) is None:
+                raise HTTPException(status_code=400, detail=f"Option {option_id} does not exist")
+        raise HTTPException(status_code=409, detail="Match conflicts with existing data")
+    if key:
+        idempotency.remember(key=key, request_fingerprint=request_fingerprint, status_code=200, body=body)
+    return body
+
+@router.post("/session/{session_id}/matches:bulk", response_model=MatchResultBulkOut)
+async def submit_match_results_bulk(
+    session_id: UUID,
+    payload: MatchResultBulkCreate,
     session: AsyncSession = Depends(get_async_session),
     user=Depends(get_current_user)
 ):
-    return await create_match_result(match=match, session=session)
+    """
+    Submit many (or all) match results of a session in one request.
+
+    The batch is validated in memory against the poll's options and the matches
+    already recorded, written with multi-row INSERTs, and optionally the session
+    is completed in the same transaction.
+    """
+    voter_session = await get_voter_session_by_id(session_id=session_id, session=session, for_update=True)
+    if not voter_session:
+        raise HTTPException(status_code=404, detail="Voter session not found")
+    if voter_session.voter_email != user.get("email"):
+        raise HTTPException(status_code=403, detail="Not authorized to submit matches for this session")
+    if voter_session.is_complete:
+        raise HTTPException(status_code=400, detail="Session is already complete")
+
+    snapshot = await _get_poll_snapshot(voter_session.poll_id, session)
+    options = snapshot.options
+    option_ids = snapshot.index.positions
+    existing = await list_match_results_by_session(session_id=session_id, session=session)
+
+    # Validate the batch: known options, no self-matches, no repeated pairs, contiguous indices
+    seen_pairs = {frozenset((m.winner_option_id, m.loser_option_id)) for m in existing}
+    for match in payload.matches:
+        if match.winner_option_id not in option_ids or match.loser_option_id not in option_ids:
+            raise HTTPException(status_code=400, detail=f"Match {match.match_index} references an option outside this poll")
+        if match.winner_option_id == match.loser_option_id:
+            raise HTTPException(status_code=400, detail=f"Match {match.match_index} pits an option against itself")
+        pair = frozenset((match.winner_option_id, match.loser_option_id))
+        if pair in seen_pairs:
+            raise HTTPException(status_code=400, detail=f"Match {match.match_index} repeats an already submitted pair")
+        seen_pairs.add(pair)
+    indices = sorted(match.match_index for match in payload.matches)
+    expected_indices = list(range(len(existing), len(existing) + len(payload.matches)))
+    if indices != expected_indices:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Match indices must be contiguous from {len(existing)} to {len(existing) + len(payload.matches) - 1}"
+        )
+
+    matches = sorted(payload.matches, key=lambda m: m.match_index)
+    if payload.complete:
+        _validate_session_matches(options, existing + matches, snapshot.poll.match_budget)
+
+    try:
+        inserted = await create_match_results_bulk(session_id=session_id, matches=matches, session=session, commit=False)
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=409, detail="Match index or pair already submitted for this session")
+    queued = False
+    if payload.complete:
+        queued = await _finalize_session(voter_session, options, existing + matches, session)
+    else:
+        await session.commit()
+
+    return MatchResultBulkOut(
+        session_id=session_id,
+        inserted=inserted,
+        completed=payload.complete,
+        status_url=_status_url(session_id) if queued else None
+    )
+
+@router.get("/session/{session_id}/next", response_model=NextPairOut)
+async def get_next_pair(
+    session_id: UUID,
+    session: AsyncSession = Depends(get_async_session),
+    user=Depends(get_current_user)
+):
+    """
+    Return the next pair the voter should compare.
+
+    Pairs are scheduled adaptively from the session's current Elo ratings, so
+    polls with a match budget reach a stable ranking in far fewer than
+    n(n-1)/2 matches. `is_done` is set once the session can be completed.
+    """
+    voter_session = await get_voter_session_by_id(session_id=session_id, session=session)
+    if not voter_session:
+        raise HTTPException(status_code=404, detail="Voter session not found")
+    if voter_session.voter_email != user.get("email"):
+        raise HTTPException(status_code=403, detail="Not authorized to vote in this session")
+    if voter_session.is_complete:
+        raise HTTPException(status_code=400, detail="Session is already complete")
+
+    snapshot = await _get_poll_snapshot(voter_session.poll_id, session)
+    options = snapshot.options
+    match_results = await list_match_results_by_session(session_id=session_id, session=session)
+    match_budget = snapshot.poll.match_budget
+    pair = next_pair(options, match_results, match_budget)
+    return NextPairOut(
+        session_id=session_id,
+        option_a_id=pair[0].id if pair else None,
+        option_b_id=pair[1].id if pair else None,
+        match_index=len(match_results),
+        required_matches=required_matches(len(options), match_budget),
+        is_done=pair is None,
+    )
 
 @router.get("/session/{session_id}/results", response_model=list[MatchResultOut])
 async def get_session_results(
     session_id: UUID,
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_async_read_session)
 ):
-    return await list_match_results_by_session(session_id=session_id, session=session)
+    match_results = await list_match_results_by_session(session_id=session_id, session=session)
+    if FAST_JSON:
+        return trusted_json_response([
+            {
+                "session_id": m.session_id,
+                "winner_option_id": m.winner_option_id,
+                "loser_option_id": m.loser_option_id,
+                "match_index": m.match_index,
+                "id": m.id,
+            }
+            for m in match_results
+        ])
+    return match_results
 
 @router.post("/session/{session_id}/complete")
 async def complete_voter_session(
@@ -45,8 +292,8 @@ async def complete_voter_session(
     Validates session ownership, checks completion, calculates Elo scores,
     normalizes them, and adds to global leaderboard.
     """
-    # Get the voter session
-    voter_session = await get_voter_session_by_id(session_id=session_id, session=session)
+    # Get the voter session, locking its row until the completion commits
+    voter_session = await get_voter_session_by_id(session_id=session_id, session=session, for_update=True)
     if not voter_session:
         raise HTTPException(status_code=404, detail="Voter session not found")
     
@@ -58,93 +305,97 @@ async def complete_voter_session(
     if voter_session.is_complete:
         raise HTTPException(status_code=400, detail="Session is already complete")
     
-    # Get all options for the poll
-    options = await list_options_by_poll(poll_id=voter_session.poll_id, session=session)
-    n_options = len(options)
-    expected_matches = n_options * (n_options - 1) // 2
-    
+    # Get the poll and all its options (cached once voting has started)
+    snapshot = await _get_poll_snapshot(voter_session.poll_id, session)
+    options = snapshot.options
+
     # Get all match results for this session
     match_results = await list_match_results_by_session(session_id=session_id, session=session)
-    
-    # Validate that all matches are completed
-    if len(match_results) != expected_matches:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Session incomplete. Expected {expected_matches} matches, got {len(match_results)}"
-        )
-    
-    # Calculate Elo scores for the session
-    elo_scores = process_session_elo(match_results=match_results, options=options)
-    
-    # Normalize the scores (mean-center)
-    normalized_scores = mean_center(elo_scores)
-    
-    # Aggregate normalized scores into global scores
-    for option, normalized_score in zip(options, normalized_scores):
-        await upsert_global_score(
-            poll_id=voter_session.poll_id,
-            option_id=option.id,
-            total_score=normalized_score,
-            session=session
-        )
-    
-    # Mark session as complete
-    voter_session.is_complete = True
-    await session.commit()
-    await session.refresh(voter_session)
-    
+
+    # Validate that enough matches were played (all pairs unless the poll sets a match budget)
+    _validate_session_matches(options, match_results, snapshot.poll.match_budget)
+
+    if await _finalize_session(voter_session, options, match_results, session):
+        return JSONResponse(status_code=202, content={
+            "message": "Session completion queued",
+            "session_id": str(session_id),
+            "status_url": _status_url(session_id)
+        })
     return {"message": "Session completed successfully", "session_id": str(session_id)}
 
+@router.get("/session/{session_id}/status", response_model=SessionStatusOut)
+async def get_session_status(
+    session_id: UUID,
+    session: AsyncSession = Depends(get_async_session),
+    user=Depends(get_current_user)
+):
+    """
+    Completion state of a session: in_progress, pending (queued for aggregation),
+    failed (aggregation gave up after COMPLETION_MAX_ATTEMPTS) or complete.
+    """
+    voter_session = await get_voter_session_by_id(session_id=session_id, session=session)
+    if not voter_session:
+        raise HTTPException(status_code=404, detail="Voter session not found")
+    if voter_session.voter_email != user.get("email"):
+        raise HTTPException(status_code=403, detail="Not authorized to view this session")
+    if not voter_session.is_complete:
+        status = "in_progress"
+    else:
+        attempts = await get_completion_attempts(session_id=session_id, session=session)
+        if attempts is None:
+            status = "complete"
+        elif attempts >= COMPLETION_MAX_ATTEMPTS:
+            status = "failed"
+        else:
+            status = "pending"
+    return SessionStatusOut(session_id=session_id, status=status, completed_at=voter_session.completed_at)
+
 @router.get("/session/{session_id}/leaderboard", response_model=LeaderboardResponse)
 async def get_session_leaderboard(
     session_id: UUID,
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_async_read_session),
     user=Depends(get_current_user)
 ):
     """
     Return the Elo vector for a completed session as a leaderboard.
     Only the session owner or superadmin can access.
+
+    A completed session's vector is stored at completion, so this is one row
+    read (the poll's options come from the poll cache), and the ranked result is kept in an
+    in-process LRU. Sessions completed before vectors were stored are
+    recomputed from their matches.
     """
-    from app.models import VoterSession
-    from sqlalchemy import select
-    # 1. Get the session
-    voter_session = await get_voter_session_by_id(session_id=session_id, session=session)
-    if not voter_session:
-        raise HTTPException(status_code=404, detail="Session not found")
+    # 1. Get the session (and its stored Elo vector), unless its ranking is cached
+    cached = session_leaderboard_cache.get(session_id)
+    if cached is None:
+        voter_session, packed_scores = await get_voter_session_with_scores(session_id=session_id, session=session)
+        if not voter_session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        voter_email = voter_session.voter_email
+    else:
+        voter_email = cached["voter_email"]
     # 2. Access control
     user_email = user.get("email")
     user_role = user.get("role") or user.get("is_superadmin")
-    is_owner = (voter_session.voter_email == user_email)
+    is_owner = (voter_email == user_email)
     is_superadmin = (user_role == "superadmin" or user_role is True)
     if not (is_owner or is_superadmin):
         raise HTTPException(status_code=403, detail="Not authorized to view this session's leaderboard")
-    # 3. Must be complete
-    if not voter_session.is_complete:
-        raise HTTPException(status_code=400, detail="Session not complete")
-    # 4. Get options and match results
-    options = await list_options_by_poll(poll_id=voter_session.poll_id, session=session)
-    match_results = await list_match_results_by_session(session_id=session_id, session=session)
-    from app.elo import process_session_elo
-    elo_scores = process_session_elo(match_results=match_results, options=options)
-    # 5. Build leaderboard entries
-    entries = []
-    for option, score in zip(options, elo_scores):
-        entries.append({
-            "label": option.label,
-            "score": score,
-            "option_id": str(option.id)  # TODO CHECK: Optionally remove if not needed
-        })
-    # 6. Sort and rank as in global leaderboard
-    entries.sort(key=lambda x: (-x["score"]))
-    leaderboard = []
-    prev_score = None
-    prev_rank = 0
-    for idx, entry in enumerate(entries):
-        if prev_score is not None and entry["score"] == prev_score:
-            rank = prev_rank
-        else:
-            rank = idx + 1
-        leaderboard.append(LeaderboardEntry(label=entry["label"], score=entry["score"], rank=rank))
-        prev_score = entry["score"]
-        prev_rank = rank
-    return LeaderboardResponse(leaderboard=leaderboard) 
\ No newline at end of file
+    if cached is None:
+        # 3. Must be complete
+        if not voter_session.is_complete:
+            raise HTTPException(status_code=400, detail="Session not complete")
+        # 4. Stored Elo vector (in option order), or recompute it from the match results
+        options = (await _get_poll_snapshot(voter_session.poll_id, session)).options
+        elo_scores = unpack_scores(packed_scores).tolist() if packed_scores is not None else None
+        if elo_scores is None or len(elo_scores) != len(options):
+            match_results = await list_match_results_by_session(session_id=session_id, session=session)
+            elo_scores = process_session_elo(match_results=match_results, options=options)
+        # 5. Sort and rank as in global leaderboard
+        entries = rank_entries([{"label": option.label, "score": score} for option, score in zip(options, elo_scores)])
+        session_leaderboard_cache.set(session_id, {"voter_email": voter_email, "entries": entries})
+    else:
+        entries = cached["entries"]
+    if FAST_JSON:
+        return trusted_json_response({"leaderboard": entries})
+    return LeaderboardResponse(leaderboard=[LeaderboardEntry(**entry) for entry in entries])
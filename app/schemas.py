@@ -1,11 +1,13 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Literal
 from uuid import UUID
 from datetime import datetime
 
 class PollBase(BaseModel):
     title: str
     creator_email: Optional[EmailStr] = None
+    match_budget: Optional[int] = Field(default=None, ge=1)  # Matches per voter; None means every pair
+    ranking_method: Literal["elo", "bradley_terry"] = "elo"  # How the global leaderboard is ranked
 
 class PollCreate(PollBase):
     pass
@@ -54,6 +56,34 @@ class MatchResultOut(MatchResultBase):
     id: UUID
     model_config = ConfigDict(from_attributes=True)
 
+class NextPairOut(BaseModel):
+    session_id: UUID
+    option_a_id: Optional[UUID] = None
+    option_b_id: Optional[UUID] = None
+    match_index: int  # Index to submit the match under
+    required_matches: int
+    is_done: bool  # True once enough matches have been played to complete the session
+
+class MatchResultBulkItem(BaseModel):
+    winner_option_id: UUID
+    loser_option_id: UUID
+    match_index: int
+
+class MatchResultBulkCreate(BaseModel):
+    matches: List[MatchResultBulkItem] = Field(..., min_length=1)
+    complete: bool = False  # Also complete the session in the same transaction
+
+class MatchResultBulkOut(BaseModel):
+    session_id: UUID
+    inserted: int
+    completed: bool
+    status_url: Optional[str] = None  # set when completion was queued (COMPLETION_MODE=async)
+
+class SessionStatusOut(BaseModel):
+    session_id: UUID
+    status: Literal["in_progress", "pending", "failed", "complete"]
+    completed_at: Optional[datetime] = None
+
 class GlobalScoreOut(BaseModel):
     poll_id: UUID
     option_id: UUID
@@ -65,5 +95,9 @@ class LeaderboardEntry(BaseModel):
     score: float
     rank: Union[int, str]  # int for ranked, 'NA' for no votes
 
+class PairwiseMatrixOut(BaseModel):
+    option_ids: list[UUID]
+    wins: list[list[int]]  # wins[i][j] = times option_ids[i] beat option_ids[j]
+
 class LeaderboardResponse(BaseModel):
     leaderboard: list[LeaderboardEntry] 
\ No newline at end of file
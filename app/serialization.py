@@ -0,0 +1,36 @@
+"""
+Fast JSON responses.
+
+With FAST_JSON enabled, routes use orjson instead of the stdlib encoder,
+and hot endpoints hand back already-serialized bytes for data the app
+built itself, skipping FastAPI's response_model validation and
+jsonable_encoder pass. The response_model declarations stay on the routes
+for the OpenAPI schema.
+"""
+import os
+import orjson
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+# numpy scalars show up in scores computed by app.elo_engine and app.ranking
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def default_response_class():
+    """Response class for the app: orjson when FAST_JSON is on, else the stdlib-backed default."""
+    return FastJSONResponse if FAST_JSON else JSONResponse
+
+def raw_json_response(body: bytes, status_code: int = 200, headers=None) -> Response:
+    """Send pre-serialized JSON bytes as-is."""
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
+def trusted_json_response(content, status_code: int = 200, headers=None) -> Response:
+    """Serialize app-built data directly, without response_model validation."""
+    return raw_json_response(dumps(content), status_code, headers)
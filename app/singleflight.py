@@ -0,0 +1,87 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one in-flight call: the
+first caller runs it, the rest await its result. Nothing is cached once the
+call finishes; the next caller starts a fresh one. If the running caller is
+cancelled, the callers waiting on it run the call themselves.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from app.cache import TTLCache
+
+class KeyStats:
+    __slots__ = ("calls", "executions", "coalesced")
+
+    def __init__(self):
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"calls": self.calls, "executions": self.executions, "coalesced": self.coalesced}
+
+class SingleFlight:
+    """Coalesces concurrent calls per key and counts, per key, how many callers were spared a call."""
+
+    def __init__(self, stats_size: int = 1000):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Most recently used keys only, so per-key stats stay bounded
+        self._key_stats = TTLCache(maxsize=stats_size, ttl=None)
+        self.totals = KeyStats()
+
+    def _stats_for(self, key: Hashable) -> KeyStats:
+        stats = self._key_stats.get(key)
+        if stats is None:
+            stats = KeyStats()
+            self._key_stats.set(key, stats)
+        return stats
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run `fn` or join the identical call already running. Returns (result, shared)."""
+        stats = self._stats_for(key)
+        stats.calls += 1
+        self.totals.calls += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # this caller was cancelled
+                # The running caller was cancelled: run it ourselves below
+            else:
+                stats.coalesced += 1
+                self.totals.coalesced += 1
+                return result, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        stats.executions += 1
+        self.totals.executions += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved so an unwaited future does not log it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "totals": self.totals.as_dict(),
+            "inflight": len(self._inflight),
+            "keys": {
+                "/".join(str(part) for part in key) if isinstance(key, tuple) else str(key): stats.as_dict()
+                for key, stats in self._key_stats.items()
+            },
+        }
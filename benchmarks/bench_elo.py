@@ -0,0 +1,80 @@
+"""
+Micro-benchmarks of the Elo code in app/elo.py and app/elo_engine.py.
+
+    python -m benchmarks.bench_elo --options 10 30 100 --sessions 1000
+"""
+import argparse
+import random
+import time
+import uuid
+from types import SimpleNamespace
+from app.elo import process_session_elo, mean_center
+from app.elo_engine import OptionIndex, pack_sessions, process_sessions, mean_center_batch
+from benchmarks.common import percentile, write_results, print_table
+
+def make_sessions(n_options: int, n_sessions: int, seed: int = 0):
+    rng = random.Random(seed)
+    options = [SimpleNamespace(id=uuid.uuid4()) for _ in range(n_options)]
+    pairs = [(a, b) for i, a in enumerate(options) for b in options[i + 1:]]
+    sessions = []
+    for _ in range(n_sessions):
+        order = pairs[:]
+        rng.shuffle(order)
+        sessions.append([
+            SimpleNamespace(winner_option_id=a.id, loser_option_id=b.id) if rng.random() < 0.5
+            else SimpleNamespace(winner_option_id=b.id, loser_option_id=a.id)
+            for a, b in order
+        ])
+    return options, sessions
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def stats(samples, work_items):
+    samples = sorted(samples)
+    best = samples[0]
+    return {
+        "count": len(samples),
+        "errors": 0,
+        "throughput_per_s": work_items / best if best else 0.0,
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--options", type=int, nargs="+", default=[10, 30, 100])
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", default=None, help="Result file (default: benchmarks/results/elo-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    ops = {}
+    for n_options in args.options:
+        options, sessions = make_sessions(n_options, args.sessions)
+
+        def scalar():
+            for matches in sessions:
+                mean_center(process_session_elo(match_results=matches, options=options))
+
+        def vectorized():
+            index = OptionIndex.from_options(options)
+            winners, losers, lengths = pack_sessions(index.encode(m) for m in sessions)
+            mean_center_batch(process_sessions(winners, losers, lengths, len(index)))
+
+        ops[f"scalar_n{n_options}"] = stats(timed(scalar, args.repeat), args.sessions)
+        ops[f"vectorized_n{n_options}"] = stats(timed(vectorized, args.repeat), args.sessions)
+
+    print_table(ops)
+    print("results:", write_results("elo", ops, vars(args), args.out))
+
+if __name__ == "__main__":
+    main()
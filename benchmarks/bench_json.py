@@ -0,0 +1,68 @@
+"""
+Leaderboard response serialization: the response_model path vs the FAST_JSON paths.
+
+    python -m benchmarks.bench_json --options 10 100 1000
+
+`response_model` builds LeaderboardEntry/LeaderboardResponse objects and
+runs them through FastAPI's serialize_response and the stdlib JSON
+encoder, as the route does by default. `orjson` serializes the cached
+dicts directly; `cached_bytes` is the cost of a body-cache hit.
+"""
+import argparse
+import asyncio
+import json
+import random
+from fastapi._compat import ModelField
+from fastapi.routing import serialize_response
+from pydantic.fields import FieldInfo
+from app.leaderboard import rank_entries
+from app.schemas import LeaderboardEntry, LeaderboardResponse
+from app.serialization import dumps
+from benchmarks.bench_elo import timed, stats
+from benchmarks.common import write_results, print_table
+
+def make_entries(n_options: int, seed: int = 0):
+    rng = random.Random(seed)
+    return rank_entries([{"label": f"Option {i}", "score": rng.uniform(-300, 300)} for i in range(n_options)])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--options", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=200, help="Serializations per sample")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", default=None, help="Result file (default: benchmarks/results/json-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    # The response field FastAPI builds for `response_model=LeaderboardResponse`
+    field = ModelField(name="Response_get_leaderboard", field_info=FieldInfo(annotation=LeaderboardResponse), mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    ops = {}
+    for n_options in args.options:
+        entries = make_entries(n_options)
+        body = dumps({"leaderboard": entries})
+
+        def response_model():
+            for _ in range(args.requests):
+                response = LeaderboardResponse(leaderboard=[LeaderboardEntry(**e) for e in entries])
+                content = loop.run_until_complete(serialize_response(field=field, response_content=response, is_coroutine=True))
+                json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+        def fast():
+            for _ in range(args.requests):
+                dumps({"leaderboard": entries})
+
+        def cached_bytes():
+            for _ in range(args.requests):
+                bytes(body)
+
+        ops[f"response_model_n{n_options}"] = stats(timed(response_model, args.repeat), args.requests)
+        ops[f"orjson_n{n_options}"] = stats(timed(fast, args.repeat), args.requests)
+        ops[f"cached_bytes_n{n_options}"] = stats(timed(cached_bytes, args.repeat), args.requests)
+
+    loop.close()
+    print_table(ops)
+    print("results:", write_results("json", ops, vars(args), args.out))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, List
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+class LatencyRecorder:
+    """Collects per-operation latencies (seconds) and error counts."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, op: str, seconds: float, ok: bool = True):
+        self.samples.setdefault(op, []).append(seconds)
+        if not ok:
+            self.errors[op] = self.errors.get(op, 0) + 1
+
+    def summary(self, wall_seconds: float) -> Dict[str, Dict[str, float]]:
+        ops = {}
+        for op, values in self.samples.items():
+            values = sorted(values)
+            ops[op] = {
+                "count": len(values),
+                "errors": self.errors.get(op, 0),
+                "throughput_per_s": len(values) / wall_seconds if wall_seconds else 0.0,
+                "mean_ms": sum(values) / len(values) * 1000,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+        return ops
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+def write_results(name: str, ops: Dict, params: Dict, out: str = None) -> str:
+    """Write a machine-readable result file and return its path."""
+    payload = {
+        "benchmark": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "params": params,
+        "ops": ops,
+    }
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, "w") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    return out
+
+def print_table(ops: Dict):
+    print(f"{'operation':<28}{'count':>8}{'err':>6}{'ops/s':>10}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}")
+    for op, s in sorted(ops.items()):
+        print(f"{op:<28}{s['count']:>8}{s['errors']:>6}{s['throughput_per_s']:>10.1f}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}")
@@ -0,0 +1,42 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "mean_ms")
+
+def compare(old: dict, new: dict, threshold: float):
+    regressions = []
+    for op, new_stats in sorted(new["ops"].items()):
+        old_stats = old["ops"].get(op)
+        if not old_stats:
+            continue
+        for metric in METRICS:
+            if metric not in new_stats or not old_stats.get(metric):
+                continue
+            change = (new_stats[metric] - old_stats[metric]) / old_stats[metric] * 100
+            flag = "REGRESSION" if change > threshold else ""
+            print(f"{op:<28}{metric:<9}{old_stats[metric]:>10.3f}{new_stats[metric]:>10.3f}{change:>+9.1f}%  {flag}")
+            if flag:
+                regressions.append((op, metric, change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    regressions = compare(old, new, args.threshold)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Initial schema, exactly as the pre-migration models built it.
+
+Databases created before migrations existed (via Base.metadata.create_all)
+already have these tables: mark them with `alembic stamp 0001` and then run
+`alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'polls',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('title', sa.String()),
+        sa.Column('creator_email', sa.String(), nullable=True),
+        sa.Column('is_verified', sa.Boolean()),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_table(
+        'options',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('poll_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('polls.id')),
+        sa.Column('label', sa.String()),
+    )
+    op.create_table(
+        'sessions',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('poll_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('polls.id')),
+        sa.Column('voter_email', sa.String(), nullable=True),
+        sa.Column('is_complete', sa.Boolean()),
+        sa.Column('started_at', sa.DateTime()),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        'match_results',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('session_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('sessions.id')),
+        sa.Column('winner_option_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('options.id')),
+        sa.Column('loser_option_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('options.id')),
+        sa.Column('match_index', sa.Integer()),
+    )
+    op.create_table(
+        'global_scores',
+        sa.Column('poll_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('polls.id'), primary_key=True),
+        sa.Column('option_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('options.id'), primary_key=True),
+        sa.Column('total_score', sa.Float()),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('global_scores')
+    op.drop_table('match_results')
+    op.drop_table('sessions')
+    op.drop_table('options')
+    op.drop_table('polls')
@@ -0,0 +1,35 @@
+"""Sharded pending score deltas (SCORE_SHARDS).
+
+Revision ID: 0001b
+Revises: 0001a
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001b'
+down_revision: Union[str, Sequence[str], None] = '0001a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'global_score_shards',
+        sa.Column('poll_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('polls.id'), primary_key=True),
+        sa.Column('option_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('options.id'), primary_key=True),
+        sa.Column('shard', sa.Integer(), primary_key=True),
+        sa.Column('total_score', sa.Float()),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('global_score_shards')
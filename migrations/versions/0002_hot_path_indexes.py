@@ -0,0 +1,65 @@
+"""Indexes and constraints for hot lookups.
+
+All indexes are built with CREATE INDEX CONCURRENTLY, so they run outside a
+transaction and do not block writes. The unique indexes fail on existing
+duplicates; find them first with e.g.
+
+    SELECT session_id, match_index, count(*) FROM match_results
+    GROUP BY 1, 2 HAVING count(*) > 1;
+
+Revision ID: 0002
+Revises: 0001b
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        # Options of a poll
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_options_poll_id ON options (poll_id)")
+        # Case- and whitespace-insensitive unique labels per poll (replaces the check loop in add_option_to_poll)
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_options_poll_label_norm "
+            "ON options (poll_id, regexp_replace(lower(label), '[[:space:]]+', '', 'g'))"
+        )
+        # Leaderboard authorization check; its poll_id prefix also serves plain sessions-by-poll lookups
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sessions_poll_voter_complete "
+            "ON sessions (poll_id, voter_email, is_complete)"
+        )
+        # One match per index within a session; its session_id prefix serves matches-by-session reads in order
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_match_results_session_match_index "
+            "ON match_results (session_id, match_index)"
+        )
+        # A pair is played at most once per session, whichever option won
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_match_results_session_pair "
+            "ON match_results (session_id, least(winner_option_id, loser_option_id), greatest(winner_option_id, loser_option_id))"
+        )
+    op.execute(
+        "ALTER TABLE match_results ADD CONSTRAINT uq_match_results_session_match_index "
+        "UNIQUE USING INDEX uq_match_results_session_match_index"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE match_results DROP CONSTRAINT IF EXISTS uq_match_results_session_match_index")
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_match_results_session_pair")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_sessions_poll_voter_complete")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_options_poll_label_norm")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_options_poll_id")
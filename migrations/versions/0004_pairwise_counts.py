@@ -0,0 +1,37 @@
+"""Pairwise win matrix per poll and per-poll ranking method.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('polls', sa.Column('ranking_method', sa.String(), nullable=False, server_default='elo'))
+    op.create_table(
+        'pairwise_counts',
+        sa.Column('poll_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('polls.id'), primary_key=True),
+        sa.Column('winner_option_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('options.id'), primary_key=True),
+        sa.Column('loser_option_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('options.id'), primary_key=True),
+        sa.Column('wins', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('pairwise_counts')
+    op.drop_column('polls', 'ranking_method')
@@ -0,0 +1,36 @@
+"""Durable queue for write-behind session completion.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'completion_queue',
+        sa.Column('session_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('sessions.id'), primary_key=True),
+        sa.Column('poll_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('polls.id'), nullable=False),
+        sa.Column('enqueued_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_completion_queue_enqueued_at', 'completion_queue', ['enqueued_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_completion_queue_enqueued_at', table_name='completion_queue')
+    op.drop_table('completion_queue')
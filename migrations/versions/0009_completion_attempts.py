@@ -0,0 +1,30 @@
+"""Attempt count and last error on queued completions.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('completion_queue', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('completion_queue', sa.Column('last_error', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('completion_queue', 'last_error')
+    op.drop_column('completion_queue', 'attempts')
@@ -0,0 +1,36 @@
+"""Sharded pending pairwise win counts (SCORE_SHARDS).
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'pairwise_count_shards',
+        sa.Column('poll_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('polls.id'), primary_key=True),
+        sa.Column('winner_option_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('options.id'), primary_key=True),
+        sa.Column('loser_option_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('options.id'), primary_key=True),
+        sa.Column('shard', sa.Integer(), primary_key=True),
+        sa.Column('wins', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('pairwise_count_shards')
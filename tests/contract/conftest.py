@@ -1,9 +1,12 @@
 import pytest_asyncio
-from app.database import get_engine
+from app.database import get_engine, dispose_engine
 from app.models import Base
 
 @pytest_asyncio.fixture(scope="session", autouse=True)
 async def create_test_db():
     engine = get_engine()
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all) 
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    # Close pooled connections on the loop that opened them
+    await dispose_engine()
@@ -38,4 +38,13 @@ async def test_list_polls_contract(async_client, auth_headers):
 @pytest.mark.asyncio
 async def test_get_poll_not_found(async_client, auth_headers):
     resp = await async_client.get("/polls/00000000-0000-0000-0000-000000000000", headers=auth_headers)
-    assert resp.status_code == 404 
\ No newline at end of file
+    assert resp.status_code == 404 
+
+@pytest.mark.asyncio
+async def test_add_option_duplicate_label(async_client, auth_headers):
+    poll_resp = await async_client.post("/polls/", json={"title": "Label Poll", "creator_email": "user1@example.com"}, headers=auth_headers)
+    poll_id = poll_resp.json()["id"]
+    resp = await async_client.post(f"/polls/{poll_id}/options/", json={"label": "Ice Cream"}, headers=auth_headers)
+    assert resp.status_code == 200
+    resp = await async_client.post(f"/polls/{poll_id}/options/", json={"label": " ice  cream"}, headers=auth_headers)
+    assert resp.status_code == 409
@@ -54,6 +54,33 @@ async def test_submit_match_contract(async_client, auth_headers):
     }, headers=auth_headers)
     assert resp.status_code == 200
 
+@pytest.mark.asyncio
+async def test_submit_match_retry_replays_original(async_client, auth_headers):
+    poll_resp = await async_client.post("/polls/", json={"title": "Retry Poll", "creator_email": "user3@example.com"}, headers=auth_headers)
+    poll_id = poll_resp.json()["id"]
+    option1_id = (await async_client.post(f"/polls/{poll_id}/options/", json={"label": "Option 1"}, headers=auth_headers)).json()["id"]
+    option2_id = (await async_client.post(f"/polls/{poll_id}/options/", json={"label": "Option 2"}, headers=auth_headers)).json()["id"]
+    session_id = (await async_client.post("/votes/session/", json={"poll_id": poll_id, "voter_email": "user3@example.com"}, headers=auth_headers)).json()["id"]
+    match = {"session_id": session_id, "winner_option_id": option1_id, "loser_option_id": option2_id, "match_index": 0}
+    keyed_headers = {**auth_headers, "Idempotency-Key": str(uuid.uuid4())}
+
+    first = await async_client.post("/votes/match/", json=match, headers=keyed_headers)
+    retry = await async_client.post("/votes/match/", json=match, headers=keyed_headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+    # Same key, different request
+    reused = await async_client.post("/votes/match/", json={**match, "match_index": 1}, headers=keyed_headers)
+    assert reused.status_code == 422
+
+    # No key: the natural (session_id, match_index) key still dedups the retry
+    natural = await async_client.post("/votes/match/", json=match, headers=auth_headers)
+    assert natural.status_code == 200
+    assert natural.json()["id"] == first.json()["id"]
+    results = await async_client.get(f"/votes/session/{session_id}/results", headers=auth_headers)
+    assert len(results.json()) == 1
+
 @pytest.mark.asyncio
 async def test_complete_session_unauthorized(async_client):
     session_id = str(uuid.uuid4())
@@ -80,4 +107,34 @@ async def test_complete_session_double(async_client, auth_headers):
 async def test_submit_match_bad_input(async_client, auth_headers):
     # Missing required fields
     resp = await async_client.post("/votes/match/", json={"session_id": str(uuid.uuid4())}, headers=auth_headers)
-    assert resp.status_code == 422 
\ No newline at end of file
+    assert resp.status_code == 422 
+
+@pytest.mark.asyncio
+async def test_submit_matches_bulk_contract(async_client, auth_headers):
+    # Create poll with three options
+    poll_resp = await async_client.post("/polls/", json={"title": "Bulk Poll", "creator_email": "user3@example.com"}, headers=auth_headers)
+    assert poll_resp.status_code == 200
+    poll_id = poll_resp.json()["id"]
+    option_ids = []
+    for label in ("A", "B", "C"):
+        option_resp = await async_client.post(f"/polls/{poll_id}/options/", json={"label": label}, headers=auth_headers)
+        assert option_resp.status_code == 200
+        option_ids.append(option_resp.json()["id"])
+    session_resp = await async_client.post("/votes/session/", json={"poll_id": poll_id, "voter_email": "user3@example.com"}, headers=auth_headers)
+    assert session_resp.status_code == 200
+    session_id = session_resp.json()["id"]
+    a, b, c = option_ids
+    matches = [
+        {"winner_option_id": a, "loser_option_id": b, "match_index": 0},
+        {"winner_option_id": a, "loser_option_id": c, "match_index": 1},
+        {"winner_option_id": b, "loser_option_id": c, "match_index": 2},
+    ]
+    # Repeated pair is rejected before anything is written
+    bad = await async_client.post(f"/votes/session/{session_id}/matches:bulk", json={"matches": matches + [
+        {"winner_option_id": b, "loser_option_id": a, "match_index": 3}
+    ]}, headers=auth_headers)
+    assert bad.status_code == 400
+    resp = await async_client.post(f"/votes/session/{session_id}/matches:bulk", json={"matches": matches, "complete": True}, headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.json()["inserted"] == 3
+    assert resp.json()["completed"] is True
@@ -74,4 +74,33 @@ async def test_concurrent_voting(async_client, auth_headers_1, auth_headers_2):
 
     # 5. Check leaderboard (should reflect both users' votes if sessions were complete)
     leaderboard_resp = await async_client.get(f"/polls/{poll_id}/leaderboard", headers=auth_headers_1)
-    assert leaderboard_resp.status_code in (200, 403) 
\ No newline at end of file
+    assert leaderboard_resp.status_code in (200, 403) 
+
+@pytest.mark.asyncio
+async def test_concurrent_completion_counts_once(async_client, auth_headers_1):
+    poll_resp = await async_client.post("/polls/", json={"title": "Double Complete Poll", "creator_email": "userA@example.com"}, headers=auth_headers_1)
+    assert poll_resp.status_code == 200
+    poll_id = poll_resp.json()["id"]
+    option1_id = (await async_client.post(f"/polls/{poll_id}/options/", json={"label": "Option 1"}, headers=auth_headers_1)).json()["id"]
+    option2_id = (await async_client.post(f"/polls/{poll_id}/options/", json={"label": "Option 2"}, headers=auth_headers_1)).json()["id"]
+    session_resp = await async_client.post("/votes/session/", json={"poll_id": poll_id, "voter_email": "userA@example.com"}, headers=auth_headers_1)
+    session_id = session_resp.json()["id"]
+    match_resp = await async_client.post("/votes/match/", json={
+        "session_id": session_id,
+        "winner_option_id": option1_id,
+        "loser_option_id": option2_id,
+        "match_index": 0
+    }, headers=auth_headers_1)
+    assert match_resp.status_code == 200
+
+    # The session row lock lets exactly one completion through
+    results = await asyncio.gather(
+        async_client.post(f"/votes/session/{session_id}/complete", headers=auth_headers_1),
+        async_client.post(f"/votes/session/{session_id}/complete", headers=auth_headers_1)
+    )
+    assert sorted(r.status_code for r in results) == [200, 400]
+
+    leaderboard_resp = await async_client.get(f"/polls/{poll_id}/leaderboard", headers=auth_headers_1)
+    assert leaderboard_resp.status_code == 200
+    scores = [entry["score"] for entry in leaderboard_resp.json()["leaderboard"]]
+    assert sum(abs(s) for s in scores) == pytest.approx(32.0)
@@ -0,0 +1,58 @@
+import uuid
+import pytest
+from unittest.mock import AsyncMock
+from app import aggregation
+
+@pytest.mark.asyncio
+async def test_add_session_scores_unsharded(monkeypatch):
+    monkeypatch.setattr(aggregation, "SCORE_SHARDS", 1)
+    upsert = AsyncMock()
+    monkeypatch.setattr(aggregation, "upsert_global_scores", upsert)
+    await aggregation.add_session_scores(poll_id=uuid.uuid4(), session_id=uuid.uuid4(), scores=[], session=AsyncMock())
+    upsert.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_add_session_scores_sharded(monkeypatch):
+    monkeypatch.setattr(aggregation, "SCORE_SHARDS", 8)
+    upsert = AsyncMock()
+    monkeypatch.setattr(aggregation, "upsert_score_shards", upsert)
+    session_id = uuid.uuid4()
+    await aggregation.add_session_scores(poll_id=uuid.uuid4(), session_id=session_id, scores=[], session=AsyncMock())
+    assert upsert.await_args.kwargs["shard"] == session_id.int % 8
+    assert upsert.await_args.kwargs["commit"] is False
+
+def test_shards_spread_sessions(monkeypatch):
+    monkeypatch.setattr(aggregation, "SCORE_SHARDS", 4)
+    shards = {aggregation.shard_for_session(uuid.uuid4()) for _ in range(200)}
+    assert shards == {0, 1, 2, 3}
+
+@pytest.mark.asyncio
+async def test_add_session_pairwise_sharded(monkeypatch):
+    from types import SimpleNamespace
+    monkeypatch.setattr(aggregation, "SCORE_SHARDS", 8)
+    upsert, shared = AsyncMock(), AsyncMock()
+    monkeypatch.setattr(aggregation, "upsert_pairwise_shards", upsert)
+    monkeypatch.setattr(aggregation, "add_pairwise_counts", shared)
+    a, b = uuid.uuid4(), uuid.uuid4()
+    session_id = uuid.uuid4()
+    matches = [SimpleNamespace(winner_option_id=a, loser_option_id=b)] * 2
+    await aggregation.add_session_pairwise(poll_id=uuid.uuid4(), session_id=session_id, match_results=matches, session=AsyncMock())
+    # Deltas go to the session's shard, never to the shared pairwise_counts rows
+    assert upsert.await_args.kwargs["shard"] == session_id.int % 8
+    assert upsert.await_args.kwargs["counts"] == [(a, b, 2)]
+    shared.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_rollup_folds_score_and_pairwise_shards(monkeypatch):
+    poll_a, poll_b = uuid.uuid4(), uuid.uuid4()
+    db = AsyncMock()
+    sessionmaker = lambda: AsyncMock(__aenter__=AsyncMock(return_value=db), __aexit__=AsyncMock(return_value=False))
+    monkeypatch.setattr(aggregation, "get_sessionmaker", lambda: sessionmaker)
+    monkeypatch.setattr(aggregation, "list_polls_with_pending_shards", AsyncMock(return_value=[poll_a]))
+    monkeypatch.setattr(aggregation, "list_polls_with_pending_pairwise_shards", AsyncMock(return_value=[poll_a, poll_b]))
+    scores, pairwise = AsyncMock(), AsyncMock()
+    monkeypatch.setattr(aggregation, "rollup_score_shards", scores)
+    monkeypatch.setattr(aggregation, "rollup_pairwise_shards", pairwise)
+    assert await aggregation.rollup_all_shards() == 2
+    assert [call.kwargs["poll_id"] for call in pairwise.await_args_list] == [poll_a, poll_b]
+    assert scores.await_count == 1
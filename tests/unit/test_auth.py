@@ -0,0 +1,68 @@
+import asyncio
+import time
+import jwt
+import pytest
+from unittest.mock import AsyncMock
+from fastapi.security import HTTPAuthorizationCredentials
+from app.routes import auth
+
+SECRET = "unit-test-secret"
+
+@pytest.fixture(autouse=True)
+def hs256_config(monkeypatch):
+    monkeypatch.setattr(auth, "SUPABASE_JWKS_URL", None)
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", SECRET)
+    auth.token_cache.clear()
+    yield
+    auth.token_cache.clear()
+
+def credentials_for(claims):
+    token = jwt.encode(claims, SECRET, algorithm="HS256")
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+@pytest.mark.asyncio
+async def test_verified_token_is_cached(monkeypatch):
+    creds = credentials_for({"sub": "u1", "email": "u1@example.com", "exp": int(time.time()) + 600})
+    verify = AsyncMock(wraps=auth._verify_token)
+    monkeypatch.setattr(auth, "_verify_token", verify)
+    first = await auth.get_current_user(creds)
+    second = await auth.get_current_user(creds)
+    assert first == second
+    assert verify.await_count == 1
+
+@pytest.mark.asyncio
+async def test_expired_token_is_not_cached():
+    creds = credentials_for({"sub": "u1", "exp": int(time.time()) - 10})
+    with pytest.raises(Exception):
+        await auth.get_current_user(creds)
+    assert len(auth.token_cache) == 0
+
+@pytest.mark.asyncio
+async def test_concurrent_jwks_fetches_are_single_flight(monkeypatch):
+    monkeypatch.setattr(auth, "SUPABASE_JWKS_URL", "https://example.test/auth/v1/keys")
+    calls = 0
+
+    async def fake_fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        auth.jwks_cache.update({"keys": [{"kid": "k1"}]})
+        return auth.jwks_cache
+
+    monkeypatch.setattr(auth, "_fetch_jwks", fake_fetch)
+    monkeypatch.setattr(auth, "jwks_cache", {})
+    results = await asyncio.gather(*(auth.get_jwks() for _ in range(20)))
+    assert calls == 1
+    assert all(r == {"keys": [{"kid": "k1"}]} for r in results)
+
+@pytest.mark.asyncio
+async def test_unknown_kid_triggers_refetch(monkeypatch):
+    monkeypatch.setattr(auth, "SUPABASE_JWKS_URL", "https://example.test/auth/v1/keys")
+    monkeypatch.setattr(auth, "jwks_cache", {"keys": [{"kid": "old"}]})
+    monkeypatch.setattr(auth, "_jwks_fetched_at", 0.0)
+    get_jwks = AsyncMock(side_effect=[{"keys": [{"kid": "old"}]}, {"keys": [{"kid": "new"}]}])
+    monkeypatch.setattr(auth, "get_jwks", get_jwks)
+    token = jwt.encode({"sub": "u1"}, SECRET, algorithm="HS256", headers={"kid": "new"})
+    jwks = await auth._get_jwks_for_token(token)
+    assert jwks == {"keys": [{"kid": "new"}]}
+    get_jwks.assert_awaited_with(force=True)
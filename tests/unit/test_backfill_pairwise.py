@@ -0,0 +1,28 @@
+import uuid
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.commands import backfill_pairwise
+
+@pytest.mark.asyncio
+async def test_backfill_poll_rebuilds_counts_from_streamed_pairs(monkeypatch):
+    a, b, c = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    pairs = [(a, b), (a, b), (b, c), (c, a)]
+
+    async def stream(**kwargs):
+        for pair in pairs:
+            yield pair
+
+    session = AsyncMock()
+    sessionmaker = MagicMock(return_value=MagicMock(__aenter__=AsyncMock(return_value=session), __aexit__=AsyncMock(return_value=False)))
+    monkeypatch.setattr(backfill_pairwise, "get_sessionmaker", lambda: sessionmaker)
+    delete = AsyncMock()
+    add = AsyncMock()
+    monkeypatch.setattr(backfill_pairwise, "delete_pairwise_counts", delete)
+    monkeypatch.setattr(backfill_pairwise, "stream_completed_match_pairs", stream)
+    monkeypatch.setattr(backfill_pairwise, "add_pairwise_counts", add)
+
+    poll_id = uuid.uuid4()
+    assert await backfill_pairwise.backfill_poll(poll_id) == 4
+    delete.assert_awaited_once()
+    assert sorted(add.await_args.kwargs["counts"]) == sorted([(a, b, 2), (b, c, 1), (c, a, 1)])
+    session.commit.assert_awaited_once()
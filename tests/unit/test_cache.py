@@ -0,0 +1,42 @@
+import pytest
+from app.cache import TTLCache, InMemoryBackend, CacheBackend
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a") is None
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+@pytest.mark.asyncio
+async def test_in_memory_backend_roundtrip():
+    backend = InMemoryBackend()
+    await backend.set("k", {"x": 1}, ttl=10)
+    assert await backend.get("k") == {"x": 1}
+    await backend.delete("k")
+    assert await backend.get("k") is None
+
+def test_incomplete_backend_fails_at_instantiation():
+    class GetOnly(CacheBackend):
+        async def get(self, key):
+            return None
+    with pytest.raises(TypeError):
+        GetOnly()
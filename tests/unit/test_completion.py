@@ -0,0 +1,104 @@
+import uuid
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from app import completion
+from app.elo import process_session_elo, mean_center
+from app.elo_engine import unpack_scores
+from app.poll_cache import PollSnapshot
+
+def _db():
+    db = AsyncMock()
+    # begin_nested() is an async context manager that rolls back (and re-raises) on error
+    db.begin_nested = MagicMock(side_effect=lambda: MagicMock(__aenter__=AsyncMock(), __aexit__=AsyncMock(return_value=False)))
+    return db
+
+def _sessionmaker(db):
+    return MagicMock(return_value=MagicMock(__aenter__=AsyncMock(return_value=db), __aexit__=AsyncMock(return_value=False)))
+
+@pytest.mark.asyncio
+async def test_batch_aggregates_each_poll_once(monkeypatch):
+    options = [SimpleNamespace(id=uuid.uuid4()) for _ in range(3)]
+    poll_a, poll_b = uuid.uuid4(), uuid.uuid4()
+    sessions = {uuid.uuid4(): poll_a, uuid.uuid4(): poll_a, uuid.uuid4(): poll_b}
+    matches = []
+    for session_id in sessions:
+        matches.append(SimpleNamespace(session_id=session_id, winner_option_id=options[0].id, loser_option_id=options[1].id))
+        matches.append(SimpleNamespace(session_id=session_id, winner_option_id=options[2].id, loser_option_id=options[0].id))
+
+    db = _db()
+    add_scores, add_pairwise, delete, store_vectors = AsyncMock(), AsyncMock(), AsyncMock(), AsyncMock()
+    monkeypatch.setattr(completion, "get_sessionmaker", lambda: _sessionmaker(db))
+    monkeypatch.setattr(completion, "claim_completions", AsyncMock(return_value=list(sessions.items())))
+    monkeypatch.setattr(completion, "list_match_results_by_sessions", AsyncMock(return_value=matches))
+    monkeypatch.setattr(completion, "get_poll_snapshot", AsyncMock(return_value=PollSnapshot(SimpleNamespace(), options, 0)))
+    monkeypatch.setattr(completion, "add_session_scores", add_scores)
+    monkeypatch.setattr(completion, "add_session_pairwise", add_pairwise)
+    monkeypatch.setattr(completion, "delete_completions", delete)
+    monkeypatch.setattr(completion, "create_session_scores", store_vectors)
+    monkeypatch.setattr(completion, "notify_leaderboard_change", AsyncMock())
+    monkeypatch.setattr(completion, "invalidate_poll_leaderboard", AsyncMock())
+    monkeypatch.setattr(completion, "push_leaderboard_change", MagicMock())
+
+    assert await completion.process_batch(limit=10) == 3
+    assert add_scores.await_count == 2  # one upsert per poll, not per session
+    by_poll = {call.kwargs["poll_id"]: dict(call.kwargs["scores"]) for call in add_scores.await_args_list}
+    one_session = mean_center(process_session_elo(match_results=matches[:2], options=options))
+    assert np.allclose([by_poll[poll_a][o.id] for o in options], np.multiply(one_session, 2))
+    assert np.allclose([by_poll[poll_b][o.id] for o in options], one_session)
+    assert sorted(delete.await_args.kwargs["session_ids"]) == sorted(sessions)
+    stored = [row for call in store_vectors.await_args_list for row in call.kwargs["rows"]]
+    assert sorted(session_id for session_id, _, _ in stored) == sorted(sessions)
+    raw = process_session_elo(match_results=matches[:2], options=options)
+    assert all(np.allclose(unpack_scores(packed), raw) for _, _, packed in stored)
+    db.commit.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_empty_queue_does_nothing(monkeypatch):
+    db = AsyncMock()
+    monkeypatch.setattr(completion, "get_sessionmaker", lambda: _sessionmaker(db))
+    monkeypatch.setattr(completion, "claim_completions", AsyncMock(return_value=[]))
+    assert await completion.process_batch() == 0
+    db.commit.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_failing_session_is_held_back_without_stalling_the_batch(monkeypatch):
+    options = [SimpleNamespace(id=uuid.uuid4()) for _ in range(2)]
+    poll_a, poll_b = uuid.uuid4(), uuid.uuid4()
+    good_a, good_b, bad_b = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    claimed = [(good_a, poll_a), (good_b, poll_b), (bad_b, poll_b)]
+    matches = [
+        SimpleNamespace(session_id=session_id, winner_option_id=options[0].id, loser_option_id=options[1].id)
+        for session_id in (good_a, good_b)
+    ]
+    # An option outside the poll: OptionIndex.encode raises KeyError
+    matches.append(SimpleNamespace(session_id=bad_b, winner_option_id=uuid.uuid4(), loser_option_id=options[1].id))
+
+    db = _db()
+    add_scores, delete, record_failures = AsyncMock(), AsyncMock(), AsyncMock()
+    claim = AsyncMock(return_value=claimed)
+    monkeypatch.setattr(completion, "get_sessionmaker", lambda: _sessionmaker(db))
+    monkeypatch.setattr(completion, "claim_completions", claim)
+    monkeypatch.setattr(completion, "list_match_results_by_sessions", AsyncMock(return_value=matches))
+    monkeypatch.setattr(completion, "get_poll_snapshot", AsyncMock(return_value=PollSnapshot(SimpleNamespace(), options, 0)))
+    monkeypatch.setattr(completion, "add_session_scores", add_scores)
+    monkeypatch.setattr(completion, "add_session_pairwise", AsyncMock())
+    monkeypatch.setattr(completion, "create_session_scores", AsyncMock())
+    monkeypatch.setattr(completion, "delete_completions", delete)
+    monkeypatch.setattr(completion, "record_completion_failures", record_failures)
+    monkeypatch.setattr(completion, "notify_leaderboard_change", AsyncMock())
+    invalidate = AsyncMock()
+    monkeypatch.setattr(completion, "invalidate_poll_leaderboard", invalidate)
+    monkeypatch.setattr(completion, "push_leaderboard_change", MagicMock())
+
+    assert await completion.process_batch(limit=10) == 3
+    assert claim.await_args.kwargs["max_attempts"] == completion.COMPLETION_MAX_ATTEMPTS
+    # Poll B failed as a batch, then its good session went through on its own
+    assert [call.kwargs["session_id"] for call in add_scores.await_args_list] == (
+        [good_a, good_b] if poll_a < poll_b else [good_b, good_a]
+    )
+    assert sorted(delete.await_args.kwargs["session_ids"]) == sorted([good_a, good_b])
+    assert list(record_failures.await_args.kwargs["failures"]) == [bad_b]
+    assert {call.args[0] for call in invalidate.await_args_list} == {poll_a, poll_b}
+    db.commit.assert_awaited_once()
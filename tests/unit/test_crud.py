@@ -1,9 +1,12 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, Mock
-from app.crud import create_poll, get_poll_by_id, upsert_global_score
+from app.crud import create_poll, get_poll_by_id, list_polls, list_ranked_scores, upsert_global_score, upsert_global_scores
 from app.schemas import PollCreate
 from app.models import Poll, GlobalScore
+from app.database import COALESCE_READS
+import asyncio
 import uuid
+import datetime
 
 @pytest.mark.asyncio
 async def test_create_poll_success():
@@ -35,6 +38,22 @@ async def test_get_poll_by_id_not_found():
     result = await get_poll_by_id(poll_id=uuid.uuid4(), session=session)
     assert result is None
 
+def _slow_poll_session(poll, info):
+    async def execute(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return MagicMock(scalar_one_or_none=Mock(return_value=poll))
+    return AsyncMock(info=info, bind=None, new=(), dirty=(), deleted=(), execute=AsyncMock(side_effect=execute))
+
+@pytest.mark.asyncio
+async def test_get_poll_by_id_coalesces_only_opted_in_sessions():
+    poll = Poll(id=uuid.uuid4(), title="Test", creator_email="a@b.com")
+    readers = [_slow_poll_session(poll, {COALESCE_READS: True}) for _ in range(2)]
+    transactional = _slow_poll_session(poll, {})
+    await asyncio.gather(*(get_poll_by_id(poll_id=poll.id, session=s) for s in readers + [transactional]))
+    assert readers[0].execute.await_count + readers[1].execute.await_count == 1
+    # A session that did not opt in never takes another transaction's result
+    assert transactional.execute.await_count == 1
+
 @pytest.mark.asyncio
 async def test_upsert_global_score_new():
     session = AsyncMock()
@@ -54,4 +73,61 @@ async def test_upsert_global_score_update():
     session.execute = AsyncMock()
     await upsert_global_score(poll_id=poll_id, option_id=option_id, total_score=3.0, session=session)
     session.execute.assert_awaited()
-    session.commit.assert_awaited() 
\ No newline at end of file
+    session.commit.assert_awaited() 
+
+@pytest.mark.asyncio
+async def test_upsert_global_scores_single_statement():
+    session = AsyncMock()
+    session.execute = AsyncMock()
+    poll_id = uuid.uuid4()
+    scores = [(uuid.uuid4(), 1.5), (uuid.uuid4(), -1.5)]
+    await upsert_global_scores(poll_id=poll_id, scores=scores, session=session, commit=False)
+    session.execute.assert_awaited_once()
+    session.commit.assert_not_awaited()
+    sql = str(session.execute.await_args.args[0])
+    assert "ON CONFLICT" in sql
+
+@pytest.mark.asyncio
+async def test_upsert_global_scores_empty_is_noop():
+    session = AsyncMock()
+    await upsert_global_scores(poll_id=uuid.uuid4(), scores=[], session=session)
+    session.execute.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_list_polls_keyset_page():
+    session = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = []
+    session.execute = AsyncMock(return_value=mock_result)
+    after = (datetime.datetime(2025, 1, 1), uuid.uuid4())
+    await list_polls(session, limit=11, after=after, creator_email="a@b.com")
+    sql = str(session.execute.await_args.args[0])
+    assert "(polls.created_at, polls.id) <" in sql
+    assert "polls.creator_email =" in sql
+    assert "ORDER BY polls.created_at DESC, polls.id DESC" in sql
+    assert "LIMIT" in sql
+
+@pytest.mark.asyncio
+async def test_list_ranked_scores_lists_unscored_options():
+    session = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.all.return_value = [
+        Mock(label="A", score=2.0, rank=1, scored=1),
+        Mock(label="B", score=0.0, rank=2, scored=1),
+    ]
+    session.execute = AsyncMock(return_value=mock_result)
+    entries = await list_ranked_scores(poll_id=uuid.uuid4(), session=session, limit=2)
+    assert entries == [{"label": "A", "score": 2.0, "rank": 1}, {"label": "B", "score": 0.0, "rank": 2}]
+    sql = str(session.execute.await_args.args[0])
+    assert "FROM options LEFT OUTER JOIN" in sql
+    assert "coalesce(" in sql
+
+@pytest.mark.asyncio
+async def test_list_ranked_scores_tells_no_scores_from_an_empty_page():
+    session = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.all.return_value = [Mock(label="A", score=0.0, rank=1, scored=0)]
+    session.execute = AsyncMock(return_value=mock_result)
+    assert await list_ranked_scores(poll_id=uuid.uuid4(), session=session, limit=2) is None
+    mock_result.all.return_value = []
+    assert await list_ranked_scores(poll_id=uuid.uuid4(), session=session, limit=2, offset=50) == []
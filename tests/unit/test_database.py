@@ -0,0 +1,87 @@
+import pytest
+from types import SimpleNamespace
+from app import database
+from app.database import PoolStats, create_engine_from_env, get_pool_stats, DB_POOL_SIZE
+
+def test_pool_stats_record_wait():
+    stats = PoolStats()
+    stats.record_wait(0.010)
+    stats.record_wait(0.030)
+    assert stats.wait_count == 2
+    assert stats.wait_total == pytest.approx(0.040)
+    assert stats.wait_max == pytest.approx(0.030)
+
+def test_connection_wait_is_timed_only_when_a_connection_is_used():
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import Session
+    stats = PoolStats()
+    session = Session(create_engine("sqlite://"))
+    database.time_connection_waits(session, stats)
+    assert stats.wait_count == 0  # nothing checked out until the first statement
+    session.execute(text("SELECT 1"))
+    session.commit()
+    session.execute(text("SELECT 1"))
+    with session.begin_nested():
+        session.execute(text("SELECT 1"))
+    assert stats.wait_count == 2  # one per transaction, savepoints excluded
+    session.close()
+
+def test_create_engine_uses_pool_settings():
+    engine = create_engine_from_env("postgresql://u:p@localhost:5432/db", stats=PoolStats())
+    assert engine.url.drivername == "postgresql+asyncpg"
+    assert engine.sync_engine.pool.size() == DB_POOL_SIZE
+
+def test_get_pool_stats_reports_occupancy():
+    stats = PoolStats()
+    engine = create_engine_from_env("postgresql://u:p@localhost:5432/db", stats=stats)
+    data = get_pool_stats(engine, stats)
+    assert data["initialized"] is True
+    assert data["checkedout"] == 0
+    assert data["wait_count"] == 0
+
+def _request(authorization=None, path_params=None):
+    headers = {"authorization": authorization} if authorization else {}
+    return SimpleNamespace(headers=headers, path_params=path_params or {})
+
+@pytest.fixture
+def replica(monkeypatch):
+    monkeypatch.setattr(database, "get_read_sessionmaker", lambda: object())
+    lag = {"value": 0.2}
+    async def replica_lag():
+        return lag["value"]
+    monkeypatch.setattr(database, "replica_lag", replica_lag)
+    monkeypatch.setattr(database, "_recent_writes", database.TTLCache(maxsize=100, ttl=60))
+    database.read_routing_stats.reset()
+    return lag
+
+@pytest.mark.asyncio
+async def test_reads_use_primary_without_replica(monkeypatch):
+    monkeypatch.setattr(database, "get_read_sessionmaker", lambda: None)
+    assert await database._choose_read_target(_request()) is False
+
+@pytest.mark.asyncio
+async def test_reads_go_to_fresh_replica(replica):
+    assert await database._choose_read_target(_request("Bearer a")) is True
+    assert database.read_routing_stats.replica == 1
+
+@pytest.mark.asyncio
+async def test_lagging_or_unknown_replica_falls_back(replica):
+    replica["value"] = database.DB_READ_MAX_LAG + 1
+    assert await database._choose_read_target(_request()) is False
+    replica["value"] = None
+    assert await database._choose_read_target(_request()) is False
+    assert database.read_routing_stats.primary_lag == 2
+
+@pytest.mark.asyncio
+async def test_recent_writes_are_read_from_primary(replica):
+    database.mark_recent_write(database._client_key(_request("Bearer writer")))
+    assert await database._choose_read_target(_request("Bearer writer")) is False
+    assert await database._choose_read_target(_request("Bearer other")) is True
+
+    database.mark_poll_write("p1")
+    assert await database._choose_read_target(_request("Bearer other", {"poll_id": "p1"})) is False
+    assert database.read_routing_stats.primary_recent_write == 2
+    # Nor do their reads join queries that may have started before the write
+    assert database._recently_wrote(_request("Bearer writer"))
+    assert database._recently_wrote(_request("Bearer other", {"poll_id": "p1"}))
+    assert not database._recently_wrote(_request("Bearer other"))
@@ -0,0 +1,62 @@
+import random
+import uuid
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.elo import process_session_elo, mean_center
+from app.elo_engine import OptionIndex, pack_sessions, process_sessions, process_sessions_elo, mean_center_batch, summed_session_scores, pack_scores, unpack_scores
+
+def make_options(n):
+    return [SimpleNamespace(id=uuid.uuid4()) for _ in range(n)]
+
+def random_session(options, n_matches, rng):
+    matches = []
+    for i in range(n_matches):
+        a, b = rng.sample(options, 2)
+        matches.append(SimpleNamespace(winner_option_id=a.id, loser_option_id=b.id, match_index=i))
+    return matches
+
+def test_option_index_encode():
+    options = make_options(3)
+    index = OptionIndex.from_options(options)
+    match = SimpleNamespace(winner_option_id=options[2].id, loser_option_id=options[0].id)
+    winners, losers = index.encode([match])
+    assert winners.dtype == np.int32
+    assert winners.tolist() == [2]
+    assert losers.tolist() == [0]
+
+def test_pack_sessions_pads_to_longest():
+    encoded = [(np.array([1, 2], dtype=np.int32), np.array([0, 0], dtype=np.int32)),
+               (np.array([1], dtype=np.int32), np.array([2], dtype=np.int32))]
+    winners, losers, lengths = pack_sessions(encoded)
+    assert winners.shape == (2, 2)
+    assert lengths.tolist() == [2, 1]
+
+def test_batch_matches_scalar_path():
+    rng = random.Random(7)
+    options = make_options(8)
+    sessions = [random_session(options, rng.randint(0, 28), rng) for _ in range(25)]
+    batch = process_sessions_elo(sessions, options)
+    for row, matches in zip(batch, sessions):
+        expected = process_session_elo(match_results=matches, options=options)
+        assert row.tolist() == pytest.approx(expected, rel=1e-12)
+
+def test_summed_scores_match_scalar_mean_center():
+    rng = random.Random(11)
+    options = make_options(5)
+    sessions = [random_session(options, 10, rng) for _ in range(6)]
+    expected = np.zeros(5)
+    for matches in sessions:
+        expected += mean_center(process_session_elo(match_results=matches, options=options))
+    assert summed_session_scores(sessions, options) == pytest.approx(expected.tolist(), abs=1e-9)
+
+def test_empty_batch():
+    ratings = process_sessions(np.zeros((0, 0), dtype=np.int32), np.zeros((0, 0), dtype=np.int32), np.zeros(0, dtype=np.int32), 3)
+    assert ratings.shape == (0, 3)
+    assert mean_center_batch(ratings).shape == (0, 3)
+
+def test_packed_scores_round_trip():
+    scores = [512.25, 487.75, 500.0]
+    packed = pack_scores(scores)
+    assert len(packed) == 8 * len(scores)
+    assert unpack_scores(packed).tolist() == scores
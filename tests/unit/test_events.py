@@ -0,0 +1,47 @@
+import asyncio
+import pytest
+from app.events import LeaderboardBroker, diff_leaderboards, format_sse
+
+def test_diff_leaderboards_reports_changed_and_removed():
+    old = [{"label": "a", "score": 1.0, "rank": 1}, {"label": "b", "score": 0.0, "rank": 2}, {"label": "c", "score": -1.0, "rank": 3}]
+    new = [{"label": "b", "score": 2.0, "rank": 1}, {"label": "a", "score": 1.0, "rank": 2}]
+    diff = diff_leaderboards(old, new)
+    assert diff["changed"] == new
+    assert diff["removed"] == ["c"]
+
+def test_format_sse():
+    assert format_sse({"event": "diff", "data": {"x": 1}}) == 'event: diff\ndata: {"x": 1}\n\n'
+
+@pytest.mark.asyncio
+async def test_burst_of_changes_is_coalesced_into_one_push():
+    loads = 0
+
+    async def loader(poll_id):
+        nonlocal loads
+        loads += 1
+        return [{"label": "a", "score": float(loads), "rank": 1}]
+
+    broker = LeaderboardBroker(loader, interval=0.05)
+    broker.set_snapshot("p", [{"label": "a", "score": 0.0, "rank": 1}])
+    watchers = [broker.subscribe("p") for _ in range(3)]
+    for _ in range(20):
+        broker.mark_changed("p")
+    await asyncio.sleep(0.01)
+    assert loads == 1
+    for queue in watchers:
+        event = queue.get_nowait()
+        assert event["event"] == "diff"
+        assert event["data"]["changed"] == [{"label": "a", "score": 1.0, "rank": 1}]
+        assert queue.empty()
+
+@pytest.mark.asyncio
+async def test_changes_without_watchers_are_ignored():
+    async def loader(poll_id):
+        raise AssertionError("should not load")
+
+    broker = LeaderboardBroker(loader, interval=0)
+    broker.mark_changed("p")
+    await asyncio.sleep(0)
+    queue = broker.subscribe("p")
+    broker.unsubscribe("p", queue)
+    assert broker.watcher_count("p") == 0
@@ -0,0 +1,54 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+import uuid
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from app import export
+from app.export import export_chunks, gzip_chunks
+
+def _rows(rows):
+    async def stream(**kwargs):
+        for row in rows:
+            yield row
+    return stream
+
+@pytest.fixture
+def poll_data(monkeypatch):
+    session_id = uuid.uuid4()
+    a, b = SimpleNamespace(id=uuid.uuid4(), label="A"), SimpleNamespace(id=uuid.uuid4(), label="B")
+    matches = [(session_id, i, a.id, b.id) for i in range(5)]
+    sessions = [(session_id, "v@example.com", True, datetime.datetime(2026, 1, 1), None)]
+    monkeypatch.setattr(export, "stream_poll_matches", _rows(matches))
+    monkeypatch.setattr(export, "stream_poll_sessions", _rows(sessions))
+    monkeypatch.setattr(export, "list_options_by_poll", AsyncMock(return_value=[a, b]))
+    monkeypatch.setattr(export, "list_global_scores_by_poll", AsyncMock(return_value=[SimpleNamespace(option_id=a.id, total_score=4.0)]))
+    monkeypatch.setattr(export, "EXPORT_CHUNK_ROWS", 2)
+    return SimpleNamespace(session_id=session_id, a=a, b=b)
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+@pytest.mark.asyncio
+async def test_ndjson_export_is_chunked_and_tagged(poll_data):
+    chunks = await _collect(export_chunks(poll_id=uuid.uuid4(), session=AsyncMock(), kind="matches"))
+    assert len(chunks) == 3  # 2 + 2 + 1 rows
+    lines = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert [line["match_index"] for line in lines] == [0, 1, 2, 3, 4]
+    assert lines[0] == {"type": "matches", "session_id": str(poll_data.session_id), "match_index": 0,
+                        "winner_option_id": str(poll_data.a.id), "loser_option_id": str(poll_data.b.id)}
+
+@pytest.mark.asyncio
+async def test_ndjson_all_covers_every_section(poll_data):
+    text = "".join(await _collect(export_chunks(poll_id=uuid.uuid4(), session=AsyncMock(), kind="all")))
+    types = [json.loads(line)["type"] for line in text.splitlines()]
+    assert types == ["sessions"] + ["matches"] * 5 + ["scores"] * 2
+
+@pytest.mark.asyncio
+async def test_csv_scores_with_header_and_gzip(poll_data):
+    data = b"".join(await _collect(gzip_chunks(export_chunks(poll_id=uuid.uuid4(), session=AsyncMock(), kind="scores", fmt="csv"))))
+    rows = list(csv.reader(io.StringIO(gzip.decompress(data).decode())))
+    assert rows == [["option_id", "label", "total_score"], [str(poll_data.a.id), "A", "4.0"], [str(poll_data.b.id), "B", "0.0"]]
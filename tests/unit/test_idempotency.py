@@ -0,0 +1,66 @@
+import uuid
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from fastapi import HTTPException
+from app import idempotency
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    idempotency._cache.clear()
+    yield
+    idempotency._cache.clear()
+
+def test_fingerprint_ignores_key_order():
+    assert idempotency.fingerprint({"a": 1, "b": 2}) == idempotency.fingerprint({"b": 2, "a": 1})
+    assert idempotency.fingerprint({"a": 1}) != idempotency.fingerprint({"a": 2})
+
+def test_keys_are_scoped_per_user():
+    assert idempotency.scoped_key({"email": "a@x.com"}, "k") != idempotency.scoped_key({"email": "b@x.com"}, "k")
+
+@pytest.mark.asyncio
+async def test_lookup_reads_through_to_the_database_once(monkeypatch):
+    row = SimpleNamespace(fingerprint="f", status_code=200, response_body={"id": "1"})
+    get = AsyncMock(return_value=row)
+    monkeypatch.setattr(idempotency, "get_idempotency_key", get)
+
+    first = await idempotency.lookup(key="u:k", session=AsyncMock())
+    second = await idempotency.lookup(key="u:k", session=AsyncMock())
+    assert first == second == {"fingerprint": "f", "status_code": 200, "body": {"id": "1"}}
+    assert get.await_count == 1
+
+def test_replay_returns_stored_response_or_rejects_other_requests():
+    record = {"fingerprint": "f", "status_code": 200, "body": {"id": str(uuid.uuid4())}}
+    response = idempotency.replay(record, "f")
+    assert response.status_code == 200
+    assert response.headers[idempotency.REPLAY_HEADER] == "true"
+    with pytest.raises(HTTPException) as exc:
+        idempotency.replay(record, "other")
+    assert exc.value.status_code == 422
+
+def _integrity_error(constraint_name=None):
+    from sqlalchemy.exc import IntegrityError
+    cause = Exception("violation")
+    cause.constraint_name = constraint_name  # as on asyncpg's exceptions
+    orig = Exception("integrity")
+    orig.__cause__ = cause
+    return IntegrityError("INSERT", {}, orig)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("constraint, voter_session, option, status", [
+    ("uq_match_results_session_pair", object(), object(), 409),
+    ("match_results_session_id_fkey", None, object(), 404),
+    ("match_results_winner_option_id_fkey", object(), None, 400),
+])
+async def test_failed_match_insert_is_reported_by_cause(monkeypatch, constraint, voter_session, option, status):
+    from app.routes import vote
+    from app.schemas import MatchResultCreate
+    monkeypatch.setattr(vote, "create_match_result", AsyncMock(side_effect=_integrity_error(constraint)))
+    monkeypatch.setattr(vote, "get_match_result_by_index", AsyncMock(return_value=None))
+    monkeypatch.setattr(vote, "get_voter_session_by_id", AsyncMock(return_value=voter_session))
+    monkeypatch.setattr(vote, "get_option_by_id", AsyncMock(return_value=option))
+    match = MatchResultCreate(session_id=uuid.uuid4(), winner_option_id=uuid.uuid4(), loser_option_id=uuid.uuid4(), match_index=0)
+
+    with pytest.raises(HTTPException) as raised:
+        await vote.submit_match_result(match=match, idempotency_key=None, session=AsyncMock(), user={"email": "v@example.com"})
+    assert raised.value.status_code == status
@@ -0,0 +1,48 @@
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine, text
+from app import instrumentation
+from app.instrumentation import RequestMetricsMiddleware, RequestStats, install_query_hooks, current_stats
+
+def make_app(engine):
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware, slow_request_ms=10_000)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return {"queries": current_stats().query_count}
+
+    return app
+
+@pytest.mark.asyncio
+async def test_middleware_counts_queries_and_sets_server_timing():
+    engine = create_engine("sqlite://")
+    install_query_hooks(engine)
+    instrumentation.route_histograms.clear()
+    async with AsyncClient(transport=ASGITransport(app=make_app(engine)), base_url="http://test") as client:
+        resp = await client.get("/items/1")
+        await client.get("/items/2")
+    assert resp.json() == {"queries": 2}
+    assert 'desc="2 queries"' in resp.headers["server-timing"]
+    metrics = instrumentation.get_route_metrics()["GET /items/{item_id}"]
+    assert metrics["count"] == 2
+    assert metrics["avg_queries"] == 2
+
+def test_queries_outside_requests_are_ignored():
+    engine = create_engine("sqlite://")
+    install_query_hooks(engine)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert current_stats() is None
+
+def test_route_histogram_buckets():
+    histogram = instrumentation.RouteHistogram()
+    histogram.observe(3, RequestStats())
+    histogram.observe(100_000, RequestStats())
+    data = histogram.as_dict()
+    assert data["buckets_ms"]["5"] == 1
+    assert data["buckets_ms"]["+Inf"] == 1
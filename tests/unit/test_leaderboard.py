@@ -0,0 +1,143 @@
+import json
+import uuid
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from app import leaderboard
+from app.leaderboard import rank_entries, get_poll_leaderboard, invalidate_poll_leaderboard
+
+def test_rank_entries_ties_share_rank():
+    ranked = rank_entries([
+        {"label": "a", "score": 1.0},
+        {"label": "b", "score": 3.0},
+        {"label": "c", "score": 1.0},
+    ])
+    assert [(e["label"], e["rank"]) for e in ranked] == [("b", 1), ("a", 2), ("c", 2)]
+
+@pytest.mark.asyncio
+async def test_leaderboard_is_cached_until_invalidated(monkeypatch):
+    poll_id = uuid.uuid4()
+    option = SimpleNamespace(id=uuid.uuid4(), label="A")
+    list_options = AsyncMock(return_value=[option])
+    list_scores = AsyncMock(return_value=[SimpleNamespace(option_id=option.id, total_score=2.5)])
+    monkeypatch.setattr(leaderboard, "list_options_by_poll", list_options)
+    monkeypatch.setattr(leaderboard, "list_global_scores_by_poll", list_scores)
+
+    first = await get_poll_leaderboard(poll_id=poll_id, session=AsyncMock())
+    second = await get_poll_leaderboard(poll_id=poll_id, session=AsyncMock())
+    assert first == second == {"has_votes": True, "entries": [{"label": "A", "score": 2.5, "rank": 1}]}
+    assert list_scores.await_count == 1
+
+    await invalidate_poll_leaderboard(poll_id)
+    await get_poll_leaderboard(poll_id=poll_id, session=AsyncMock())
+    assert list_scores.await_count == 2
+
+@pytest.mark.asyncio
+async def test_load_win_matrix_is_dense_in_option_order(monkeypatch):
+    a, b, c = (SimpleNamespace(id=uuid.uuid4()) for _ in range(3))
+    counts = [(a.id, b.id, 3), (c.id, a.id, 1)]
+    monkeypatch.setattr(leaderboard, "list_pairwise_counts", AsyncMock(return_value=counts))
+
+    wins = await leaderboard.load_win_matrix(poll_id=uuid.uuid4(), options=[a, b, c], session=AsyncMock())
+    assert wins.tolist() == [[0, 3, 0], [0, 0, 0], [1, 0, 0]]
+
+    monkeypatch.setattr(leaderboard, "list_pairwise_counts", AsyncMock(return_value=[]))
+    assert await leaderboard.load_win_matrix(poll_id=uuid.uuid4(), options=[a, b, c], session=AsyncMock()) is None
+
+@pytest.mark.asyncio
+async def test_leaderboard_body_is_serialized_once_per_top(monkeypatch):
+    poll_id = uuid.uuid4()
+    options = [SimpleNamespace(id=uuid.uuid4(), label=f"o{i}") for i in range(12)]
+    scores = [SimpleNamespace(option_id=o.id, total_score=float(i)) for i, o in enumerate(options)]
+    monkeypatch.setattr(leaderboard, "list_options_by_poll", AsyncMock(return_value=options))
+    monkeypatch.setattr(leaderboard, "list_global_scores_by_poll", AsyncMock(return_value=scores))
+    dumps = MagicMock(side_effect=leaderboard.dumps)
+    monkeypatch.setattr(leaderboard, "dumps", dumps)
+
+    full = await leaderboard.get_poll_leaderboard_body(poll_id=poll_id, session=AsyncMock(), top=None)
+    top = await leaderboard.get_poll_leaderboard_body(poll_id=poll_id, session=AsyncMock(), top=10)
+    assert await leaderboard.get_poll_leaderboard_body(poll_id=poll_id, session=AsyncMock(), top=10) is top
+    assert [e["label"] for e in json.loads(top)["leaderboard"]] == [f"o{i}" for i in range(11, 1, -1)]
+    assert len(json.loads(full)["leaderboard"]) == 12
+    assert dumps.call_count == 2
+
+    await invalidate_poll_leaderboard(poll_id)
+    await leaderboard.get_poll_leaderboard_body(poll_id=poll_id, session=AsyncMock(), top=None)
+    assert dumps.call_count == 3
+
+@pytest.mark.asyncio
+async def test_uncached_top_k_is_ranked_in_sql(monkeypatch):
+    poll_id = uuid.uuid4()
+    page = [{"label": "A", "score": 9.0, "rank": 1}, {"label": "B", "score": 9.0, "rank": 1}]
+    ranked = AsyncMock(return_value=page)
+    build = AsyncMock()
+    monkeypatch.setattr(leaderboard, "list_ranked_scores", ranked)
+    monkeypatch.setattr(leaderboard, "build_poll_leaderboard", build)
+
+    first = await get_poll_leaderboard(poll_id=poll_id, session=AsyncMock(), limit=2)
+    second = await get_poll_leaderboard(poll_id=poll_id, session=AsyncMock(), limit=2)
+    assert first == second == {"has_votes": True, "entries": page}
+    assert ranked.await_count == 1
+    assert ranked.await_args.kwargs["limit"] == 2
+    build.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_offset_past_the_end_is_an_empty_page(monkeypatch):
+    ranked = AsyncMock(return_value=[])
+    build = AsyncMock()
+    monkeypatch.setattr(leaderboard, "list_ranked_scores", ranked)
+    monkeypatch.setattr(leaderboard, "build_poll_leaderboard", build)
+
+    page = await get_poll_leaderboard(poll_id=uuid.uuid4(), session=AsyncMock(), limit=10, offset=500)
+    assert page == {"has_votes": True, "entries": []}
+    build.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_pages_slice_a_cached_full_leaderboard(monkeypatch):
+    poll_id = uuid.uuid4()
+    options = [SimpleNamespace(id=uuid.uuid4(), label=f"o{i}") for i in range(5)]
+    scores = [SimpleNamespace(option_id=o.id, total_score=float(i)) for i, o in enumerate(options)]
+    monkeypatch.setattr(leaderboard, "list_options_by_poll", AsyncMock(return_value=options))
+    monkeypatch.setattr(leaderboard, "list_global_scores_by_poll", AsyncMock(return_value=scores))
+    ranked = AsyncMock()
+    monkeypatch.setattr(leaderboard, "list_ranked_scores", ranked)
+
+    await get_poll_leaderboard(poll_id=poll_id, session=AsyncMock())
+    page = await get_poll_leaderboard(poll_id=poll_id, session=AsyncMock(), limit=2, offset=2)
+    assert page["entries"] == [{"label": "o2", "score": 2.0, "rank": 3}, {"label": "o1", "score": 1.0, "rank": 4}]
+    ranked.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_bradley_terry_pages_come_from_the_full_fit(monkeypatch):
+    poll_id = uuid.uuid4()
+    ranked = AsyncMock()
+    build = AsyncMock(return_value={"has_votes": True, "entries": [{"label": "A", "score": 1.0, "rank": 1}, {"label": "B", "score": 0.0, "rank": 2}]})
+    monkeypatch.setattr(leaderboard, "list_ranked_scores", ranked)
+    monkeypatch.setattr(leaderboard, "build_poll_leaderboard", build)
+
+    page = await get_poll_leaderboard(poll_id=poll_id, session=AsyncMock(), ranking_method="bradley_terry", limit=1, offset=1)
+    assert page["entries"] == [{"label": "B", "score": 0.0, "rank": 2}]
+    ranked.assert_not_awaited()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fast_json", [True, False])
+async def test_leaderboard_route_honours_offset_without_limit(monkeypatch, fast_json):
+    from app.routes import poll as poll_routes
+    poll = SimpleNamespace(id=uuid.uuid4(), ranking_method="elo", creator_email="c@example.com")
+    entries = [{"label": f"o{i}", "score": float(-i), "rank": i + 1} for i in range(4)]
+    monkeypatch.setattr(poll_routes, "FAST_JSON", fast_json)
+    monkeypatch.setattr(poll_routes, "get_poll_snapshot", AsyncMock(return_value=SimpleNamespace(poll=poll)))
+    monkeypatch.setattr(poll_routes, "_authorize_leaderboard_view", AsyncMock())
+    body = AsyncMock()
+    monkeypatch.setattr(poll_routes, "get_poll_leaderboard_body", body)
+    monkeypatch.setattr(leaderboard, "_local_cache", leaderboard.TTLCache(maxsize=10, ttl=60))
+    leaderboard._local_cache.set(str(poll.id), {"has_votes": True, "entries": entries})
+    monkeypatch.setattr(poll_routes, "get_poll_leaderboard", leaderboard.get_poll_leaderboard)
+
+    response = await poll_routes.get_leaderboard(
+        poll_id=str(poll.id), response=MagicMock(headers={}), view_all=True, limit=None, offset=2,
+        session=AsyncMock(), user={"email": "c@example.com"}
+    )
+    served = json.loads(response.body)["leaderboard"] if fast_json else [e.model_dump() for e in response.leaderboard]
+    assert [e["label"] for e in served] == ["o2", "o3"]
+    body.assert_not_awaited()
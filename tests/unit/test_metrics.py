@@ -0,0 +1,28 @@
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from app.routes import metrics
+from app.routes.auth import get_current_user
+
+def _app(user=None):
+    app = FastAPI()
+    app.include_router(metrics.router)
+    if user is not None:
+        app.dependency_overrides[get_current_user] = lambda: user
+    return app
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/metrics/pool", "/metrics/requests", "/metrics/completions", "/metrics/coalescing", "/metrics/poll-cache"])
+async def test_metrics_require_credentials(path):
+    async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as client:
+        response = await client.get(path)
+    assert response.status_code in (401, 403)
+
+@pytest.mark.asyncio
+async def test_metrics_are_superadmin_only():
+    user = {"sub": "u1", "email": "a@example.com", "role": "authenticated"}
+    async with AsyncClient(transport=ASGITransport(app=_app(user)), base_url="http://test") as client:
+        assert (await client.get("/metrics/coalescing")).status_code == 403
+    admin = {"sub": "u2", "email": "b@example.com", "role": "superadmin"}
+    async with AsyncClient(transport=ASGITransport(app=_app(admin)), base_url="http://test") as client:
+        assert (await client.get("/metrics/coalescing")).status_code == 200
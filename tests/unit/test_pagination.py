@@ -0,0 +1,22 @@
+import datetime
+import uuid
+import pytest
+from app.pagination import encode_cursor, decode_cursor, naive_utc
+
+def test_cursor_roundtrip():
+    created_at = datetime.datetime(2025, 3, 1, 12, 30, 15, 123456)
+    row_id = uuid.uuid4()
+    assert decode_cursor(encode_cursor(created_at, row_id)) == (created_at, row_id)
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "Zm9vfGJhcg"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_offset_timestamps_become_naive_utc():
+    aware = datetime.datetime(2025, 1, 1, 2, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))
+    assert naive_utc(aware) == datetime.datetime(2025, 1, 1, 0, 0)
+    assert naive_utc(datetime.datetime(2025, 1, 1)) == datetime.datetime(2025, 1, 1)
+    # A hand-made cursor carrying an offset compares against the naive column too
+    row_id = uuid.uuid4()
+    assert decode_cursor(encode_cursor(aware, row_id)) == (datetime.datetime(2025, 1, 1, 0, 0), row_id)
@@ -0,0 +1,52 @@
+import uuid
+from types import SimpleNamespace
+from app.pairing import full_round_robin, required_matches, check_sufficient, next_pair
+
+def make_options(n):
+    return [SimpleNamespace(id=uuid.uuid4()) for _ in range(n)]
+
+def match(winner, loser, index):
+    return SimpleNamespace(winner_option_id=winner.id, loser_option_id=loser.id, match_index=index)
+
+def play_session(options, budget):
+    """Let the scheduler drive a session where the lower-indexed option always wins."""
+    position = {option.id: i for i, option in enumerate(options)}
+    matches = []
+    while True:
+        pair = next_pair(options, matches, budget)
+        if pair is None:
+            return matches
+        a, b = pair
+        winner, loser = (a, b) if position[a.id] < position[b.id] else (b, a)
+        matches.append(match(winner, loser, len(matches)))
+
+def test_required_matches_clamps_budget():
+    assert required_matches(10) == full_round_robin(10) == 45
+    assert required_matches(10, 3) == 9
+    assert required_matches(10, 1000) == 45
+    assert required_matches(10, 20) == 20
+
+def test_check_sufficient_without_budget_needs_every_pair():
+    options = make_options(3)
+    matches = [match(options[0], options[1], 0), match(options[0], options[2], 1)]
+    assert check_sufficient(options, matches) is not None
+    matches.append(match(options[1], options[2], 2))
+    assert check_sufficient(options, matches) is None
+
+def test_check_sufficient_requires_connected_options():
+    options = make_options(4)
+    matches = [match(options[0], options[1], 0), match(options[2], options[3], 1), match(options[1], options[0], 2)]
+    assert check_sufficient(options, matches, match_budget=3) is not None
+
+def test_next_pair_never_repeats_and_stops_at_budget():
+    options = make_options(12)
+    matches = play_session(options, budget=40)
+    pairs = {frozenset((m.winner_option_id, m.loser_option_id)) for m in matches}
+    assert len(matches) == 40
+    assert len(pairs) == len(matches)
+    assert check_sufficient(options, matches, 40) is None
+
+def test_next_pair_without_budget_plays_full_round_robin():
+    options = make_options(5)
+    matches = play_session(options, budget=None)
+    assert len(matches) == full_round_robin(5)
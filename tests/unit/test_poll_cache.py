@@ -0,0 +1,100 @@
+import uuid
+import pytest
+from unittest.mock import AsyncMock
+from app import poll_cache
+from app.models import Poll, Option
+from app.poll_cache import get_poll_snapshot, invalidate_poll_snapshot, poll_version
+
+def _patch_reads(monkeypatch, poll, options, voting_started=True):
+    reads = {
+        "get_poll_by_id": AsyncMock(return_value=poll),
+        "list_options_by_poll": AsyncMock(return_value=options),
+        "poll_has_voter_sessions": AsyncMock(return_value=voting_started),
+    }
+    for name, mock in reads.items():
+        monkeypatch.setattr(poll_cache, name, mock)
+    return reads
+
+def _poll_with_options(n=3):
+    poll = Poll(id=uuid.uuid4(), title="Lunch", creator_email="a@example.com", match_budget=5, ranking_method="elo", is_verified=False)
+    options = [Option(id=uuid.uuid4(), poll_id=poll.id, label=f"o{i}") for i in range(n)]
+    return poll, options
+
+@pytest.mark.asyncio
+async def test_snapshot_is_cached_once_voting_has_started(monkeypatch):
+    poll, options = _poll_with_options()
+    reads = _patch_reads(monkeypatch, poll, options)
+
+    first = await get_poll_snapshot(poll_id=poll.id, session=AsyncMock())
+    second = await get_poll_snapshot(poll_id=str(poll.id), session=AsyncMock())
+    assert second is first
+    assert reads["get_poll_by_id"].await_count == reads["list_options_by_poll"].await_count == 1
+    # Plain copies in option order, with the dense index the Elo engine uses
+    assert not isinstance(first.poll, Poll) and first.poll.match_budget == 5
+    assert [option.label for option in first.options] == ["o0", "o1", "o2"]
+    assert first.index.positions == {option.id: i for i, option in enumerate(options)}
+
+@pytest.mark.asyncio
+async def test_snapshot_reads_through_before_voting(monkeypatch):
+    poll, options = _poll_with_options()
+    reads = _patch_reads(monkeypatch, poll, options, voting_started=False)
+
+    await get_poll_snapshot(poll_id=poll.id, session=AsyncMock())
+    await get_poll_snapshot(poll_id=poll.id, session=AsyncMock())
+    assert reads["list_options_by_poll"].await_count == 2
+
+@pytest.mark.asyncio
+async def test_missing_poll_is_none(monkeypatch):
+    reads = _patch_reads(monkeypatch, None, [])
+    assert await get_poll_snapshot(poll_id=uuid.uuid4(), session=AsyncMock()) is None
+    reads["list_options_by_poll"].assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_option_insert_bumps_version_and_drops_snapshot(monkeypatch):
+    poll, options = _poll_with_options()
+    reads = _patch_reads(monkeypatch, poll, options)
+    first = await get_poll_snapshot(poll_id=poll.id, session=AsyncMock())
+
+    invalidate_poll_snapshot(poll.id)
+    assert poll_version(poll.id) > first.version
+    second = await get_poll_snapshot(poll_id=poll.id, session=AsyncMock())
+    assert second is not first and second.version == poll_version(poll.id)
+    assert reads["list_options_by_poll"].await_count == 2
+
+@pytest.mark.asyncio
+async def test_fill_racing_an_option_insert_is_not_stored(monkeypatch):
+    poll, options = _poll_with_options()
+    _patch_reads(monkeypatch, poll, options)
+
+    async def list_options(**kwargs):
+        # An option lands while this fill is reading
+        invalidate_poll_snapshot(poll.id)
+        return options
+    monkeypatch.setattr(poll_cache, "list_options_by_poll", list_options)
+    stale = await get_poll_snapshot(poll_id=poll.id, session=AsyncMock())
+
+    monkeypatch.setattr(poll_cache, "list_options_by_poll", AsyncMock(return_value=options))
+    fresh = await get_poll_snapshot(poll_id=poll.id, session=AsyncMock())
+    assert fresh is not stale and fresh.version > stale.version
+
+@pytest.mark.asyncio
+async def test_voting_is_checked_before_options_are_read(monkeypatch):
+    poll, options = _poll_with_options()
+    reads = _patch_reads(monkeypatch, poll, options)
+    order = []
+    reads["poll_has_voter_sessions"].side_effect = lambda **kwargs: order.append("sessions") or True
+    reads["list_options_by_poll"].side_effect = lambda **kwargs: order.append("options") or options
+    await get_poll_snapshot(poll_id=poll.id, session=AsyncMock())
+    assert order == ["sessions", "options"]
+
+def test_versions_stay_bounded_without_going_backwards(monkeypatch):
+    monkeypatch.setattr(poll_cache, "POLL_CACHE_SIZE", 2)
+    monkeypatch.setattr(poll_cache, "_versions", poll_cache.OrderedDict())
+    first = uuid.uuid4()
+    invalidate_poll_snapshot(first)
+    seen = poll_version(first)
+    for _ in range(3):
+        invalidate_poll_snapshot(uuid.uuid4())
+    assert len(poll_cache._versions) == 2
+    # Forgotten polls read as the highest forgotten version, never an older one
+    assert poll_version(first) >= seen
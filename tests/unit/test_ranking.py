@@ -0,0 +1,42 @@
+import uuid
+import numpy as np
+import pytest
+from app.ranking import fit_bradley_terry, bradley_terry_scores, win_matrix
+
+def simulate_wins(strengths, games_per_pair, seed=0):
+    rng = np.random.default_rng(seed)
+    n = len(strengths)
+    wins = np.zeros((n, n), dtype=np.int64)
+    for i in range(n):
+        for j in range(i + 1, n):
+            p_i = strengths[i] / (strengths[i] + strengths[j])
+            w = rng.binomial(games_per_pair, p_i)
+            wins[i, j] += w
+            wins[j, i] += games_per_pair - w
+    return wins
+
+def test_fit_recovers_strength_order():
+    strengths = np.array([8.0, 4.0, 2.0, 1.0, 0.5])
+    fitted, _ = fit_bradley_terry(simulate_wins(strengths, 400))
+    assert list(np.argsort(-fitted)) == [0, 1, 2, 3, 4]
+    assert np.exp(np.log(fitted).mean()) == pytest.approx(1.0)
+
+def test_warm_start_converges_faster():
+    wins = simulate_wins(np.array([3.0, 2.0, 1.0, 0.5, 0.25, 0.1]), 50)
+    fitted, _ = fit_bradley_terry(wins)
+    wins[0, 1] += 1
+    _, warm_iterations = fit_bradley_terry(wins, init=fitted)
+    _, cold_again = fit_bradley_terry(wins)
+    assert warm_iterations < cold_again
+
+def test_unbeaten_option_has_finite_score():
+    wins = np.array([[0, 5], [0, 0]])
+    scores = bradley_terry_scores(wins)
+    assert np.all(np.isfinite(scores))
+    assert scores[0] > scores[1]
+    assert scores.sum() == pytest.approx(0.0)
+
+def test_win_matrix_from_counts():
+    a, b = uuid.uuid4(), uuid.uuid4()
+    matrix = win_matrix([(a, b, 3), (b, a, 1), (a, uuid.uuid4(), 7)], {a: 0, b: 1}, 2)
+    assert matrix.tolist() == [[0, 3], [1, 0]]
@@ -0,0 +1,49 @@
+import uuid
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from app.commands import recompute_scores
+from app.commands.recompute_scores import Checkpoint, recompute_poll
+from app.elo_engine import summed_session_scores
+
+@pytest.mark.asyncio
+async def test_recompute_matches_summed_session_scores(monkeypatch):
+    options = [SimpleNamespace(id=uuid.uuid4(), label=str(i)) for i in range(4)]
+    rng = np.random.default_rng(3)
+    sessions = []
+    for _ in range(7):
+        matches = []
+        for _ in range(rng.integers(1, 6)):
+            w, l = rng.choice(4, size=2, replace=False)
+            matches.append(SimpleNamespace(winner_option_id=options[w].id, loser_option_id=options[l].id))
+        sessions.append((uuid.uuid4(), matches))
+
+    async def stream(**kwargs):
+        for session_id, matches in sessions:
+            for m in matches:
+                yield session_id, m.winner_option_id, m.loser_option_id
+
+    db = AsyncMock()
+    sessionmaker = MagicMock(return_value=MagicMock(__aenter__=AsyncMock(return_value=db), __aexit__=AsyncMock(return_value=False)))
+    replace = AsyncMock()
+    monkeypatch.setattr(recompute_scores, "get_sessionmaker", lambda: sessionmaker)
+    monkeypatch.setattr(recompute_scores, "list_options_by_poll", AsyncMock(return_value=options))
+    monkeypatch.setattr(recompute_scores, "stream_completed_session_matches", stream)
+    monkeypatch.setattr(recompute_scores, "replace_global_scores", replace)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        totals = await recompute_poll(uuid.uuid4(), executor=executor, workers=2, chunk_sessions=2)
+
+    expected = summed_session_scores([matches for _, matches in sessions], options)
+    assert np.allclose([totals[o.id] for o in options], expected)
+    assert dict(replace.await_args.kwargs["scores"]) == totals
+    db.commit.assert_awaited_once()
+
+def test_checkpoint_persists_finished_polls(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    poll_id = uuid.uuid4()
+    Checkpoint(path).mark(poll_id)
+    assert poll_id in Checkpoint(path)
+    assert uuid.uuid4() not in Checkpoint(path)
@@ -0,0 +1,17 @@
+import json
+import uuid
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from app.schemas import LeaderboardEntry, LeaderboardResponse
+from app.serialization import dumps, trusted_json_response
+
+def test_fast_path_matches_response_model_output():
+    entries = [{"label": "a", "score": np.float64(1.5), "rank": 1}, {"label": "b", "score": 0.0, "rank": "NA"}]
+    validated = jsonable_encoder(LeaderboardResponse(leaderboard=[LeaderboardEntry(**e) for e in entries]))
+    assert json.loads(dumps({"leaderboard": entries})) == validated
+
+def test_trusted_response_serializes_uuids():
+    option_id = uuid.uuid4()
+    response = trusted_json_response({"id": option_id})
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == {"id": str(option_id)}
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from app.singleflight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "row"
+
+    tasks = [asyncio.create_task(flight.do("poll:1", fetch)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+    assert calls == 1
+    assert [r for r, _ in results] == ["row"] * 5
+    assert sum(shared for _, shared in results) == 4
+    assert flight.stats()["keys"]["poll:1"] == {"calls": 5, "executions": 1, "coalesced": 4}
+
+@pytest.mark.asyncio
+async def test_nothing_is_cached_after_the_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert (await flight.do("k", fetch))[0] == 1
+    assert (await flight.do("k", fetch))[0] == 2
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        raise ValueError("db down")
+
+    tasks = [asyncio.create_task(flight.do("k", fetch)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+@pytest.mark.asyncio
+async def test_waiters_take_over_when_the_runner_is_cancelled():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def fast():
+        return "mine"
+
+    runner = asyncio.create_task(flight.do("k", slow))
+    await started.wait()
+    waiter = asyncio.create_task(flight.do("k", fast))
+    await asyncio.sleep(0)
+    runner.cancel()
+    assert await waiter == ("mine", False)